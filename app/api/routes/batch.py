@@ -0,0 +1,128 @@
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import func, insert
+from sqlmodel import select
+
+from app.db import AsyncSessionDep
+from app.dispatch import batch_dispatcher
+from app.enum import CallState
+from app.graphql import GraphQLClientDep, get_widget
+from app.logger import get_logger
+from app.models import Call, CallBatch, create_timestamp
+from app.status import public_status
+from app.api.typing import CreateCallBatchPayload
+
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/phone", tags=["Phone"])
+
+
+def unprocessable(msg: str, loc: list) -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail=[{"loc": loc, "msg": msg, "type": "value_error"}],
+    )
+
+
+@router.post("/calls/batch", status_code=202)
+async def create_call_batch(
+    payload: CreateCallBatchPayload,
+    session: AsyncSessionDep,
+    graphql_client: GraphQLClientDep,
+):
+    """Cria uma campanha de ligações para um widget.
+
+    O widget é validado uma única vez e as ligações são gravadas em lote; o
+    disparo no Twilio fica com o `BatchDispatcher`, que respeita o limite de
+    CPS e de ligações simultâneas por alvo.
+
+    Args:
+        payload (CreateCallBatchPayload): _description_
+        session (AsyncSessionDep): _description_
+        graphql_client (GraphQLClientDep): _description_
+
+    Returns:
+        _type_: _description_
+    """
+    widget = await get_widget(graphql_client, payload.widget_id)
+    if not widget:
+        raise unprocessable("Widget not found.", ["body", "widget_id"])
+    elif not widget.is_phone:
+        raise unprocessable("Widget is not a 'phone' kind.", ["body", "widget_id"])
+
+    errors = [
+        {
+            "loc": ["body", "calls", i, "target", "phone"],
+            "msg": "Target is not present in Widget settings.",
+            "type": "value_error",
+        }
+        for i, item in enumerate(payload.calls)
+        if not widget.has_target(item.target.phone)
+    ]
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+
+    batch = CallBatch(widget_id=payload.widget_id, total=len(payload.calls))
+    session.add(batch)
+    await session.flush()
+
+    now = create_timestamp()
+    calls = [
+        Call(
+            from_number=item.activist.phone,
+            to_number=item.target.phone,
+            batch_id=batch.id,
+            # A ação no BONDE só é gravada quando o Twilio aceita a ligação
+            activist=item.activist.model_dump(mode="json"),
+            created_at=now,
+            updated_at=now,
+        ).model_dump()
+        for item in payload.calls
+    ]
+
+    # INSERT multi-row, sem passar pela unit of work do ORM
+    await session.exec(insert(Call), params=calls)
+    await session.commit()
+
+    batch_dispatcher.wake()
+
+    logger.info("/calls/batch -> %d calls", batch.total, extra={"batch_id": batch.id})
+
+    return {"batch_id": batch.id, "total": batch.total}
+
+
+@router.get("/calls/batch/{batch_id}")
+async def call_batch_progress(batch_id: str, session: AsyncSessionDep):
+    """Progresso da campanha: ligações pendentes, disparadas e por status público.
+
+    Args:
+        batch_id (str): _description_
+        session (AsyncSessionDep): _description_
+    """
+    batch = await session.get(CallBatch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    query = (
+        select(Call.state, Call.dispatched_at.is_not(None), func.count())
+        .where(Call.batch_id == batch_id)
+        .group_by(Call.state, Call.dispatched_at.is_not(None))
+    )
+    pending = dispatched = 0
+    statuses: dict = {}
+    for state, is_dispatched, count in (await session.exec(query)).all():
+        if is_dispatched:
+            dispatched += count
+        else:
+            pending += count
+        status = public_status(CallState(state))
+        statuses[status] = statuses.get(status, 0) + count
+
+    return {
+        "batch_id": batch.id,
+        "widget_id": batch.widget_id,
+        "total": batch.total,
+        "pending": pending,
+        "dispatched": dispatched,
+        "status": statuses,
+    }
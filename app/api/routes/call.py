@@ -1,49 +1,72 @@
+import asyncio
+import json
+
 from fastapi import APIRouter, Response, Request, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlmodel import select
-from twilio.rest import Client
-from twilio.twiml.voice_response import VoiceResponse, Dial, Gather
 
 from app.config import settings
-from app.logger import get_logger
-from app.db import SessionDep
-from app.graphql import GraphQLClientDep, create_widget_action_gql, get_widget_gql
-from app.models import Call, TwilioCall, TwilioCallEvent
-from app.enum import EventType, TwilioCallStatus, TwilioAnsweredBy, CallState
+from app.dialer import base_url, start_call
+from app.logger import get_logger, log_payload
+from app.db import AsyncSessionDep
+from app.graphql import GraphQLClientDep, get_widget
+from app.models import Call
+from app.enum import CallState
+from app.callbacks import (
+    process_amd_status_callback,
+    process_dial_amd_status_callback,
+    process_dial_status_callback,
+    process_status_callback,
+)
+from app.events import event_writer
+from app.ingest import webhook_consumer
+from app.queries import get_twilio_call
+from app.limiter import target_limiter
 from app.machine import CallMachine
+from app.notify import status_broker
+from app.outbox import outbox_worker
+from app.signature import AmdStatusCallbackDep, GatherDep, StatusCallbackDep
+from app.status import TERMINAL_STATUS, get_cached_status, public_status
+from app.twilio import client
+from app.twiml import HANGUP_TWIML, TARGET_BUSY_TWIML, TwiMLTemplate, dial_response, hold_response
 from app.api.typing import CreateCallPayload
 
 
 logger = get_logger(__name__)
 
 router = APIRouter(prefix="/phone", tags=["Phone"])
-base_url = settings.base_url + "/v1/phone"
 
-client = Client(settings.twilio_account_sid, settings.twilio_auth_token)
+# TwiML pré-renderizado, só os valores da ligação mudam entre requisições
+dial_twiml = TwiMLTemplate(
+    dial_response, "call_id", "from_number", "to_number", base_url=base_url
+)
+hold_twiml = TwiMLTemplate(
+    hold_response, "call_id", base_url=base_url, pause=settings.target_hold_pause, announce=True
+)
+hold_wait_twiml = TwiMLTemplate(
+    hold_response, "call_id", base_url=base_url, pause=settings.target_hold_pause, announce=False
+)
 
 
 @router.post("/call")
 async def call(
     payload: CreateCallPayload,
-    session: SessionDep,
+    session: AsyncSessionDep,
     graphql_client: GraphQLClientDep
 ):
     """Inicia uma ligação lógica e dispara instrução Twiml
 
     Args:
         payload (CreateCallPayload): _description_
-        session (SessionDep): _description_
+        session (AsyncSessionDep): _description_
 
     Returns:
         _type_: _description_
     """
     # Validações de dados no BONDE
-    result = await graphql_client.execute(
-        get_widget_gql, variable_values=dict(widget_id=payload.widget_id)
-    )
-    widget = result.get("widgets_by_pk")
+    widget = await get_widget(graphql_client, payload.widget_id)
 
-    logger.debug("/call -> GraphQL result to get_widget")
-    logger.debug(result)
+    logger.debug("/call -> GraphQL result to get_widget: %s", widget)
 
     if not widget:
         raise HTTPException(
@@ -56,7 +79,7 @@ async def call(
                 }
             ],
         )
-    elif widget and widget.get("kind") != "phone":
+    elif not widget.is_phone:
         raise HTTPException(
             status_code=422,
             detail=[
@@ -67,7 +90,7 @@ async def call(
                 }
             ],
         )
-    elif widget and not any(x.get("phone") == payload.target.phone for x in widget.get("settings", {}).get("targets", [])):
+    elif not widget.has_target(payload.target.phone):
         raise HTTPException(
             status_code=422,
             detail=[
@@ -83,89 +106,26 @@ async def call(
     from_number = payload.activist.phone
     to_number = payload.target.phone
 
-    # Criar ligação lógica
+    # Criar ligação lógica, o id é gerado na aplicação então não é preciso
+    # abrir uma transação no banco enquanto esperamos a resposta do Twilio
     call = Call(from_number=from_number, to_number=to_number)
     session.add(call)
-    session.flush()
-
-    # Preparar Instrução da Chamada no Twilio
-    resp = VoiceResponse()
-    resp.say(
-        "Olá! Para confirmar o redirecionamento informe seu nome.",
-        voice="Polly.Camila",
-        language="pt-BR",
-    )
-
-    # Preparar Gather para fazer uma verificação de voz
-    gather = Gather(
-        input="speech", timeout=5, action=f"{base_url}/dial/{call.id}", method="POST"
-    )
-    resp.append(gather)
-
-    # Se ninguém respondeu, desliga a ligação:
-    resp.hangup()
 
     try:
-        twilio_call_response = client.calls.create(
-            to=payload.activist.phone,
-            from_=settings.twilio_phone_number,
-            status_callback=f"{base_url}/status-callback/{call.id}",
-            status_callback_method="POST",
-            status_callback_event=["initiated", "ringing", "answered", "completed"],
-            machine_detection="Enable",
-            async_amd=True,
-            async_amd_status_callback=f"{base_url}/amd-status-callback/{call.id}",
-            async_amd_status_callback_method="POST",
-            twiml=str(resp),
-        )
+        twilio_call = await start_call(session, call, client)
 
-        # Criar TwilioCall
-        twilio_call = TwilioCall(
-            sid=twilio_call_response.sid,
-            status=twilio_call_response.status,
-            direction=twilio_call_response.direction,
-            answered_by=twilio_call_response.answered_by,
-            parent_call=call,
-        )
-        session.add(twilio_call)
-        session.flush()
-
-        logger.info("/call -> twilio_call")
-        logger.info(twilio_call)
-
-        # Criar TwilioCallEvent
-        twilio_call_event = TwilioCallEvent(
-            twilio_call=twilio_call,
-            event_type=EventType.INSTRUCTION,
-            twilio_response={
-                "ApiVersion": twilio_call_response.api_version,
-                "AnsweredBy": twilio_call_response.answered_by,
-                "DateCreated": twilio_call_response.date_created,
-                "Direction": twilio_call_response.direction,
-                "Duration": twilio_call_response.duration,
-                "From": twilio_call_response._from,
-                "To": twilio_call_response.to,
-                "CallSid": twilio_call_response.sid,
-                "CallStatus": twilio_call_response.status,
-                "StartTime": twilio_call_response.start_time,
-                "Uri": twilio_call_response.uri,
-            },
-        )
-        session.add(twilio_call_event)
-        session.commit()
-
-        logger.info("/call -> twilio_call_event")
-        logger.info(twilio_call_event)
-
-        # Insere uma ação na API do BONDE
-        await graphql_client.execute(
-            create_widget_action_gql,
-            variable_values=dict(
-                widget_id=payload.widget_id,
-                activist=payload.activist.model_dump(),
-                input=dict(custom_fields=dict(call=call.id)),
-            ),
+        logger.info("/call -> twilio_call %s", twilio_call.sid, extra={"call_id": call.id})
+
+        # Ação na API do BONDE: gravada no outbox junto com a ligação e
+        # enviada em background pelo OutboxWorker
+        outbox_worker.add(
+            session,
+            call_id=call.id,
+            widget_id=payload.widget_id,
+            activist=payload.activist.model_dump(mode="json"),
         )
+        await event_writer.commit(session)
+        outbox_worker.wake()
 
         return {
             "call_id": call.id,
@@ -173,351 +133,230 @@ async def call(
             "twilio_call_status": twilio_call.status,
         }
     except Exception as e:
-        session.rollback()
-        logger.error(f"Error /call: {e}")
+        await session.rollback()
+        logger.error("Error /call: %s", e)
         raise
 
 
 @router.post("/status-callback/{call_id}")
-async def status_callback(call_id: str, request: Request, session: SessionDep):
+async def status_callback(call_id: str, payload: StatusCallbackDep, session: AsyncSessionDep):
     """Escuta os eventos da ligação de ORIGEM (outbound-api).
 
     Args:
         call_id (str): _description_
-        request (Request): _description_
-        session (SessionDep): _description_
+        payload (StatusCallbackDep): _description_
+        session (AsyncSessionDep): _description_
     """
-    payload = await request.form()
-
-    twilio_call_sid = payload.get("CallSid")
-    twilio_call_status = payload.get("CallStatus")
-
-    # 1. Buscar TwilioCall
-    statement = select(TwilioCall).where(TwilioCall.sid == twilio_call_sid)
-    twilio_call = session.exec(statement).first()
-    if not twilio_call:
-        return {"error": "TwilioCall not found"}, 404
-
-    # 2. Criar TwilioCallEvent
-    twilio_call_event = TwilioCallEvent(
-        twilio_call=twilio_call,
-        event_type=EventType.STATUS_CALLBACK,
-        twilio_response=dict(payload),
-    )
-    session.add(twilio_call_event)
-    session.flush()
-
-    # 3. Atualizar TwilioCall
-    try:
-        twilio_call.status = TwilioCallStatus(twilio_call_status)
-        session.add(twilio_call)
-        session.flush()
-    except ValueError:
-        logger.warning(f"Status inesperado do Twilio: {twilio_call_status}")
-        session.rollback()
-        raise
-
-    # 4. Atualizar Call (via FSM)
-    call = twilio_call.parent_call
-    machine = CallMachine(call)
-    logger.info(payload)
-
-    match twilio_call_status:
-        case TwilioCallStatus.INITIATED:
-            # Ignoramos o status de iniciado, não serve pra nossa lógica
-            pass
-        case TwilioCallStatus.RINGING:
-            machine.call()
-        case TwilioCallStatus.IN_PROGRESS:
-            machine.attend()
-        case TwilioCallStatus.COMPLETED:
-            machine.complete()
-        case TwilioCallStatus.FAILED:
-            machine.complete()
-        case _:
-            logger.info("@@ Diferente de INITIATED, RINGING, IN_PROGRESS, FAILED ou COMPLETED")
-
-    session.add(call)
-    session.commit()
-
-    return {
-        "call_id": call_id,
-        "twilio_call_sid": twilio_call_sid,
-        "twilio_call_status": twilio_call_status,
-    }
+    if settings.webhook_ingest_enabled:
+        return await webhook_consumer.ingest(session, "status-callback", call_id, payload)
+    return await process_status_callback(session, call_id, payload)
 
 
 @router.post("/amd-status-callback/{call_id}")
-async def amd_status_callback(call_id: str, request: Request, session: SessionDep):
+async def amd_status_callback(call_id: str, payload: AmdStatusCallbackDep, session: AsyncSessionDep):
     """_summary_
 
     Args:
         call_id (str): _description_
-        request (Request): _description_
-        session (SessionDep): _description_
+        payload (AmdStatusCallbackDep): _description_
+        session (AsyncSessionDep): _description_
     """
-    payload = await request.form()
-    logger.info(payload)
-
-    answered_by = payload.get("AnsweredBy")
-    twilio_call_sid = payload.get("CallSid")
-
-    # 1. Buscar TwilioCall
-    statement = select(TwilioCall).where(TwilioCall.sid == twilio_call_sid)
-    twilio_call = session.exec(statement).first()
-    if not twilio_call:
-        return {"error": "TwilioCall not found"}, 404
-
-    # 2. Registrar evento
-    twilio_call_event = TwilioCallEvent(
-        twilio_call=twilio_call,
-        event_type=EventType.AMD_CALLBACK,
-        payload=dict(payload),
-    )
-    session.add(twilio_call_event)
-    session.flush()
-
-    # 3. Atualizar TwilioCall
-    twilio_call.answered_by = answered_by
-    session.add(twilio_call)
-
-    # 3. Atualizar Call via FSM
-    call = twilio_call.parent_call
-    machine = CallMachine(call)
-
-    if answered_by == TwilioAnsweredBy.HUMAN:
-        machine.connect()
-    else:
-        machine.fail()
-
-    session.add(call)
-    session.commit()
-
-    return {
-        "call_id": call.id,
-        "twilio_call_sid": twilio_call_sid,
-        "twilio_call_answered_by": answered_by,
-    }
+    if settings.webhook_ingest_enabled:
+        return await webhook_consumer.ingest(session, "amd-status-callback", call_id, payload)
+    return await process_amd_status_callback(session, call_id, payload)
 
 
 @router.post("/dial/{call_id}")
-async def dial(call_id: str, request: Request, session: SessionDep):
+async def dial(call_id: str, payload: GatherDep, session: AsyncSessionDep):
     """Confere o estada da ligação lógica para decidir fazer o redirecionamento ou encerrar.
 
     Args:
         call_id (str): _description_
-        request (Request): _description_
-        session (SessionDep): _description_
+        payload (GatherDep): _description_
+        session (AsyncSessionDep): _description_
 
     Returns:
         _type_: _description_
     """
-    payload = await request.form()
-    logger.info("/dial ->> payload")
-    logger.info(payload)
+    log_payload(logger, "dial", payload.form)
+
+    twilio_call_sid = payload.CallSid
 
-    twilio_call_sid = payload.get("CallSid")
+    # No modo de ingestão o webhook de AMD que leva a ligação para REDIRECTING
+    # pode ainda estar na fila do inbox
+    if settings.webhook_ingest_enabled:
+        await webhook_consumer.apply_pending(call_id)
 
-    # 1. Buscar TwilioCall
-    statement = select(TwilioCall).where(TwilioCall.sid == twilio_call_sid)
-    twilio_call = session.exec(statement).first()
+    # 1. Buscar TwilioCall e Call
+    twilio_call, call = await get_twilio_call(session, twilio_call_sid)
     if not twilio_call:
         return {"error": "TwilioCall not found"}, 404
 
-    call = twilio_call.parent_call
     if call.state == CallState.REDIRECTING:
-        # Preparar a instrução Twiml para fazer o redirecionamento
-        resp = VoiceResponse()
-        resp.say(
-            "Obrigado! Vamos te conectar ao alvo, aguarde na linha",
-            voice="Polly.Camila",
-            language="pt-BR",
-        )
+        # Redireciona se o alvo tiver vaga, senão o ativista vai para a fila de espera
+        acquired, _ = await target_limiter.acquire(session, call.to_number, call.id)
+        await session.commit()
 
-        dial = Dial(caller_id=call.from_number)
-        dial.number(
-            call.to_number,
-            status_callback=f"{base_url}/dial-status-callback/{call.id}",
-            status_callback_event="initiated ringing answered completed",
-            status_callback_method="POST",
-            machine_detection="Enable",
-            amd_status_callback=f"{base_url}/dial-amd-status-callback/{call.id}",
-            amd_status_callback_method="POST",
-        )
-        resp.append(dial)
+        if acquired:
+            twiml = dial_twiml.render(
+                call_id=call.id, from_number=call.from_number, to_number=call.to_number
+            )
+        else:
+            twiml = hold_twiml.render(call_id=call.id)
     else:
-        logger.info("@@ Reconhecimento de voz humana falhou")
-        logger.info(call)
+        logger.info("@@ Reconhecimento de voz humana falhou", extra={"call_id": call.id})
 
         # Instrução para desligar a chamada
-        resp = VoiceResponse()
-        resp.hangup()
+        twiml = HANGUP_TWIML
 
-    return Response(content=str(resp), media_type="application/xml")
+    return Response(content=twiml, media_type="application/xml")
 
 
-@router.post("/dial-status-callback/{call_id}")
-async def dial_status_callback(call_id: str, request: Request, session: SessionDep):
-    """Escuta os eventos da ligação de DESTINO (DIAL inbound).
+@router.post("/hold/{call_id}")
+async def hold(call_id: str, session: AsyncSessionDep):
+    """Loop da fila de espera: conecta o ativista quando o alvo libera uma vaga.
+
+    Desiste depois de `target_hold_max_wait` segundos na fila.
 
     Args:
         call_id (str): _description_
-        request (Request): _description_
-        session (SessionDep): _description_
+        session (AsyncSessionDep): _description_
+
+    Returns:
+        _type_: _description_
     """
-    payload = await request.form()
-    logger.info("/dial-status-callback ->> payload")
-    logger.info(payload)
+    # Webhooks ainda no inbox (ex.: o ativista desligou) decidem a fila
+    if settings.webhook_ingest_enabled:
+        await webhook_consumer.apply_pending(call_id)
 
-    twilio_call_sid = payload.get("CallSid")
-    twilio_call_status = payload.get("CallStatus")
+    call = await session.get(Call, call_id)
+    if not call:
+        raise HTTPException(status_code=404, detail="Call not found")
 
-    # 1. Buscar ligação do twilio na base e caso não exista criar novo registro
-    statement = select(TwilioCall).where(TwilioCall.sid == twilio_call_sid)
-    twilio_call = session.exec(statement).first()
-    if not twilio_call:
-        twilio_call = TwilioCall(
-            parent_call_id=call_id,
-            status=twilio_call_status,
-            sid=twilio_call_sid,
-            direction=payload.get("Direction"),
-            answered_by=payload.get("AnsweredBy"),
+    if call.state != CallState.REDIRECTING:
+        return Response(content=HANGUP_TWIML, media_type="application/xml")
+
+    acquired, waited = await target_limiter.acquire(session, call.to_number, call.id)
+    if acquired:
+        twiml = dial_twiml.render(
+            call_id=call.id, from_number=call.from_number, to_number=call.to_number
         )
-        session.add(twilio_call)
-        session.flush()
+    elif waited > settings.target_hold_max_wait:
+        logger.info("@@ Alvo ocupado, ativista desistiu da fila", extra={"call_id": call.id})
+        CallMachine(call).fail()
+        session.add(call)
+        twiml = TARGET_BUSY_TWIML
     else:
-        twilio_call.status = twilio_call_status
-        if payload.get("AnsweredBy"):
-            twilio_call.answered_by = payload.get("AnsweredBy")
+        twiml = hold_wait_twiml.render(call_id=call.id)
+    await session.commit()
 
-        session.add(twilio_call)
+    return Response(content=twiml, media_type="application/xml")
 
-    # 2. Registrar evento
-    twilio_call_event = TwilioCallEvent(
-        twilio_call=twilio_call,
-        event_type=EventType.STATUS_CALLBACK,
-        payload=dict(payload),
-    )
-    session.add(twilio_call_event)
-    session.flush()
-
-    # 3. Atualizar Call via FSM
-    call = twilio_call.parent_call
-    machine = CallMachine(call)
-
-    match twilio_call_status:
-        case TwilioCallStatus.INITIATED:
-            # Ignoramos o status de iniciado, não serve pra nossa lógica
-            pass
-        case TwilioCallStatus.QUEUED:
-            # Ignoramos o status de iniciado, não serve pra nossa lógica
-            pass
-        case TwilioCallStatus.RINGING:
-            machine.dial_call()
-        case TwilioCallStatus.IN_PROGRESS:
-            machine.dial_attend()
-        case TwilioCallStatus.NO_ANSWER:
-            machine.dial_voicemail()
-        case TwilioCallStatus.COMPLETED:
-            machine.complete()
-        case _:
-            logger.info(
-                "@@ Diferente de INITIATED, QUEUED, RINGING, IN_PROGRESS ou COMPLETED"
-            )
 
-    session.add(call)
-    session.commit()
+@router.post("/dial-status-callback/{call_id}")
+async def dial_status_callback(call_id: str, payload: StatusCallbackDep, session: AsyncSessionDep):
+    """Escuta os eventos da ligação de DESTINO (DIAL inbound).
 
-    return {
-        "call_id": call.id,
-        "twilio_call_sid": twilio_call_sid,
-        "twilio_call_status": twilio_call_status,
-    }
+    Args:
+        call_id (str): _description_
+        payload (StatusCallbackDep): _description_
+        session (AsyncSessionDep): _description_
+    """
+    if settings.webhook_ingest_enabled:
+        return await webhook_consumer.ingest(session, "dial-status-callback", call_id, payload)
+    return await process_dial_status_callback(session, call_id, payload)
 
 
 @router.post("/dial-amd-status-callback/{call_id}")
-async def dial_amd_status_callback(call_id: str, request: Request, session: SessionDep):
+async def dial_amd_status_callback(call_id: str, payload: AmdStatusCallbackDep, session: AsyncSessionDep):
     """_summary_
 
+    Args:
+        call_id (str): _description_
+        payload (AmdStatusCallbackDep): _description_
+        session (AsyncSessionDep): _description_
+    """
+    if settings.webhook_ingest_enabled:
+        return await webhook_consumer.ingest(session, "dial-amd-status-callback", call_id, payload)
+    return await process_dial_amd_status_callback(session, call_id, payload)
+
+
+@router.get("/status/{call_id}")
+async def status(call_id: str, request: Request, session: AsyncSessionDep):
+    """Status público da ligação, servido do `status_cache` sempre que possível.
+
+    Responde `304 Not Modified` quando o `If-None-Match` enviado pelo cliente
+    corresponde ao status atual.
+
     Args:
         call_id (str): _description_
         request (Request): _description_
-        session (SessionDep): _description_
+        session (AsyncSessionDep): _description_
     """
-    payload = await request.form()
-    logger.info("/dial-amd-status-callback ->> payload")
-    logger.info(payload)
+    current = await get_public_status(session, call_id)
 
-    answered_by = payload.get("AnsweredBy")
-    twilio_call_sid = payload.get("CallSid")
+    etag = f'"{current}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
 
-    # 1. Buscar TwilioCall
-    statement = select(TwilioCall).where(TwilioCall.sid == twilio_call_sid)
-    twilio_call = session.exec(statement).first()
-    if not twilio_call:
-        return {"error": "TwilioCall not found"}, 404
+    return JSONResponse({"call_id": call_id, "status": current}, headers={"ETag": etag})
 
-    # 2. Registrar evento
-    twilio_call_event = TwilioCallEvent(
-        twilio_call=twilio_call,
-        event_type=EventType.AMD_CALLBACK,
-        payload=dict(payload),
-    )
-    session.add(twilio_call_event)
-    session.flush()
-
-    # 3. Atualizar TwilioCall
-    twilio_call.answered_by = answered_by
-    session.add(twilio_call)
-
-    # 3. Atualizar Call via FSM
-    call = twilio_call.parent_call
-    machine = CallMachine(call)
-
-    if answered_by == TwilioAnsweredBy.HUMAN:
-        machine.dial_connect()
-    elif answered_by in (
-        TwilioAnsweredBy.MACHINE_START,
-        TwilioAnsweredBy.MACHINE_START_BEEP,
-        TwilioAnsweredBy.MACHINE_END,
-        TwilioAnsweredBy.MACHINE_END_BEEP,
-        TwilioAnsweredBy.FAX,
-    ):
-        machine.dial_voicemail()
-    else:
-        machine.fail()
 
-    session.add(call)
-    session.commit()
+async def get_public_status(session, call_id: str) -> str | None:
+    async def load():
+        # Só a coluna necessária, sem montar a entidade inteira
+        state = (await session.exec(select(Call.state).where(Call.id == call_id))).first()
+        if state is None:
+            raise HTTPException(status_code=404, detail="Call not found")
+        return public_status(CallState(state))
 
-    return {
-        "call_id": call.id,
-        "twilio_call_sid": twilio_call_sid,
-        "twilio_call_answered_by": answered_by,
-    }
+    return await get_cached_status(call_id, load)
 
 
-@router.get("/status/{call_id}")
-async def status(call_id: str, session: SessionDep):
-    call = session.exec(select(Call).where(Call.id == call_id)).first()
-
-    status = None
-    if call.state in (CallState.INITIATED, CallState.RINGING, CallState.ANSWERED):
-        status = "initiated"
-    elif call.state in (CallState.FAILED,):
-        status = "canceled"
-    elif call.state in (CallState.CONNECTED,):
-        status = "in-progress"
-    elif call.state in (
-        CallState.REDIRECTING,
-        CallState.DESTINATION_INITIATED,
-        CallState.DESTINATION_RINGING,
-        CallState.DESTINATION_ANSWERED,
-    ):
-        status = "ringing"
-    elif call.state in (CallState.NO_ANSWERED,):
-        status = "no-answer"
-    elif call.state in (CallState.COMPLETED,):
-        status = "completed"
-
-    return {"call_id": call.id, "status": status}
+@router.get("/status/{call_id}/stream")
+async def status_stream(call_id: str, session: AsyncSessionDep):
+    """Acompanha o status da ligação via Server-Sent Events.
+
+    Envia o status atual e depois cada mudança publicada pela CallMachine,
+    encerrando quando a ligação chega a um status final.
+
+    Args:
+        call_id (str): _description_
+        session (AsyncSessionDep): _description_
+    """
+    # Assina antes de ler o estado atual para não perder nenhuma mudança
+    queue = status_broker.subscribe(call_id)
+    try:
+        current = await get_public_status(session, call_id)
+    except Exception:
+        status_broker.unsubscribe(call_id, queue)
+        raise
+
+    async def events():
+        nonlocal current
+        try:
+            yield sse_event(call_id, current)
+
+            while current not in TERMINAL_STATUS:
+                try:
+                    current = await asyncio.wait_for(
+                        queue.get(), timeout=settings.status_stream_heartbeat
+                    )
+                except TimeoutError:
+                    # Mantém a conexão aberta em proxies e load balancers
+                    yield ": heartbeat\n\n"
+                    continue
+                yield sse_event(call_id, current)
+        finally:
+            status_broker.unsubscribe(call_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def sse_event(call_id: str, status: str) -> str:
+    data = json.dumps({"call_id": call_id, "status": status})
+    return f"event: status\ndata: {data}\n\n"
@@ -1,45 +1,60 @@
-from typing import Optional, Literal
-from pydantic import BaseModel, EmailStr
+from typing import Dict, List, Mapping, Optional, Self
+from pydantic import BaseModel, EmailStr, Field, PrivateAttr
+from app.config import settings
+from app.enum import TwilioCallStatus
 from app.validate import PhoneNumberStr
 
 
-TwilioCallStatus = Literal[
-    "initiated",
-    "queued",
-    "ringing",
-    "in-progress",
-    "canceled",
-    "completed",
-    "busy",
-    "no-answer",
-    "failed",
-]
-
-
-class TwilioEventStatusCallback(BaseModel):
-    ParentCallSid: str
-    Direction: str
-    Timestamp: str
-    SequenceNumber: str
+class TwilioWebhook(BaseModel):
+    """Formulário de um webhook do Twilio, validado uma única vez por requisição.
+
+    Os campos tipados alimentam a lógica das rotas; o formulário original fica
+    em `form` e é gravado como está no `TwilioCallEvent.twilio_response`.
+    """
     CallSid: str
-    To: str
-    ToCity: str
-    ToState: str
+
+    _form: Dict[str, str] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def from_form(cls, form: Mapping[str, str]) -> Self:
+        data = dict(form)
+        webhook = cls.model_validate(data)
+        webhook._form = data
+        return webhook
+
+    @property
+    def form(self) -> Dict[str, str]:
+        return self._form
+
+
+class TwilioEventStatusCallback(TwilioWebhook):
     CallStatus: TwilioCallStatus
-    AccountSid: str
-    From: str
-    FromCity: str
-    FromState: str
+    ParentCallSid: Optional[str] = None
+    Direction: Optional[str] = None
+    Timestamp: Optional[str] = None
+    SequenceNumber: Optional[int] = None
+    To: Optional[str] = None
+    ToCity: Optional[str] = None
+    ToState: Optional[str] = None
+    AccountSid: Optional[str] = None
+    From: Optional[str] = None
+    FromCity: Optional[str] = None
+    FromState: Optional[str] = None
     AnsweredBy: Optional[str] = None
 
 
-class TwilioGather(BaseModel):
-    To: str
-    ToCity: str
-    ToState: str
-    CallSid: str
-    CallStatus: TwilioCallStatus
-    AccountSid: str
+class TwilioAmdStatusCallback(TwilioWebhook):
+    AccountSid: Optional[str] = None
+    AnsweredBy: Optional[str] = None
+    MachineDetectionDuration: Optional[int] = None
+
+
+class TwilioGather(TwilioWebhook):
+    CallStatus: Optional[TwilioCallStatus] = None
+    To: Optional[str] = None
+    ToCity: Optional[str] = None
+    ToState: Optional[str] = None
+    AccountSid: Optional[str] = None
     SpeechResult: Optional[str] = None
     MachineDetectionDuration: Optional[int] = None
     Confidence: Optional[float] = None
@@ -63,3 +78,13 @@ class CreateCallPayload(BaseModel):
     widget_id: int
     activist: ActivistInput
     target: TargetInput
+
+
+class CallBatchItem(BaseModel):
+    activist: ActivistInput
+    target: TargetInput
+
+
+class CreateCallBatchPayload(BaseModel):
+    widget_id: int
+    calls: List[CallBatchItem] = Field(min_length=1, max_length=settings.batch_max_size)
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _LoadAbandoned(Exception):
+    """O chamador que fazia o carregamento compartilhado foi cancelado."""
+
+
+class TTLCache:
+    """Cache em memória com expiração (TTL) e descarte LRU.
+
+    Buscas concorrentes pela mesma chave ausente compartilham um único
+    carregamento (`loader`), evitando várias requisições iguais ao mesmo tempo.
+    Se quem carrega é cancelado (ex.: o cliente desconectou), as demais buscas
+    não falham: uma delas refaz o carregamento.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Remove uma chave do cache, ou todas quando `key` não é informada."""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            # Já existe um carregamento em andamento para a mesma chave
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            try:
+                value = await asyncio.shield(pending)
+            except _LoadAbandoned:
+                continue
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # O `loader` usa recursos de quem foi cancelado (ex.: a sessão da
+            # requisição), então quem espera carrega por conta própria
+            future.set_exception(_LoadAbandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita "Future exception was never retrieved" quando ninguém esperava
+            future.exception()
+            raise
+        else:
+            if value is not None:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
@@ -0,0 +1,271 @@
+"""Aplicação dos webhooks de status do Twilio na ligação (TwilioCall, eventos e CallMachine).
+
+Usado direto pelas rotas e, no modo de ingestão (`webhook_ingest_enabled`),
+pelo `app.ingest.WebhookConsumer`. Cada função faz o commit da sessão.
+"""
+from typing import Awaitable, Callable, Dict, Tuple, Type
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.dedup import discard, is_seen, is_stale, mark_seen
+from app.enum import EventType, TwilioAnsweredBy, TwilioCallStatus
+from app.events import event_writer
+from app.logger import get_logger, log_payload
+from app.machine import CallMachine
+from app.models import TwilioCallEvent
+from app.queries import get_twilio_call_for_update, upsert_twilio_call
+from app.api.typing import TwilioAmdStatusCallback, TwilioEventStatusCallback, TwilioWebhook
+
+
+logger = get_logger(__name__)
+
+
+async def process_status_callback(
+    session: AsyncSession, call_id: str, payload: TwilioEventStatusCallback
+) -> dict:
+    """Aplica um status callback da ligação de ORIGEM (outbound-api)."""
+    twilio_call_sid = payload.CallSid
+    twilio_call_status = payload.CallStatus
+    sequence_number = payload.SequenceNumber
+    response = {
+        "call_id": call_id,
+        "twilio_call_sid": twilio_call_sid,
+        "twilio_call_status": twilio_call_status,
+    }
+
+    # 0. Entrega repetida do Twilio, já processada por este worker
+    if is_seen("status-callback", twilio_call_sid, sequence_number):
+        return response
+
+    # 1. Buscar TwilioCall e Call (travando as linhas até o commit)
+    twilio_call, call = await get_twilio_call_for_update(session, twilio_call_sid)
+    if not twilio_call:
+        return {"error": "TwilioCall not found"}, 404
+
+    # Repetida ou fora de ordem: não pode voltar o estado da ligação
+    if is_stale("status-callback", twilio_call.sequence_number, sequence_number):
+        # Nada foi alterado pelo webhook; o commit só libera as travas
+        await session.commit()
+        return response
+
+    # 2. Criar TwilioCallEvent
+    twilio_call_event = TwilioCallEvent(
+        twilio_call_sid=twilio_call.sid,
+        event_type=EventType.STATUS_CALLBACK,
+        sequence_number=sequence_number,
+        twilio_response=payload.form,
+    )
+    event_writer.add(session, twilio_call_event)
+
+    # 3. Atualizar TwilioCall
+    twilio_call.status = twilio_call_status
+    if sequence_number is not None:
+        twilio_call.sequence_number = sequence_number
+    session.add(twilio_call)
+
+    # 4. Atualizar Call (via FSM)
+    machine = CallMachine(call)
+    log_payload(logger, "status-callback", payload.form)
+
+    match twilio_call_status:
+        case TwilioCallStatus.INITIATED:
+            # Ignoramos o status de iniciado, não serve pra nossa lógica
+            pass
+        case TwilioCallStatus.RINGING:
+            machine.call()
+        case TwilioCallStatus.IN_PROGRESS:
+            machine.attend()
+        case TwilioCallStatus.COMPLETED:
+            machine.complete()
+        case TwilioCallStatus.FAILED:
+            machine.complete()
+        case _:
+            logger.info("@@ Diferente de INITIATED, RINGING, IN_PROGRESS, FAILED ou COMPLETED")
+
+    session.add(call)
+    await event_writer.commit(session)
+    mark_seen(twilio_call_sid, sequence_number)
+
+    return response
+
+
+async def process_amd_status_callback(
+    session: AsyncSession, call_id: str, payload: TwilioAmdStatusCallback
+) -> dict:
+    """Aplica o resultado da detecção de secretária eletrônica (AMD) da ligação de ORIGEM."""
+    log_payload(logger, "amd-status-callback", payload.form)
+
+    answered_by = payload.AnsweredBy
+    twilio_call_sid = payload.CallSid
+
+    # 1. Buscar TwilioCall e Call (travando as linhas até o commit)
+    twilio_call, call = await get_twilio_call_for_update(session, twilio_call_sid)
+    if not twilio_call:
+        return {"error": "TwilioCall not found"}, 404
+
+    # 2. Registrar evento
+    twilio_call_event = TwilioCallEvent(
+        twilio_call_sid=twilio_call.sid,
+        event_type=EventType.AMD_CALLBACK,
+        twilio_response=payload.form,
+    )
+    event_writer.add(session, twilio_call_event)
+
+    # 3. Atualizar TwilioCall
+    twilio_call.answered_by = answered_by
+    session.add(twilio_call)
+
+    # 3. Atualizar Call via FSM
+    machine = CallMachine(call)
+
+    if answered_by == TwilioAnsweredBy.HUMAN:
+        machine.connect()
+    else:
+        machine.fail()
+
+    session.add(call)
+    await event_writer.commit(session)
+
+    return {
+        "call_id": call.id,
+        "twilio_call_sid": twilio_call_sid,
+        "twilio_call_answered_by": answered_by,
+    }
+
+
+async def process_dial_status_callback(
+    session: AsyncSession, call_id: str, payload: TwilioEventStatusCallback
+) -> dict:
+    """Aplica um status callback da ligação de DESTINO (DIAL inbound)."""
+    log_payload(logger, "dial-status-callback", payload.form)
+
+    twilio_call_sid = payload.CallSid
+    twilio_call_status = payload.CallStatus
+    sequence_number = payload.SequenceNumber
+    response = {
+        "call_id": call_id,
+        "twilio_call_sid": twilio_call_sid,
+        "twilio_call_status": twilio_call_status,
+    }
+
+    # 0. Entrega repetida do Twilio, já processada por este worker
+    if is_seen("dial-status-callback", twilio_call_sid, sequence_number):
+        return response
+
+    # 1. Criar ou atualizar a ligação do twilio na base (upsert) e buscar
+    # junto a ligação lógica, travando as linhas até o commit. Entregas
+    # repetidas ou fora de ordem não atualizam nada e são descartadas
+    applied = await upsert_twilio_call(
+        session,
+        sid=twilio_call_sid,
+        parent_call_id=call_id,
+        status=twilio_call_status,
+        direction=payload.Direction,
+        answered_by=payload.AnsweredBy,
+        sequence_number=sequence_number,
+    )
+    if not applied:
+        discard("dial-status-callback", "database")
+        await session.commit()
+        return response
+
+    twilio_call, call = await get_twilio_call_for_update(session, twilio_call_sid)
+
+    # 2. Registrar evento
+    twilio_call_event = TwilioCallEvent(
+        twilio_call_sid=twilio_call.sid,
+        event_type=EventType.STATUS_CALLBACK,
+        sequence_number=sequence_number,
+        twilio_response=payload.form,
+    )
+    event_writer.add(session, twilio_call_event)
+
+    # 3. Atualizar Call via FSM
+    machine = CallMachine(call)
+
+    match twilio_call_status:
+        case TwilioCallStatus.INITIATED:
+            # Ignoramos o status de iniciado, não serve pra nossa lógica
+            pass
+        case TwilioCallStatus.QUEUED:
+            # Ignoramos o status de iniciado, não serve pra nossa lógica
+            pass
+        case TwilioCallStatus.RINGING:
+            machine.dial_call()
+        case TwilioCallStatus.IN_PROGRESS:
+            machine.dial_attend()
+        case TwilioCallStatus.NO_ANSWER:
+            machine.dial_voicemail()
+        case TwilioCallStatus.COMPLETED:
+            machine.complete()
+        case _:
+            logger.info(
+                "@@ Diferente de INITIATED, QUEUED, RINGING, IN_PROGRESS ou COMPLETED"
+            )
+
+    session.add(call)
+    await event_writer.commit(session)
+    mark_seen(twilio_call_sid, sequence_number)
+
+    return response
+
+
+async def process_dial_amd_status_callback(
+    session: AsyncSession, call_id: str, payload: TwilioAmdStatusCallback
+) -> dict:
+    """Aplica o resultado da detecção de secretária eletrônica (AMD) da ligação de DESTINO."""
+    log_payload(logger, "dial-amd-status-callback", payload.form)
+
+    answered_by = payload.AnsweredBy
+    twilio_call_sid = payload.CallSid
+
+    # 1. Buscar TwilioCall e Call (travando as linhas até o commit)
+    twilio_call, call = await get_twilio_call_for_update(session, twilio_call_sid)
+    if not twilio_call:
+        return {"error": "TwilioCall not found"}, 404
+
+    # 2. Registrar evento
+    twilio_call_event = TwilioCallEvent(
+        twilio_call_sid=twilio_call.sid,
+        event_type=EventType.AMD_CALLBACK,
+        twilio_response=payload.form,
+    )
+    event_writer.add(session, twilio_call_event)
+
+    # 3. Atualizar TwilioCall
+    twilio_call.answered_by = answered_by
+    session.add(twilio_call)
+
+    # 3. Atualizar Call via FSM
+    machine = CallMachine(call)
+
+    if answered_by == TwilioAnsweredBy.HUMAN:
+        machine.dial_connect()
+    elif answered_by in (
+        TwilioAnsweredBy.MACHINE_START,
+        TwilioAnsweredBy.MACHINE_START_BEEP,
+        TwilioAnsweredBy.MACHINE_END,
+        TwilioAnsweredBy.MACHINE_END_BEEP,
+        TwilioAnsweredBy.FAX,
+    ):
+        machine.dial_voicemail()
+    else:
+        machine.fail()
+
+    session.add(call)
+    await event_writer.commit(session)
+
+    return {
+        "call_id": call.id,
+        "twilio_call_sid": twilio_call_sid,
+        "twilio_call_answered_by": answered_by,
+    }
+
+
+# rota -> (formulário, função que aplica o webhook)
+PROCESSORS: Dict[str, Tuple[Type[TwilioWebhook], Callable[..., Awaitable[dict]]]] = {
+    "status-callback": (TwilioEventStatusCallback, process_status_callback),
+    "amd-status-callback": (TwilioAmdStatusCallback, process_amd_status_callback),
+    "dial-status-callback": (TwilioEventStatusCallback, process_dial_status_callback),
+    "dial-amd-status-callback": (TwilioAmdStatusCallback, process_dial_amd_status_callback),
+}
@@ -1,20 +1,115 @@
 import logging
-from typing import Optional
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     app_name: str = "FastAPI + UV"
     base_url: str
     database_url: str
+    async_database_url: Optional[str] = None
+    # Pool de conexões por worker (o Dockerfile sobe 4 workers)
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30.0
+    database_pool_recycle: int = -1
+    database_pool_pre_ping: bool = False
+    database_pgbouncer: bool = False
     debug: bool = True
     log_level: str = "INFO"
+    # "text" ou "json"; log_async move o formatter, a redação e a escrita para uma thread
+    log_format: str = "text"
+    log_async: bool = False
+    log_redact_phones: bool = True
+    # Fração dos payloads de webhook registrados, geral e por rota
+    log_payload_sample_rate: float = 1.0
+    log_payload_sample_rates: Dict[str, float] = {}
     # 
     twilio_account_sid: str
     twilio_auth_token: str
     twilio_phone_number: str
+    twilio_http_pool_size: int = 100
+    twilio_http_keepalive_timeout: float = 30.0
+    twilio_http_timeout: float = 10.0
+    # Desligar só para stand-ins locais do Twilio, que não assinam os webhooks
+    twilio_validate_signature: bool = True
+    # Modo de ingestão: webhooks de status/AMD gravados no inbox e aplicados em
+    # background pelo WebhookConsumer
+    webhook_ingest_enabled: bool = False
+    webhook_ingest_concurrency: int = 20
+    webhook_ingest_poll_interval: float = 1.0
+    webhook_ingest_lease_seconds: float = 60.0
+    webhook_ingest_max_attempts: int = 5
+    webhook_ingest_backoff_base: float = 1.0
+    webhook_ingest_backoff_max: float = 60.0
+    # Chaves (CallSid, SequenceNumber) de webhooks já processados neste worker
+    webhook_dedup_ttl: float = 600.0
+    webhook_dedup_maxsize: int = 100000
     #
     graphql_api_url: str
     graphql_api_token: Optional[str] = None
+    graphql_http_pool_size: int = 100
+    graphql_http_keepalive_timeout: float = 30.0
+    graphql_http_timeout: float = 10.0
+    graphql_execute_timeout: float = 10.0
+    widget_cache_ttl: float = 60.0
+    widget_cache_maxsize: int = 1024
+    #
+    event_write_behind: bool = False
+    event_queue_maxsize: int = 10000
+    event_batch_size: int = 500
+    event_flush_interval: float = 0.5
+    # Falha ao gravar um lote: novas tentativas (a fila segura os webhooks)
+    event_flush_max_attempts: int = 5
+    event_flush_backoff_base: float = 0.5
+    event_flush_backoff_max: float = 10.0
+    # Outbox das ações no BONDE (create_widget_action)
+    outbox_batch_size: int = 50
+    outbox_poll_interval: float = 5.0
+    outbox_lease_seconds: float = 60.0
+    outbox_max_attempts: int = 10
+    outbox_backoff_base: float = 1.0
+    outbox_backoff_max: float = 300.0
+    # Campanhas (POST /calls/batch): só um worker (o líder) dispara, então o
+    # limite de CPS vale para a instalação inteira
+    batch_max_size: int = 5000
+    batch_dispatch_enabled: bool = True
+    batch_dispatch_concurrency: int = 10
+    batch_poll_interval: float = 2.0
+    twilio_calls_per_second: float = 1.0
+    # Ligações simultâneas por alvo no redirecionamento (dial): "table"
+    # (compartilhado entre workers), "memory" (por processo) ou "off".
+    # `target_max_concurrency` também limita o disparo das campanhas: o
+    # BatchDispatcher não inicia mais ligações para um alvo do que o dial
+    # aceita, então ativistas de campanha não caem na fila de espera
+    target_limiter_mode: str = "table"
+    target_max_concurrency: int = 1
+    target_slot_ttl: float = 3600.0
+    target_hold_pause: int = 10
+    target_hold_max_wait: float = 600.0
+    # Ligações sem callback há mais que isso (segundos, por estado) são
+    # encerradas pelo CallReaper; "redirecting" inclui a fila de espera do alvo
+    call_state_timeouts: Dict[str, float] = {
+        "initiated": 300.0,
+        "ringing": 300.0,
+        "answered": 300.0,
+        "answered-human": 300.0,
+        "redirecting": 1200.0,
+        "destination-initiated": 300.0,
+        "destination-ringing": 300.0,
+        "destination-answered": 300.0,
+        "connected": 14400.0,
+    }
+    call_reaper_enabled: bool = True
+    call_reaper_batch_size: int = 500
+    call_reaper_interval: float = 60.0
+    # Eventos mais antigos que isso são removidos por `python -m app.retention`
+    event_retention_days: int = 180
+    event_retention_batch_size: int = 5000
+    #
+    status_stream_heartbeat: float = 15.0
+    status_cache_ttl: float = 30.0
+    status_cache_terminal_ttl: float = 3600.0
+    status_cache_maxsize: int = 100000
 
     class Config:
         env_file = ".env"
@@ -28,4 +123,26 @@ class Settings(BaseSettings):
         """
         return getattr(logging, self.log_level.upper(), logging.INFO)
 
+    @property
+    def get_async_database_url(self) -> str:
+        """URL do banco para o driver assíncrono (asyncpg / aiosqlite).
+
+        Quando ASYNC_DATABASE_URL não é definida, deriva a URL a partir de
+        DATABASE_URL trocando o driver síncrono pelo equivalente assíncrono.
+
+        Returns:
+            str: URL no formato aceito por `create_async_engine`
+        """
+        if self.async_database_url:
+            return self.async_database_url
+
+        scheme, sep, rest = self.database_url.partition("://")
+        driver = {
+            "postgres": "postgresql+asyncpg",
+            "postgresql": "postgresql+asyncpg",
+            "postgresql+psycopg2": "postgresql+asyncpg",
+            "sqlite": "sqlite+aiosqlite",
+        }.get(scheme, scheme)
+        return f"{driver}{sep}{rest}"
+
 settings = Settings()
\ No newline at end of file
@@ -1,16 +1,129 @@
-from typing import Annotated
+import time
+import uuid
+from typing import Annotated, Any, Dict
 
 from fastapi import Depends
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.config import settings
+from app.metrics import DB_SESSION_SECONDS
 
 
-engine = create_engine(settings.database_url)
+class TimedPoolMixin:
+    """Mede quanto tempo cada checkout espera por uma conexão do pool."""
+
+    checkout_count = 0
+    checkout_timeouts = 0
+    checkout_wait_total = 0.0
+    checkout_wait_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.checkout_timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.checkout_count += 1
+            self.checkout_wait_total += elapsed
+            self.checkout_wait_max = max(self.checkout_wait_max, elapsed)
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, poolclass) -> Dict[str, Any]:
+    """Opções de pool do engine a partir das configurações.
+
+    Com `DATABASE_PGBOUNCER` o pool fica a cargo do PgBouncer (NullPool) e os
+    prepared statements do asyncpg são desligados, já que no modo transaction
+    do PgBouncer a conexão do servidor muda entre transações.
+    """
+    if url.startswith("sqlite"):
+        return {}
+
+    if settings.database_pgbouncer:
+        options: Dict[str, Any] = {"poolclass": NullPool}
+        if "+asyncpg" in url:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        return options
+
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_max_overflow,
+        "pool_timeout": settings.database_pool_timeout,
+        "pool_recycle": settings.database_pool_recycle,
+        "pool_pre_ping": settings.database_pool_pre_ping,
+    }
+
+
+engine = create_engine(
+    settings.database_url,
+    **engine_options(settings.database_url, TimedQueuePool),
+)
+
+# Engine assíncrono usado pelas rotas, não bloqueia o event loop enquanto
+# espera o banco de dados.
+async_engine = create_async_engine(
+    settings.get_async_database_url,
+    **engine_options(settings.get_async_database_url, TimedAsyncAdaptedQueuePool),
+)
+
+async_session_maker = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
+def pool_stats(bind=async_engine) -> Dict[str, float]:
+    """Ocupação do pool e tempo de espera no checkout de conexões.
+
+    Returns:
+        Dict[str, float]: `saturation` é a fração de conexões em uso em
+        relação ao máximo (`pool_size + max_overflow`)
+    """
+    pool = bind.pool
+    if not isinstance(pool, TimedPoolMixin):
+        return {}
+
+    capacity = pool.size() + max(settings.database_max_overflow, 0)
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "saturation": pool.checkedout() / capacity if capacity else 0.0,
+        "checkout_count": pool.checkout_count,
+        "checkout_timeouts": pool.checkout_timeouts,
+        "checkout_wait_total": pool.checkout_wait_total,
+        "checkout_wait_max": pool.checkout_wait_max,
+    }
+
 
 def get_session():
     with Session(engine) as session:
         yield session
 
 
+async def get_async_session():
+    with DB_SESSION_SECONDS.time():
+        async with async_session_maker() as session:
+            yield session
+
+
 SessionDep = Annotated[Session, Depends(get_session)]
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
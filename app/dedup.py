@@ -0,0 +1,43 @@
+from typing import Optional
+
+from app.cache import TTLCache
+from app.config import settings
+from app.metrics import WEBHOOK_DUPLICATES
+
+
+# Entregas recentes já processadas por este worker, para descartar as
+# repetições do Twilio sem ir ao banco
+seen_webhooks = TTLCache(
+    ttl=settings.webhook_dedup_ttl, maxsize=settings.webhook_dedup_maxsize
+)
+
+
+def discard(route: str, source: str):
+    """Contabiliza uma entrega descartada ("cache" ou "database")."""
+    WEBHOOK_DUPLICATES.labels(route, source).inc()
+
+
+def is_seen(route: str, call_sid: str, sequence_number: Optional[int]) -> bool:
+    if sequence_number is None or seen_webhooks.get((call_sid, sequence_number)) is None:
+        return False
+
+    discard(route, "cache")
+    return True
+
+
+def mark_seen(call_sid: str, sequence_number: Optional[int]):
+    if sequence_number is not None:
+        seen_webhooks.set((call_sid, sequence_number), True)
+
+
+def is_stale(
+    route: str, last_sequence_number: Optional[int], sequence_number: Optional[int]
+) -> bool:
+    """Entrega repetida ou fora de ordem em relação à última aplicada no banco."""
+    if sequence_number is None or last_sequence_number is None:
+        return False
+    if sequence_number > last_sequence_number:
+        return False
+
+    discard(route, "database")
+    return True
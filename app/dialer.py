@@ -0,0 +1,79 @@
+from fastapi.encoders import jsonable_encoder
+from twilio.rest import Client
+
+from app.config import settings
+from app.enum import EventType
+from app.events import event_writer
+from app.models import Call, TwilioCall, TwilioCallEvent
+from app.twilio import client
+from app.twiml import TwiMLTemplate, gather_response
+
+
+base_url = settings.base_url + "/v1/phone"
+
+# TwiML pré-renderizado, só os valores da ligação mudam entre requisições
+gather_twiml = TwiMLTemplate(gather_response, "call_id", base_url=base_url)
+
+
+async def start_call(session, call: Call, twilio_client: Client = client) -> TwilioCall:
+    """Dispara a ligação para o ativista no Twilio.
+
+    Registra o `TwilioCall` e o `TwilioCallEvent` da instrução na sessão, sem
+    fazer o commit; quem chama decide quando confirmar a transação.
+
+    Args:
+        session (AsyncSession): _description_
+        call (Call): ligação lógica, com o id já gerado
+        twilio_client (Client): cliente da API do Twilio
+
+    Returns:
+        TwilioCall: _description_
+    """
+    # Preparar Instrução da Chamada no Twilio (ver app.twiml.gather_response)
+    twiml = gather_twiml.render(call_id=call.id)
+
+    twilio_call_response = await twilio_client.calls.create_async(
+        to=call.from_number,
+        from_=settings.twilio_phone_number,
+        status_callback=f"{base_url}/status-callback/{call.id}",
+        status_callback_method="POST",
+        status_callback_event=["initiated", "ringing", "answered", "completed"],
+        machine_detection="Enable",
+        async_amd=True,
+        async_amd_status_callback=f"{base_url}/amd-status-callback/{call.id}",
+        async_amd_status_callback_method="POST",
+        twiml=twiml,
+    )
+
+    # Criar TwilioCall
+    twilio_call = TwilioCall(
+        sid=twilio_call_response.sid,
+        status=twilio_call_response.status,
+        direction=twilio_call_response.direction,
+        answered_by=twilio_call_response.answered_by,
+        parent_call_id=call.id,
+    )
+    session.add(twilio_call)
+    await session.flush()
+
+    # Criar TwilioCallEvent
+    twilio_call_event = TwilioCallEvent(
+        twilio_call_sid=twilio_call.sid,
+        event_type=EventType.INSTRUCTION,
+        twilio_response=jsonable_encoder({
+            "ApiVersion": twilio_call_response.api_version,
+            "AnsweredBy": twilio_call_response.answered_by,
+            "DateCreated": twilio_call_response.date_created,
+            "Direction": twilio_call_response.direction,
+            "Duration": twilio_call_response.duration,
+            "From": twilio_call_response._from,
+            "To": twilio_call_response.to,
+            "CallSid": twilio_call_response.sid,
+            "CallStatus": twilio_call_response.status,
+            "StartTime": twilio_call_response.start_time,
+            "Uri": twilio_call_response.uri,
+        }),
+    )
+    event_writer.add(session, twilio_call_event)
+
+    return twilio_call
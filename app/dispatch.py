@@ -0,0 +1,266 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import ScalarSelect, func, or_, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, async_sessionmaker
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+
+from app.config import settings
+from app.db import async_session_maker
+from app.dialer import start_call
+from app.events import event_writer
+from app.logger import get_logger
+from app.machine import CallMachine
+from app.models import FINAL_CALL_STATES, Call, CallBatch, create_timestamp
+from app.outbox import outbox_worker
+from app.worker import Poller
+
+
+logger = get_logger(__name__)
+
+def active_call_filters(model=Call) -> tuple:
+    """Ligações em andamento, venham do `POST /call` ou de campanhas; as de
+    campanha ainda na fila do dispatcher não contam."""
+    return (
+        model.state.not_in(FINAL_CALL_STATES),
+        or_(model.batch_id.is_(None), model.dispatched_at.is_not(None)),
+    )
+
+
+def active_calls_for(to_number) -> ScalarSelect:
+    """Subquery correlacionada: ligações em andamento para o alvo `to_number`."""
+    active = aliased(Call)
+    return (
+        select(func.count())
+        .select_from(active)
+        .where(active.to_number == to_number, *active_call_filters(active))
+        .scalar_subquery()
+    )
+
+
+class RateLimiter:
+    """Espaça as chamadas para no máximo `rate` por segundo."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        wait = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class LeaderLock:
+    """Liderança entre processos com um advisory lock de sessão do Postgres.
+
+    O lock fica preso a uma conexão aberta (em autocommit) enquanto o processo
+    for líder; se o processo ou a conexão caem o Postgres libera o lock e
+    outro worker assume na próxima tentativa. Em outros bancos (SQLite nos
+    testes) todo processo é líder.
+    """
+
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self._conn: Optional[AsyncConnection] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._conn is not None or self.engine.dialect.name != "postgresql"
+
+    async def acquire(self) -> bool:
+        """Tenta assumir (ou confirma) a liderança, sem esperar pelo lock."""
+        if self.engine.dialect.name != "postgresql":
+            return True
+
+        if self._conn is not None:
+            try:
+                await self._conn.exec_driver_sql("SELECT 1")
+                return True
+            except Exception as e:
+                logger.warning("Lost %s leadership: %s", self.name, e)
+                await self.release()
+
+        conn = await self.engine.connect()
+        try:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(hashtext(:name))"), {"name": self.name}
+            )
+        except Exception:
+            await conn.close()
+            raise
+
+        if not acquired:
+            await conn.close()
+            return False
+
+        logger.info("Assumiu a liderança de %s", self.name)
+        self._conn = conn
+        return True
+
+    async def release(self):
+        if self._conn is None:
+            return
+
+        conn, self._conn = self._conn, None
+        try:
+            await conn.execute(
+                text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": self.name}
+            )
+        except Exception as e:
+            # Conexão perdida: o Postgres já liberou o lock
+            logger.warning("Error releasing %s leadership: %s", self.name, e)
+        finally:
+            await conn.close()
+
+
+class BatchDispatcher(Poller):
+    """Dispara no Twilio as ligações das campanhas (`POST /calls/batch`).
+
+    As ligações são criadas com `batch_id` e sem `dispatched_at`. A cada rodada
+    o dispatcher reserva até `concurrency` ligações pendentes (SKIP LOCKED no
+    Postgres), ignorando alvos que já têm `target_max_concurrency` ligações em
+    andamento, e as dispara respeitando `calls_per_second`.
+
+    O `RateLimiter` fica em memória, então só um processo por instalação roda
+    o dispatcher: os workers disputam um `LeaderLock` e apenas o líder
+    dispara. Assim `calls_per_second` é o CPS da conta Twilio inteira, e não
+    por worker.
+    """
+
+    error_message = "Error dispatching batch calls: %s"
+
+    def __init__(
+        self,
+        calls_per_second: float,
+        target_max_concurrency: int,
+        concurrency: int,
+        poll_interval: float,
+        session_maker: async_sessionmaker = async_session_maker,
+        dial: Callable[..., Awaitable] = start_call,
+    ):
+        super().__init__(poll_interval)
+        self.limiter = RateLimiter(calls_per_second)
+        self.leader = LeaderLock("phone_batch_dispatcher", session_maker.kw["bind"])
+        self.target_max_concurrency = target_max_concurrency
+        self.concurrency = concurrency
+        self.session_maker = session_maker
+        self.dial = dial
+        self.dispatched = 0
+        self.failed = 0
+
+    async def stop(self):
+        """Ligações ainda não reservadas continuam pendentes no banco."""
+        await super().stop()
+        await self.leader.release()
+
+    async def run_once(self) -> bool:
+        # Workers que não são líderes só tentam assumir a cada rodada
+        if not await self.leader.acquire():
+            return False
+        return await self.dispatch_batch() > 0
+
+    async def dispatch_batch(self) -> int:
+        """Reserva e dispara uma rodada de ligações. Retorna quantas foram disparadas."""
+        call_ids = await self._claim()
+        await asyncio.gather(*(self._dispatch(call_id) for call_id in call_ids))
+        return len(call_ids)
+
+    async def _claim(self) -> List[str]:
+        async with self.session_maker() as session:
+            # Alvos já no limite ficam de fora, para não bloquear os demais
+            query = (
+                select(Call)
+                .where(
+                    Call.batch_id.is_not(None),
+                    Call.dispatched_at.is_(None),
+                    active_calls_for(Call.to_number) < self.target_max_concurrency,
+                )
+                .order_by(Call.created_at)
+                .limit(self.concurrency)
+                .with_for_update(skip_locked=True)
+            )
+            candidates = (await session.exec(query)).all()
+            if not candidates:
+                return []
+
+            # Ligações em andamento só dos alvos reservados nesta rodada
+            targets = {call.to_number for call in candidates}
+            active = (
+                select(Call.to_number, func.count())
+                .where(Call.to_number.in_(targets), *active_call_filters())
+                .group_by(Call.to_number)
+            )
+            active_by_target: Dict[str, int] = dict((await session.exec(active)).all())
+
+            now = create_timestamp()
+            claimed = []
+            for call in candidates:
+                if active_by_target.get(call.to_number, 0) >= self.target_max_concurrency:
+                    continue
+                active_by_target[call.to_number] = active_by_target.get(call.to_number, 0) + 1
+                call.dispatched_at = now
+                session.add(call)
+                claimed.append(call.id)
+
+            await session.commit()
+            return claimed
+
+    async def _dispatch(self, call_id: str):
+        await self.limiter.acquire()
+
+        async with self.session_maker() as session:
+            call, widget_id = (
+                await session.exec(
+                    select(Call, CallBatch.widget_id)
+                    .join(CallBatch, CallBatch.id == Call.batch_id)
+                    .where(Call.id == call_id)
+                )
+            ).one()
+            try:
+                await self.dial(session, call)
+
+                # Ação no BONDE só para ligações aceitas pelo Twilio, na mesma
+                # transação do TwilioCall (como no `POST /call`)
+                outbox_worker.add(
+                    session,
+                    call_id=call.id,
+                    widget_id=widget_id,
+                    activist=call.activist,
+                )
+                call.activist = None
+                session.add(call)
+                await event_writer.commit(session)
+                outbox_worker.wake()
+                self.dispatched += 1
+            except Exception as e:
+                await session.rollback()
+                logger.error("Error dispatching call %s: %s", call_id, e)
+
+                call = await session.get(Call, call_id)
+                CallMachine(call).fail()
+                call.activist = None
+                session.add(call)
+                await session.commit()
+                self.failed += 1
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "dispatched": self.dispatched,
+            "failed": self.failed,
+            "leader": int(self.leader.is_leader),
+        }
+
+
+batch_dispatcher = BatchDispatcher(
+    calls_per_second=settings.twilio_calls_per_second,
+    target_max_concurrency=settings.target_max_concurrency,
+    concurrency=settings.batch_dispatch_concurrency,
+    poll_interval=settings.batch_poll_interval,
+)
@@ -0,0 +1,182 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.db import async_session_maker
+from app.logger import get_logger
+from app.models import TwilioCallEvent
+from app.worker import backoff
+
+
+logger = get_logger(__name__)
+
+_pending_key = "pending_twilio_call_events"
+
+
+class EventWriter:
+    """Grava `TwilioCallEvent` de forma assíncrona (write-behind).
+
+    Os eventos são dados de auditoria e ninguém os lê no caminho quente. No
+    modo write-behind os webhooks apenas enfileiram os eventos depois do
+    commit, e uma task em background os insere em lote (INSERT multi-row).
+    A fila é limitada: quando enche, `commit` espera por espaço (backpressure).
+    Um lote que falha é gravado de novo com backoff exponencial até
+    `max_attempts` vezes (enquanto isso a fila enche e segura os webhooks);
+    só então é descartado, com os eventos registrados no log.
+
+    Com o modo desligado, `add` e `commit` equivalem a `session.add` e
+    `session.commit`.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        maxsize: int,
+        batch_size: int,
+        flush_interval: float,
+        max_attempts: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 10.0,
+        session_maker: async_sessionmaker = async_session_maker,
+    ):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session_maker = session_maker
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.flushed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.last_flush_seconds = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, session, event: TwilioCallEvent):
+        if self.enabled:
+            session.info.setdefault(_pending_key, []).append(event)
+        else:
+            session.add(event)
+
+    async def commit(self, session):
+        """Faz o commit da sessão e só então enfileira os eventos pendentes,
+        garantindo que o `TwilioCall` referenciado já exista no banco."""
+        await session.commit()
+
+        for event in session.info.pop(_pending_key, []):
+            await self.queue.put(
+                event.model_dump(exclude={"id"})
+            )
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Drena a fila antes de encerrar o worker."""
+        if self._task is None:
+            return
+
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            row = await self.queue.get()
+            if row is None:
+                break
+
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self.queue.get(), timeout)
+                except TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self._flush(batch)
+
+        # Drena o que sobrou na fila
+        remaining = []
+        while not self.queue.empty():
+            row = self.queue.get_nowait()
+            if row is not None:
+                remaining.append(row)
+        for i in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[i:i + self.batch_size])
+
+    async def _flush(self, batch: List[dict]):
+        start = time.perf_counter()
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    await self._insert(batch)
+                    self.flushed += len(batch)
+                    return
+                except Exception as e:
+                    error = e
+                    if attempt < self.max_attempts:
+                        self.retried += 1
+                        logger.warning(
+                            "Error flushing %d TwilioCallEvent (attempt %d): %s",
+                            len(batch), attempt, e,
+                        )
+                        await asyncio.sleep(backoff(attempt, self.backoff_base, self.backoff_max))
+
+            self.dropped += len(batch)
+            logger.error(
+                "Dropping %d TwilioCallEvent after %d attempts: %s (events: %s)",
+                len(batch), self.max_attempts, error,
+                [
+                    (row["twilio_call_sid"], row["event_type"], row.get("sequence_number"))
+                    for row in batch
+                ],
+            )
+        finally:
+            self.last_flush_seconds = time.perf_counter() - start
+
+    async def _insert(self, batch: List[dict]):
+        async with self.session_maker() as session:
+            insert = (
+                postgresql.insert
+                if session.bind.dialect.name == "postgresql"
+                else sqlite.insert
+            )
+            # Entregas repetidas do Twilio já gravadas por outro worker
+            statement = insert(TwilioCallEvent).on_conflict_do_nothing()
+            await session.exec(statement, params=batch)
+            await session.commit()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "depth": self.queue.qsize(),
+            "flushed": self.flushed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+
+event_writer = EventWriter(
+    enabled=settings.event_write_behind,
+    maxsize=settings.event_queue_maxsize,
+    batch_size=settings.event_batch_size,
+    flush_interval=settings.event_flush_interval,
+    max_attempts=settings.event_flush_max_attempts,
+    backoff_base=settings.event_flush_backoff_base,
+    backoff_max=settings.event_flush_backoff_max,
+)
@@ -1,41 +1,140 @@
-from typing import Annotated
+import asyncio
+from functools import lru_cache
+from typing import Annotated, Dict, Optional
 
+from aiohttp import TCPConnector
 from fastapi import Depends
-from gql import Client, gql
+from gql import Client, GraphQLRequest, gql
+from gql.client import AsyncClientSession
 from gql.transport.aiohttp import AIOHTTPTransport
 
+from app.cache import TTLCache
 from app.config import settings
+from app.logger import get_logger
+from app.metrics import GRAPHQL_LATENCY
+from app.widget import Widget, compile_widget
 
 
-transport = AIOHTTPTransport(
+logger = get_logger(__name__)
+
+
+class GraphQLSessionManager:
+    """Sessão GraphQL compartilhada pelo worker, aberta uma única vez.
+
+    Mantém um `Client` conectado (com pool de conexões aiohttp) durante todo o
+    lifespan da aplicação, em vez de abrir um `Client` por requisição. Assim
+    como o cliente HTTP do Twilio, a sessão é recriada caso o event loop mude.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        ssl: bool,
+        limit: int,
+        keepalive_timeout: float,
+        timeout: float,
+        execute_timeout: float,
+    ):
+        self.url = url
+        self.headers = headers
+        self.ssl = ssl
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.execute_timeout = execute_timeout
+        self.client: Optional[Client] = None
+        self.session: Optional[AsyncClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _build_client(self) -> Client:
+        transport = AIOHTTPTransport(
+            self.url,
+            ssl=self.ssl,
+            headers=self.headers,
+            timeout=self.timeout,
+            client_session_args={
+                "connector": TCPConnector(
+                    limit=self.limit, keepalive_timeout=self.keepalive_timeout
+                ),
+            },
+        )
+        return Client(transport=transport, execute_timeout=self.execute_timeout)
+
+    async def connect(self) -> AsyncClientSession:
+        loop = asyncio.get_running_loop()
+        if self.session is not None and self._loop is loop:
+            return self.session
+
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+            # Sessão de outro event loop não pode ser reaproveitada nem fechada aqui
+            self.client = self.session = None
+
+        async with self._lock:
+            if self.session is None:
+                self.client = self._build_client()
+                self.session = await self.client.connect_async()
+        return self.session
+
+    async def close(self):
+        if self.client is not None and self.session is not None:
+            await self.client.close_async()
+        self.client = self.session = None
+        self._loop = self._lock = None
+
+    async def health(self) -> bool:
+        """Executa uma query mínima para verificar se a API GraphQL responde."""
+        try:
+            session = await self.connect()
+            await session.execute(health_gql)
+        except Exception as e:
+            logger.warning("GraphQL health check failed: %s", e)
+            return False
+        return True
+
+
+graphql_session = GraphQLSessionManager(
     settings.graphql_api_url,
-    ssl=not settings.debug,
     headers=(
         {"x-hasura-admin-secret": settings.graphql_api_token}
         if settings.graphql_api_token
         else None
     ),
+    ssl=not settings.debug,
+    limit=settings.graphql_http_pool_size,
+    keepalive_timeout=settings.graphql_http_keepalive_timeout,
+    timeout=settings.graphql_http_timeout,
+    execute_timeout=settings.graphql_execute_timeout,
 )
 
 
-async def get_graphql_client():
-    async with Client(transport=transport) as graphql_client:
-        yield graphql_client
+async def get_graphql_client() -> AsyncClientSession:
+    return await graphql_session.connect()
 
 
-GraphQLClientDep = Annotated[Client, Depends(get_graphql_client)]
+GraphQLClientDep = Annotated[AsyncClientSession, Depends(get_graphql_client)]
 
 # Queries e Mutations BONDE API
 
-create_widget_action_gql = gql(
-    """
-    mutation($activist: ActivistInput!, $widget_id: Int!, $input: WidgetActionInput!) {
-        create_widget_action(activist: $activist, widget_id: $widget_id, input: $input) {
-            data
-        }
-    }
-"""
-)
+@lru_cache(maxsize=None)
+def create_widget_action_gql(size: int = 1) -> GraphQLRequest:
+    """Mutation com `size` chamadas a `create_widget_action`, com os aliases
+    a0, a1, ... e as variáveis `$activist{i}`, `$widget_id{i}` e `$input{i}`."""
+    variables = ", ".join(
+        f"$activist{i}: ActivistInput!, $widget_id{i}: Int!, $input{i}: WidgetActionInput!"
+        for i in range(size)
+    )
+    fields = "\n".join(
+        f"a{i}: create_widget_action(activist: $activist{i}, widget_id: $widget_id{i}, input: $input{i}) {{ data }}"
+        for i in range(size)
+    )
+    return gql(f"mutation({variables}) {{\n{fields}\n}}")
+
+
+health_gql = gql("query { __typename }")
 
 
 get_widget_gql = gql(
@@ -49,3 +148,34 @@ get_widget_gql = gql(
     }
 """
 )
+
+
+# Widgets mudam raramente durante uma mobilização, então evitamos consultar
+# a API do BONDE a cada ligação. Use `widget_cache.invalidate(widget_id)`
+# para forçar uma nova busca.
+widget_cache = TTLCache(
+    ttl=settings.widget_cache_ttl, maxsize=settings.widget_cache_maxsize
+)
+
+
+async def get_widget(graphql_client: AsyncClientSession, widget_id: int) -> Widget | None:
+    """Busca o widget na API do BONDE, passando pelo `widget_cache`.
+
+    O cache guarda o widget já compilado (ver `app.widget.compile_widget`).
+
+    Args:
+        graphql_client (AsyncClientSession): sessão GraphQL compartilhada
+        widget_id (int): id do widget
+
+    Returns:
+        Widget | None: None quando o widget não existe
+    """
+
+    async def load():
+        with GRAPHQL_LATENCY.labels("get_widget").time():
+            result = await graphql_client.execute(
+                get_widget_gql, variable_values=dict(widget_id=widget_id)
+            )
+        return compile_widget(result.get("widgets_by_pk"))
+
+    return await widget_cache.get_or_load(widget_id, load)
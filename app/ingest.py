@@ -0,0 +1,286 @@
+"""Modo de ingestão dos webhooks de status do Twilio.
+
+Com `webhook_ingest_enabled` os webhooks de status e AMD apenas gravam o
+formulário em `phone_webhook_inbox` e respondem na hora; o `WebhookConsumer`
+aplica os webhooks em background, em ordem por ligação. Webhooks que falharam
+`webhook_ingest_max_attempts` vezes ficam na tabela e podem ser reprocessados:
+
+    uv run python -m app.ingest --call-id <id> --run
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import exists, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+from transitions import MachineError
+
+from app.callbacks import PROCESSORS
+from app.config import settings
+from app.db import async_session_maker, engine
+from app.dedup import is_seen
+from app.logger import get_logger
+from app.models import WebhookInbox, create_timestamp
+from app.api.typing import TwilioWebhook
+from app.worker import Poller, backoff
+
+
+logger = get_logger(__name__)
+
+
+class WebhookNotReady(Exception):
+    """O processador não encontrou o que o webhook atualiza; é reenviado com backoff."""
+
+
+class WebhookConsumer(Poller):
+    """Aplica os webhooks gravados em `phone_webhook_inbox`.
+
+    A cada rodada o consumidor reserva por `lease_seconds` (SKIP LOCKED no
+    Postgres) até `concurrency` webhooks, no máximo um por ligação: só entra o
+    webhook mais antigo ainda pendente de cada ligação, então os webhooks de
+    uma mesma ligação são aplicados um de cada vez e na ordem em que chegaram,
+    mesmo com vários workers. Ligações diferentes são processadas em paralelo.
+
+    Se o worker cai no meio do processamento a reserva expira e outro worker
+    reaplica o webhook; repetições são descartadas pelo `SequenceNumber`.
+    Falhas são reenviadas com backoff exponencial (segurando os webhooks
+    seguintes da ligação) até `max_attempts`. Ao parar, os webhooks ainda não
+    aplicados continuam no banco.
+    """
+
+    error_message = "Error processing webhook inbox: %s"
+
+    def __init__(
+        self,
+        concurrency: int,
+        poll_interval: float,
+        lease_seconds: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        session_maker: async_sessionmaker = async_session_maker,
+    ):
+        super().__init__(poll_interval)
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session_maker = session_maker
+        self.ingested = 0
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def ingest(self, session, route: str, call_id: str, payload: TwilioWebhook) -> dict:
+        """Grava o webhook para ser aplicado depois e responde ao Twilio."""
+        sequence_number = getattr(payload, "SequenceNumber", None)
+        if not is_seen(route, payload.CallSid, sequence_number):
+            session.add(WebhookInbox(call_id=call_id, route=route, form=payload.form))
+            await session.commit()
+            self.ingested += 1
+            self.wake()
+
+        return {"call_id": call_id, "twilio_call_sid": payload.CallSid, "queued": True}
+
+    async def run_once(self) -> bool:
+        # Ligações com mais webhooks na fila entram na próxima rodada
+        return await self.process_batch() > 0
+
+    async def process_batch(self) -> int:
+        """Reserva e aplica uma rodada de webhooks. Retorna quantos foram reservados."""
+        ids = await self._claim()
+        await asyncio.gather(*(self._process(id) for id in ids))
+        return len(ids)
+
+    async def apply_pending(self, call_id: str) -> int:
+        """Aplica agora, em ordem, os webhooks pendentes de uma ligação.
+
+        Usado pelas rotas que decidem pelo estado da ligação (`/dial`, `/hold`)
+        para não responder com um estado atrasado quando o consumidor está
+        com a fila acumulada. Webhooks reservados por outro worker ou
+        esperando o backoff ficam para o consumidor.
+
+        Returns:
+            int: quantidade de webhooks aplicados
+        """
+        applied = 0
+        while ids := await self._claim(call_id):
+            if not await self._process(ids[0]):
+                break
+            applied += 1
+        return applied
+
+    async def drain(self) -> int:
+        """Aplica tudo o que está disponível na fila (usado no replay)."""
+        total = 0
+        while processed := await self.process_batch():
+            total += processed
+        return total
+
+    async def _claim(self, call_id: Optional[str] = None) -> List[int]:
+        now = create_timestamp()
+        earlier = aliased(WebhookInbox)
+        async with self.session_maker() as session:
+            query = (
+                select(WebhookInbox)
+                .where(
+                    WebhookInbox.processed_at.is_(None),
+                    WebhookInbox.next_attempt_at <= now,
+                    # Só o webhook pendente mais antigo de cada ligação
+                    ~exists().where(
+                        earlier.call_id == WebhookInbox.call_id,
+                        earlier.id < WebhookInbox.id,
+                        earlier.processed_at.is_(None),
+                        earlier.next_attempt_at.is_not(None),
+                    ),
+                )
+                .order_by(WebhookInbox.id)
+                .limit(self.concurrency)
+                .with_for_update(skip_locked=True)
+            )
+            if call_id is not None:
+                query = query.where(WebhookInbox.call_id == call_id)
+            webhooks = (await session.exec(query)).all()
+
+            lease = now + timedelta(seconds=self.lease_seconds)
+            for webhook in webhooks:
+                webhook.next_attempt_at = lease
+                session.add(webhook)
+            await session.commit()
+            return [webhook.id for webhook in webhooks]
+
+    async def _process(self, id: int) -> bool:
+        """Aplica um webhook reservado. Retorna False quando ele falhou."""
+        async with self.session_maker() as session:
+            webhook = await session.get(WebhookInbox, id)
+            try:
+                model, process = PROCESSORS[webhook.route]
+                payload = model.from_form(webhook.form)
+
+                # Marcado na mesma transação em que o webhook é aplicado
+                webhook.attempts += 1
+                webhook.processed_at = create_timestamp()
+                webhook.last_error = None
+                session.add(webhook)
+
+                result = await process(session, webhook.call_id, payload)
+                if isinstance(result, tuple):
+                    # `TwilioCall` ainda não visível (o webhook chegou antes
+                    # do commit de quem criou a ligação): tenta de novo depois
+                    error, status_code = result
+                    raise WebhookNotReady(f"{status_code}: {error.get('error')}")
+                await session.commit()
+                self.processed += 1
+                return True
+            except Exception as e:
+                await session.rollback()
+                await self._record_failure(session, id, e)
+                return False
+
+    def backoff(self, attempts: int) -> float:
+        return backoff(attempts, self.backoff_base, self.backoff_max)
+
+    async def _record_failure(self, session, id: int, error: Exception):
+        webhook = await session.get(WebhookInbox, id)
+        webhook.attempts += 1
+        webhook.last_error = str(error) or type(error).__name__
+
+        # Transição inválida não se resolve tentando de novo
+        if isinstance(error, MachineError) or webhook.attempts >= self.max_attempts:
+            webhook.next_attempt_at = None
+            self.failed += 1
+            logger.error(
+                "Webhook %s (%s) failed after %d attempts: %s",
+                id, webhook.route, webhook.attempts, webhook.last_error,
+                extra={"call_id": webhook.call_id},
+            )
+        else:
+            webhook.next_attempt_at = create_timestamp() + timedelta(
+                seconds=self.backoff(webhook.attempts)
+            )
+            self.retried += 1
+
+        session.add(webhook)
+        await session.commit()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "ingested": self.ingested,
+            "processed": self.processed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+webhook_consumer = WebhookConsumer(
+    concurrency=settings.webhook_ingest_concurrency,
+    poll_interval=settings.webhook_ingest_poll_interval,
+    lease_seconds=settings.webhook_ingest_lease_seconds,
+    max_attempts=settings.webhook_ingest_max_attempts,
+    backoff_base=settings.webhook_ingest_backoff_base,
+    backoff_max=settings.webhook_ingest_backoff_max,
+)
+
+
+def replay(
+    session: Session,
+    call_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    processed: bool = False,
+) -> int:
+    """Devolve webhooks para a fila do `WebhookConsumer`.
+
+    Args:
+        session (Session): _description_
+        call_id (Optional[str]): só os webhooks desta ligação
+        since (Optional[datetime]): só os webhooks recebidos a partir desta data
+        processed (bool): inclui os já aplicados; por padrão só os que falharam
+
+    Returns:
+        int: quantidade de webhooks devolvidos para a fila
+    """
+    statement = update(WebhookInbox)
+    if not processed:
+        statement = statement.where(
+            WebhookInbox.processed_at.is_(None), WebhookInbox.next_attempt_at.is_(None)
+        )
+    if call_id is not None:
+        statement = statement.where(WebhookInbox.call_id == call_id)
+    if since is not None:
+        statement = statement.where(WebhookInbox.created_at >= since)
+
+    result = session.exec(
+        statement.values(
+            processed_at=None,
+            next_attempt_at=create_timestamp(),
+            attempts=0,
+            last_error=None,
+        )
+    )
+    session.commit()
+    return result.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprocessa webhooks do Twilio gravados no inbox")
+    parser.add_argument("--call-id", help="só os webhooks desta ligação")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="só os recebidos a partir desta data (ISO 8601)")
+    parser.add_argument("--processed", action="store_true", help="inclui os webhooks já aplicados")
+    parser.add_argument("--run", action="store_true", help="aplica os webhooks agora, neste processo")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        total = replay(session, call_id=args.call_id, since=args.since, processed=args.processed)
+    print(f"{total} webhooks devolvidos para a fila")
+
+    if args.run:
+        applied = asyncio.run(webhook_consumer.drain())
+        print(f"{applied} webhooks aplicados")
+
+
+if __name__ == "__main__":
+    main()
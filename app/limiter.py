@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, event, func, text
+from sqlalchemy.orm import Session
+from sqlmodel import select
+
+from app.config import settings
+from app.logger import get_logger
+from app.models import TargetSlot, create_timestamp
+from app.notify import pending_status_changes
+from app.status import TERMINAL_STATUS
+
+
+logger = get_logger(__name__)
+
+ACTIVE = "active"
+WAITING = "waiting"
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite devolve datetimes sem timezone
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class TargetLimiter:
+    """Limita quantos ativistas são conectados ao mesmo alvo ao mesmo tempo.
+
+    `acquire` é consultado pelo `dial()` antes de redirecionar: quando o alvo
+    já tem `max_concurrency` ligações, o ativista entra na fila de espera (em
+    ordem de chegada) e tenta de novo a cada volta do loop de espera. As vagas
+    são liberadas quando a ligação chega a um estado final: na própria
+    transação (`release`) ou só depois do commit (`release_committed`), ver
+    `_release_finished_calls`. Esta implementação base não limita nada.
+    """
+
+    def __init__(self, max_concurrency: int, active_ttl: float, waiting_ttl: float):
+        self.max_concurrency = max_concurrency
+        self.active_ttl = timedelta(seconds=active_ttl)
+        self.waiting_ttl = timedelta(seconds=waiting_ttl)
+
+    async def acquire(self, session, target: str, call_id: str) -> Tuple[bool, float]:
+        """Tenta ocupar uma vaga no alvo.
+
+        Args:
+            session (AsyncSession): sessão da requisição; o commit fica com quem chama
+            target (str): número do alvo
+            call_id (str): id da ligação lógica
+
+        Returns:
+            Tuple[bool, float]: se conseguiu a vaga e há quantos segundos está na fila
+        """
+        return True, 0.0
+
+    def release(self, session: Session, call_ids: List[str]):
+        """Libera as vagas dentro da transação que encerrou as ligações (before_commit)."""
+
+    def release_committed(self, call_ids: List[str]):
+        """Libera as vagas depois que o commit deu certo (after_commit)."""
+
+
+class MemoryTargetLimiter(TargetLimiter):
+    """Vagas por processo; só é exato com um único worker."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # alvo -> call_id -> [status, entrou na fila, último acesso]
+        self._slots: Dict[str, Dict[str, list]] = {}
+        self._targets: Dict[str, str] = {}
+
+    def _expire(self, slots: Dict[str, list], now: datetime):
+        for call_id, (status, _, seen) in list(slots.items()):
+            ttl = self.active_ttl if status == ACTIVE else self.waiting_ttl
+            if now - seen > ttl:
+                del slots[call_id]
+                self._targets.pop(call_id, None)
+
+    async def acquire(self, session, target: str, call_id: str) -> Tuple[bool, float]:
+        now = create_timestamp()
+        slots = self._slots.setdefault(target, {})
+        self._expire(slots, now)
+
+        slot = slots.setdefault(call_id, [WAITING, now, now])
+        self._targets[call_id] = target
+        slot[2] = now
+        if slot[0] == ACTIVE:
+            return True, 0.0
+
+        active = sum(1 for status, _, _ in slots.values() if status == ACTIVE)
+        ahead = sum(
+            1 for status, created, _ in slots.values()
+            if status == WAITING and created < slot[1]
+        )
+        if active + ahead < self.max_concurrency:
+            slot[0] = ACTIVE
+            return True, 0.0
+        return False, (now - slot[1]).total_seconds()
+
+    def release_committed(self, call_ids: List[str]):
+        # Fora da transação: um rollback depois daqui não devolveria a vaga
+        for call_id in call_ids:
+            target = self._targets.pop(call_id, None)
+            slots = self._slots.get(target)
+            if slots is None:
+                continue
+            slots.pop(call_id, None)
+            if not slots:
+                del self._slots[target]
+
+
+class TableTargetLimiter(TargetLimiter):
+    """Vagas na tabela `phone_target_slots`, compartilhadas entre os workers.
+
+    No Postgres, `pg_advisory_xact_lock` serializa as reservas do mesmo alvo
+    até o commit da transação da requisição.
+    """
+
+    async def acquire(self, session, target: str, call_id: str) -> Tuple[bool, float]:
+        if session.get_bind().dialect.name == "postgresql":
+            await session.exec(
+                text("SELECT pg_advisory_xact_lock(hashtext(:target))"),
+                params={"target": target},
+            )
+
+        now = create_timestamp()
+        slot = await session.get(TargetSlot, call_id)
+        if slot is None:
+            slot = TargetSlot(call_id=call_id, target=target, created_at=now)
+        slot.updated_at = now
+        session.add(slot)
+        if slot.status == ACTIVE:
+            return True, 0.0
+
+        query = select(
+            func.count().filter(
+                TargetSlot.status == ACTIVE,
+                TargetSlot.updated_at > now - self.active_ttl,
+            ),
+            func.count().filter(
+                TargetSlot.status == WAITING,
+                TargetSlot.updated_at > now - self.waiting_ttl,
+                TargetSlot.created_at < slot.created_at,
+            ),
+        ).where(TargetSlot.target == target, TargetSlot.call_id != call_id)
+        active, ahead = (await session.exec(query)).one()
+
+        if active + ahead < self.max_concurrency:
+            slot.status = ACTIVE
+            return True, 0.0
+        return False, (now - _aware(slot.created_at)).total_seconds()
+
+    def release(self, session: Session, call_ids: List[str]):
+        session.execute(delete(TargetSlot).where(TargetSlot.call_id.in_(call_ids)))
+
+
+def create_target_limiter(mode: str) -> TargetLimiter:
+    limiter_class = {
+        "table": TableTargetLimiter,
+        "memory": MemoryTargetLimiter,
+        "off": TargetLimiter,
+    }[mode]
+    return limiter_class(
+        max_concurrency=settings.target_max_concurrency,
+        active_ttl=settings.target_slot_ttl,
+        # Quem está na fila volta a cada `target_hold_pause` segundos
+        waiting_ttl=3 * settings.target_hold_pause,
+    )
+
+
+target_limiter = create_target_limiter(settings.target_limiter_mode)
+
+
+_finished_key = "finished_target_calls"
+
+
+@event.listens_for(Session, "before_commit")
+def _release_finished_calls(session: Session):
+    finished = [
+        call_id
+        for call_id, status in pending_status_changes(session).items()
+        if status in TERMINAL_STATUS
+    ]
+    if finished:
+        target_limiter.release(session, finished)
+        session.info[_finished_key] = finished
+
+
+@event.listens_for(Session, "after_commit")
+def _release_committed_calls(session: Session):
+    finished = session.info.pop(_finished_key, None)
+    if finished:
+        target_limiter.release_committed(finished)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_finished_calls(session: Session):
+    session.info.pop(_finished_key, None)
@@ -1,14 +1,160 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import re
+from typing import Any, Mapping, Optional
+
 from app.config import settings
 
-def get_logger(name):
-    logging.basicConfig(
-        level=settings.get_log_level,
-        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+
+# Atributos padrão do LogRecord; o que sobrar veio de `extra=` e vai para o JSON
+_RECORD_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime", "taskName"}
+
+# Números de telefone no formato E.164 (+ e 10 a 15 dígitos). Sequências de
+# dígitos sem "+" (SIDs, ids, timestamps) não são mascaradas
+_PHONE_RE = re.compile(r"(?<![\w+])\+\d{6,11}(\d{4})\b")
+
+# Campos que sempre têm telefone, mascarados mesmo fora do formato E.164
+_PHONE_FIELDS = frozenset(
+    ("From", "To", "Called", "Caller", "ForwardedFrom", "phone", "from_number", "to_number")
+)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configured = False
+
+
+def redact(value: Any) -> Any:
+    """Mascara números de telefone, mantendo apenas os 4 últimos dígitos."""
+    if isinstance(value, str):
+        return _PHONE_RE.sub(r"***\1", value)
+    if isinstance(value, Mapping):
+        return {
+            k: _mask(v) if k in _PHONE_FIELDS and isinstance(v, str) else redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+def _mask(phone: str) -> str:
+    return "***" + phone[-4:] if len(phone) > 4 else phone
+
+
+class RedactingFilter(logging.Filter):
+    """Remove números de telefone da mensagem e dos campos extras."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Com QueueListener a mensagem já chega formatada pelo `QueueHandler.prepare`
+        record.msg = redact(record.getMessage())
+        record.args = None
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                record.__dict__[key] = redact(value)
+        return True
+
+
+def _extra(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in record.__dict__.items() if k not in _RECORD_ATTRS}
+
+
+class TextFormatter(logging.Formatter):
+    """Formato texto tradicional, com os campos de `extra=` ao final."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        extra = _extra(record)
+        if extra:
+            text += " " + " ".join(f"{k}={v}" for k, v in extra.items())
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos passados em `extra=`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(_extra(record))
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def configure_logging():
+    """Configura o logging raiz uma única vez por processo.
+
+    Com `log_async` os registros são enfileirados por um `QueueHandler`. O
+    `QueueHandler.prepare` ainda monta a mensagem (`msg % args`) e copia o
+    registro no event loop; a redação, o formatter (texto ou JSON) e a escrita
+    no stdout acontecem na thread do `QueueListener`.
+    """
+    global _configured, _listener
+    if _configured:
+        return
+    _configured = True
+
+    handler = logging.StreamHandler()
+    if settings.log_format == "json":
+        handler.setFormatter(JsonFormatter(datefmt="%Y-%m-%dT%H:%M:%S%z"))
+    else:
+        handler.setFormatter(
+            TextFormatter(
+                "%(asctime)s - %(levelname)s - %(name)s - %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S",
+            )
+        )
+    if settings.log_redact_phones:
+        handler.addFilter(RedactingFilter())
+
+    root = logging.getLogger()
+    root.setLevel(settings.get_log_level)
+
+    if settings.log_async:
+        _listener = logging.handlers.QueueListener(
+            queue.SimpleQueue(), handler, respect_handler_level=True
+        )
+        root.addHandler(logging.handlers.QueueHandler(_listener.queue))
+        _listener.start()
+        atexit.register(_listener.stop)
+    else:
+        root.addHandler(handler)
+
     logging.getLogger("uvicorn").setLevel(logging.INFO)
     logging.getLogger("uvicorn.access").setLevel(logging.INFO)
     logging.getLogger("uvicorn.error").setLevel(logging.WARNING)
 
-    return logging.getLogger(name)
\ No newline at end of file
+
+def get_logger(name):
+    configure_logging()
+    return logging.getLogger(name)
+
+
+def log_payload(logger: logging.Logger, route: str, payload: Mapping[str, Any]):
+    """Registra o payload de um webhook, amostrado por rota.
+
+    A taxa vem de `log_payload_sample_rates[route]` (ou `log_payload_sample_rate`)
+    e o payload só é copiado quando o registro vai de fato ser emitido.
+
+    Args:
+        logger (logging.Logger): _description_
+        route (str): nome da rota, ex.: "status-callback"
+        payload (Mapping[str, Any]): formulário recebido do Twilio
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+
+    rate = settings.log_payload_sample_rates.get(route, settings.log_payload_sample_rate)
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return
+
+    logger.info("/%s ->> payload", route, extra={"route": route, "payload": dict(payload)})
@@ -1,46 +1,90 @@
-from typing import List
-from transitions import Machine
+from typing import Dict, List, Tuple
+from transitions import MachineError
 
 from .enum import CallState
+from .metrics import CALL_TRANSITIONS
+from .notify import notify_status
+
+
+# Tabela de transições (trigger, origem, destino). "*" representa qualquer
+# estado; para o mesmo trigger e origem vale a primeira transição declarada.
+TRANSITIONS: List[Tuple[str, CallState | str, CallState]] = [
+    # Origem
+    ("call", CallState.INITIATED, CallState.RINGING),
+    ("attend", CallState.RINGING, CallState.ANSWERED),
+    ("connect", CallState.ANSWERED, CallState.REDIRECTING),
+
+    # Destino
+    ("dial_call", CallState.REDIRECTING, CallState.DESTINATION_RINGING),
+    ("dial_attend", CallState.DESTINATION_RINGING, CallState.DESTINATION_ANSWERED),
+    ("dial_connect", CallState.DESTINATION_ANSWERED, CallState.CONNECTED),
+
+    # Variações de Caixa postal e Ocupado
+    ("voicemail", CallState.ANSWERED, CallState.FAILED),
+    ("dial_voicemail", CallState.DESTINATION_ANSWERED, CallState.NO_ANSWERED),
+
+    # Estado final
+    ("fail", "*", CallState.FAILED),  # TODO: Mapear melhor as falhas
+    ("complete", CallState.CONNECTED, CallState.COMPLETED),
+    ("complete", CallState.COMPLETED, CallState.COMPLETED),
+    ("complete", "*", CallState.FAILED),
+]
+
+
+def compile_transitions(
+    transitions: List[Tuple[str, CallState | str, CallState]],
+) -> Dict[str, Dict[CallState, CallState]]:
+    """Monta o índice trigger -> {origem: destino} usado pela CallMachine."""
+    table: Dict[str, Dict[CallState, CallState]] = {}
+    for trigger, source, dest in transitions:
+        sources = CallState if source == "*" else (source,)
+        for state in sources:
+            table.setdefault(trigger, {}).setdefault(state, dest)
+    return table
+
 
 class CallMachine:
+    """Máquina de estados da ligação lógica (`Call`).
+
+    O grafo de estados é compilado uma única vez por processo em
+    `CallMachine.table`; cada instância só guarda a ligação e o estado atual,
+    então criar uma máquina por webhook é barato.
+    """
+
     states: List[CallState] = [s for s in CallState]
-    
+    table: Dict[str, Dict[CallState, CallState]] = compile_transitions(TRANSITIONS)
+
+    __slots__ = ("model", "state")
+
     def __init__(self, call):
         self.model = call
-        self.machine = Machine(
-            model=self,
-            states=self.states,
-            initial=call.state,
-            after_state_change="on_any_transition"
-        )
-        
-        # Origem
-        self.machine.add_transition("call", CallState.INITIATED, CallState.RINGING)
-        self.machine.add_transition("attend", CallState.RINGING, CallState.ANSWERED)
-        self.machine.add_transition("connect", CallState.ANSWERED, CallState.REDIRECTING)
-
-        # Destino
-        self.machine.add_transition("dial_call", CallState.REDIRECTING, CallState.DESTINATION_RINGING)
-        self.machine.add_transition("dial_attend", CallState.DESTINATION_RINGING, CallState.DESTINATION_ANSWERED)
-        self.machine.add_transition("dial_connect", CallState.DESTINATION_ANSWERED, CallState.CONNECTED)
-
-        # Variações de Caixa postal e Ocupado
-        self.machine.add_transition("voicemail", CallState.ANSWERED, CallState.FAILED)
-        self.machine.add_transition("dial_voicemail", CallState.DESTINATION_ANSWERED, CallState.NO_ANSWERED)
-
-        # Estado final
-        self.machine.add_transition("fail", "*", CallState.FAILED)  # TODO: Mapear melhor as falhas
-        self.machine.add_transition("complete", CallState.CONNECTED, CallState.COMPLETED, conditions=["is_connected"])
-        self.machine.add_transition("complete", CallState.COMPLETED, CallState.COMPLETED, conditions=["is_completed"])
-        self.machine.add_transition("complete", "*", CallState.FAILED)
-
-    def is_connected(self):
-        return self.model.state == CallState.CONNECTED
-
-    def is_completed(self):
-        return self.model.state == CallState.COMPLETED
+        self.state = CallState(call.state)
+
+    def trigger(self, event: str) -> bool:
+        dest = self.table[event].get(self.state)
+        if dest is None:
+            raise MachineError(
+                f"Can't trigger event {event} from state {self.state.name}!"
+            )
+
+        CALL_TRANSITIONS.labels(self.state.value, dest.value).inc()
+        self.state = dest
+        self.on_any_transition()
+        return True
 
     def on_any_transition(self):
         """Persistir no banco de dados"""
-        self.model.state = self.state
\ No newline at end of file
+        self.model.state = self.state
+        notify_status(self.model)
+
+
+def _make_trigger(event: str):
+    def trigger(self) -> bool:
+        return self.trigger(event)
+
+    trigger.__name__ = event
+    return trigger
+
+
+for _event in CallMachine.table:
+    setattr(CallMachine, _event, _make_trigger(_event))
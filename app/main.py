@@ -1,10 +1,56 @@
 # app/main.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
+from app.db import AsyncSessionDep, async_engine
+from app.dispatch import batch_dispatcher
+from app.events import event_writer
+from app.graphql import graphql_session
+from app.ingest import webhook_consumer
+from app.metrics import MetricsMiddleware, metrics_response
+from app.notify import status_broker
+from app.outbox import outbox_worker
+from app.reaper import call_reaper
+from app.signature import TwilioSignatureMiddleware
+from app.twilio import http_client as twilio_http_client
+from app.api.routes.batch import router as batch_router
 from app.api.routes.call import router as call_router
 
-app = FastAPI(title=settings.app_name, debug=settings.debug)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # O desligamento roda mesmo se a inicialização ou a aplicação falharem;
+    # senão as tasks em background mantêm o processo vivo
+    try:
+        await event_writer.start()
+        await status_broker.start(settings.get_async_database_url)
+        await graphql_session.connect()
+        await outbox_worker.start()
+        if settings.batch_dispatch_enabled:
+            await batch_dispatcher.start()
+        if settings.call_reaper_enabled:
+            await call_reaper.start()
+        if settings.webhook_ingest_enabled:
+            await webhook_consumer.start()
+        yield
+    finally:
+        await webhook_consumer.stop()
+        await call_reaper.stop()
+        await batch_dispatcher.stop()
+        await outbox_worker.stop()
+        await status_broker.stop()
+        await event_writer.stop()
+        # Fecha as conexões dos pools assíncronos ao desligar o worker
+        await graphql_session.close()
+        await twilio_http_client.close()
+        await async_engine.dispose()
+
+
+app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,8 +60,31 @@ app.add_middleware(
     allow_headers=["*"],  # permite todos os headers
 )
 
+app.add_middleware(TwilioSignatureMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # Prefixo para versão da API
 app.include_router(call_router, prefix="/v1")
+app.include_router(batch_router, prefix="/v1")
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
+
+@app.get("/health", include_in_schema=False)
+async def health(session: AsyncSessionDep):
+    checks = {"database": True, "graphql": await graphql_session.health()}
+    try:
+        await session.exec(text("SELECT 1"))
+    except Exception:
+        checks["database"] = False
+
+    return JSONResponse(
+        {name: "ok" if ok else "error" for name, ok in checks.items()},
+        status_code=200 if all(checks.values()) else 503,
+    )
 
 
 @app.get("/")
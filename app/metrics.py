@@ -0,0 +1,195 @@
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP por rota",
+    ["method", "route", "status"],
+)
+
+CALL_TRANSITIONS = Counter(
+    "call_machine_transitions_total",
+    "Transições da CallMachine por estado de origem e destino",
+    ["source", "dest"],
+)
+
+WEBHOOK_DUPLICATES = Counter(
+    "twilio_webhook_duplicates_total",
+    "Webhooks do Twilio repetidos ou fora de ordem descartados",
+    ["route", "source"],
+)
+
+TWILIO_LATENCY = Histogram(
+    "twilio_request_duration_seconds",
+    "Latência das requisições à API do Twilio",
+    ["method", "status"],
+)
+
+GRAPHQL_LATENCY = Histogram(
+    "graphql_request_duration_seconds",
+    "Latência das requisições à API GraphQL do BONDE",
+    ["operation"],
+)
+
+DB_SESSION_SECONDS = Histogram(
+    "db_session_duration_seconds",
+    "Tempo de vida das sessões de banco de dados por requisição",
+)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede a latência de cada requisição.
+
+    Usa o template da rota (`/v1/phone/status/{call_id}`) como label para
+    manter a cardinalidade baixa.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                route.path if route else "unmatched",
+                status,
+            ).observe(time.perf_counter() - start)
+
+
+class RuntimeCollector:
+    """Exporta, no momento da coleta, o estado de componentes em memória
+    (pool do banco, cache de widgets e fila de eventos)."""
+
+    def describe(self):
+        # Evita que o registry chame `collect` já no registro
+        return []
+
+    def collect(self):
+        # Import tardio para evitar import circular com os módulos medidos
+        from app.db import pool_stats
+        from app.events import event_writer
+        from app.graphql import widget_cache
+        from app.outbox import outbox_worker
+        from app.dispatch import batch_dispatcher
+        from app.reaper import call_reaper
+        from app.ingest import webhook_consumer
+        from app.status import status_cache
+
+        pool = pool_stats()
+        if pool:
+            yield GaugeMetricFamily("db_pool_checked_out", "Conexões em uso no pool", value=pool["checked_out"])
+            yield GaugeMetricFamily("db_pool_saturation", "Fração do pool em uso (pool_size + max_overflow)", value=pool["saturation"])
+            yield CounterMetricFamily("db_pool_checkout_wait_seconds", "Tempo total esperando conexões do pool", value=pool["checkout_wait_total"])
+            yield GaugeMetricFamily("db_pool_checkout_wait_max_seconds", "Maior espera por uma conexão do pool", value=pool["checkout_wait_max"])
+            yield CounterMetricFamily("db_pool_checkout_timeouts", "Checkouts que estouraram o pool_timeout", value=pool["checkout_timeouts"])
+
+        cache = widget_cache.stats()
+        yield CounterMetricFamily("widget_cache_hits", "Acertos do cache de widgets", value=cache["hits"])
+        yield CounterMetricFamily("widget_cache_misses", "Faltas do cache de widgets", value=cache["misses"])
+        yield GaugeMetricFamily("widget_cache_size", "Widgets em cache", value=cache["size"])
+
+        cache = status_cache.stats()
+        yield CounterMetricFamily("status_cache_hits", "Acertos do cache de status", value=cache["hits"])
+        yield CounterMetricFamily("status_cache_misses", "Faltas do cache de status", value=cache["misses"])
+        yield GaugeMetricFamily("status_cache_size", "Status de ligações em cache", value=cache["size"])
+
+        events = event_writer.stats()
+        yield GaugeMetricFamily("event_writer_queue_depth", "Eventos aguardando gravação", value=events["depth"])
+        yield CounterMetricFamily("event_writer_flushed", "Eventos gravados em lote", value=events["flushed"])
+        yield CounterMetricFamily("event_writer_retried", "Lotes de eventos gravados de novo após erro", value=events["retried"])
+        yield CounterMetricFamily("event_writer_dropped", "Eventos descartados por erro na gravação", value=events["dropped"])
+        yield GaugeMetricFamily("event_writer_last_flush_seconds", "Duração do último lote gravado", value=events["last_flush_seconds"])
+
+        outbox = outbox_worker.stats()
+        yield CounterMetricFamily("widget_action_outbox_sent", "Ações enviadas para a API do BONDE", value=outbox["sent"])
+        yield CounterMetricFamily("widget_action_outbox_retried", "Envios de ações reagendados após falha", value=outbox["retried"])
+        yield CounterMetricFamily("widget_action_outbox_failed", "Ações descartadas após o máximo de tentativas", value=outbox["failed"])
+
+        dispatch = batch_dispatcher.stats()
+        yield CounterMetricFamily("batch_calls_dispatched", "Ligações de campanha disparadas no Twilio", value=dispatch["dispatched"])
+        yield CounterMetricFamily("batch_calls_failed", "Ligações de campanha que falharam ao disparar", value=dispatch["failed"])
+        yield GaugeMetricFamily("batch_dispatcher_leader", "1 se este worker é o líder que dispara as campanhas", value=dispatch["leader"])
+
+        reaper = call_reaper.stats()
+        yield CounterMetricFamily("call_reaper_reaped", "Ligações presas encerradas pelo reaper", value=reaper["reaped"])
+
+        inbox = webhook_consumer.stats()
+        yield CounterMetricFamily("webhook_inbox_ingested", "Webhooks gravados no inbox", value=inbox["ingested"])
+        yield CounterMetricFamily("webhook_inbox_processed", "Webhooks do inbox aplicados", value=inbox["processed"])
+        yield CounterMetricFamily("webhook_inbox_retried", "Webhooks do inbox reagendados após falha", value=inbox["retried"])
+        yield CounterMetricFamily("webhook_inbox_failed", "Webhooks do inbox descartados após falha", value=inbox["failed"])
+
+
+class WorkerCollector:
+    """Adiciona o label `pid` às métricas de outro coletor.
+
+    O estado em memória do `RuntimeCollector` é de cada worker e não passa pelo
+    `MultiProcessCollector`; com o `pid` as séries de workers diferentes não se
+    misturam (um contador não "zera" quando outro worker responde a coleta).
+    """
+
+    def __init__(self, collector):
+        self.collector = collector
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        pid = str(os.getpid())
+        for family in self.collector.collect():
+            family.samples = [
+                sample._replace(labels={**sample.labels, "pid": pid})
+                for sample in family.samples
+            ]
+            yield family
+
+
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    REGISTRY.register(RuntimeCollector())
+
+
+def metrics_response() -> Response:
+    """Resposta do `/metrics`.
+
+    Com vários workers (`PROMETHEUS_MULTIPROC_DIR` definido, ver Dockerfile)
+    os contadores e histogramas são agregados entre todos os processos. Já as
+    métricas do `RuntimeCollector` (pool, caches, filas e workers em
+    background) são só do worker que respondeu a coleta, com o label `pid`.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        registry.register(WorkerCollector(RuntimeCollector()))
+    else:
+        registry = REGISTRY
+
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
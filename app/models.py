@@ -1,7 +1,7 @@
 import uuid
 from typing import List, Optional
 from datetime import datetime, timezone
-from sqlalchemy import Column, DateTime, func, JSON
+from sqlalchemy import Column, DateTime, Index, UniqueConstraint, func, JSON, text
 
 from sqlmodel import SQLModel, Field, Relationship
 
@@ -11,15 +11,84 @@ from app.enum import CallState, TwilioCallStatus, TwilioAnsweredBy, EventType
 def create_timestamp():
     return datetime.now(timezone.utc)
 
+
+# Estados em que a ligação lógica já terminou
+FINAL_CALL_STATES = (CallState.FAILED, CallState.NO_ANSWERED, CallState.COMPLETED)
+
+# Ligações ainda em andamento (usado no índice parcial de phone_calls)
+ACTIVE_CALL_CLAUSE = text("state NOT IN ('failed', 'no-answered', 'completed')")
+
+# Relacionamentos nunca são carregados sob demanda (lazy load): com a sessão
+# assíncrona isso quebraria, e em listagens vira N+1. Cada consulta diz o que
+# precisa com `joinedload`/`selectinload` (ver `app.queries`); acessar um
+# relacionamento não carregado levanta erro em vez de emitir um SELECT
+RAISE_ON_SQL = {"lazy": "raise_on_sql"}
+
+# Ligações de campanha ainda não disparadas no Twilio
+PENDING_DISPATCH_CLAUSE = text("batch_id IS NOT NULL AND dispatched_at IS NULL")
+
+
+class CallBatch(SQLModel, table=True):
+    """Campanha de ligações criada por `POST /calls/batch`."""
+    __tablename__ = "phone_call_batches"
+
+    id: str | None = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    widget_id: int
+    total: int
+
+    created_at: Optional[datetime] = Field(default_factory=create_timestamp)
+    updated_at: Optional[datetime] = Field(
+        default_factory=create_timestamp,
+        sa_column=Column(
+            DateTime(timezone=True), onupdate=func.now(), default=func.now()
+        )
+    )
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
 class Call(SQLModel, table=True):
     __tablename__ = "phone_calls"
+    __table_args__ = (
+        Index("ix_phone_calls_state_updated_at", "state", "updated_at"),
+        Index("ix_phone_calls_created_at", "created_at"),
+        Index(
+            "ix_phone_calls_active_updated_at",
+            "updated_at",
+            postgresql_where=ACTIVE_CALL_CLAUSE,
+            sqlite_where=ACTIVE_CALL_CLAUSE,
+        ),
+        Index(
+            "ix_phone_calls_active_to_number",
+            "to_number",
+            postgresql_where=ACTIVE_CALL_CLAUSE,
+            sqlite_where=ACTIVE_CALL_CLAUSE,
+        ),
+        Index(
+            "ix_phone_calls_pending_dispatch",
+            "created_at",
+            postgresql_where=PENDING_DISPATCH_CLAUSE,
+            sqlite_where=PENDING_DISPATCH_CLAUSE,
+        ),
+    )
 
     id: str | None = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     state: CallState = Field(sa_column=CallState.Column(), default=CallState.INITIATED)
     from_number: str
     to_number: str
 
-    twilio_calls: List["TwilioCall"] = Relationship(back_populates="parent_call")
+    # Ligações de campanha são disparadas depois pelo BatchDispatcher
+    batch_id: str | None = Field(default=None, foreign_key="phone_call_batches.id", index=True)
+    dispatched_at: Optional[datetime] = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
+    # Ativista da campanha, até o disparo gravar a ação no outbox
+    activist: Optional[dict] = Field(default=None, sa_column=Column(JSON, nullable=True))
+
+    twilio_calls: List["TwilioCall"] = Relationship(
+        back_populates="parent_call", sa_relationship_kwargs=RAISE_ON_SQL
+    )
     
     created_at: Optional[datetime] = Field(default_factory=create_timestamp)
     updated_at: Optional[datetime] = Field(
@@ -40,10 +109,17 @@ class TwilioCall(SQLModel, table=True):
     status: TwilioCallStatus = Field(sa_column=TwilioCallStatus.Column())
     direction: str | None = Field(default=None)
     answered_by: TwilioAnsweredBy | None = Field(sa_column=TwilioAnsweredBy.Column(), default=None)
+    # Último `SequenceNumber` de status callback aplicado; entregas repetidas
+    # ou fora de ordem são descartadas
+    sequence_number: int | None = Field(default=None)
     
     parent_call_id: str = Field(foreign_key="phone_calls.id", index=True)
-    parent_call: Call = Relationship(back_populates="twilio_calls")
-    events: List["TwilioCallEvent"] = Relationship(back_populates="twilio_call")
+    parent_call: Call = Relationship(
+        back_populates="twilio_calls", sa_relationship_kwargs=RAISE_ON_SQL
+    )
+    events: List["TwilioCallEvent"] = Relationship(
+        back_populates="twilio_call", sa_relationship_kwargs=RAISE_ON_SQL
+    )
 
     created_at: Optional[datetime] = Field(default_factory=create_timestamp)
     updated_at: Optional[datetime] = Field(
@@ -58,16 +134,34 @@ class TwilioCall(SQLModel, table=True):
 
 class TwilioCallEvent(SQLModel, table=True):
     __tablename__ = "phone_twilio_call_events"
+    __table_args__ = (
+        # BRIN no Postgres: os eventos chegam em ordem de created_at
+        Index(
+            "ix_phone_twilio_call_events_created_at",
+            "created_at",
+            postgresql_using="brin",
+        ),
+        # Cada entrega do Twilio é gravada uma única vez
+        UniqueConstraint(
+            "twilio_call_sid",
+            "event_type",
+            "sequence_number",
+            name="uq_phone_twilio_call_events_sequence",
+        ),
+    )
     
     id: int | None = Field(default=None, primary_key=True)
     event_type: EventType = Field(sa_column=EventType.Column())
+    sequence_number: int | None = Field(default=None)
     twilio_response: dict | None = Field(
         default=None,
         sa_column=Column(JSON)
     )
     
     twilio_call_sid: str = Field(foreign_key="phone_twilio_calls.sid", index=True)
-    twilio_call: TwilioCall = Relationship(back_populates="events")
+    twilio_call: TwilioCall = Relationship(
+        back_populates="events", sa_relationship_kwargs=RAISE_ON_SQL
+    )
     
     created_at: Optional[datetime] = Field(default_factory=create_timestamp)
     updated_at: Optional[datetime] = Field(
@@ -81,8 +175,136 @@ class TwilioCallEvent(SQLModel, table=True):
         arbitrary_types_allowed = True
 
 
+class WidgetActionOutbox(SQLModel, table=True):
+    """Ação pendente de envio para a API do BONDE (`create_widget_action`).
+
+    Gravada na transação em que o Twilio aceita a ligação (`POST /call` ou
+    `BatchDispatcher`) e enviada depois pelo `app.outbox.OutboxWorker`.
+    `call_id` é único só neste outbox (uma ação por ligação); o BONDE o
+    recebe em `custom_fields.call` mas não deduplica por ele.
+    """
+    __tablename__ = "phone_widget_action_outbox"
+    __table_args__ = (
+        Index(
+            "ix_phone_widget_action_outbox_pending",
+            "next_attempt_at",
+            postgresql_where=text("sent_at IS NULL"),
+            sqlite_where=text("sent_at IS NULL"),
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    call_id: str = Field(unique=True)
+    widget_id: int
+    activist: dict = Field(sa_column=Column(JSON, nullable=False))
+    input: dict = Field(sa_column=Column(JSON, nullable=False))
+
+    attempts: int = Field(default=0)
+    next_attempt_at: Optional[datetime] = Field(
+        default_factory=create_timestamp,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+    )
+    sent_at: Optional[datetime] = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
+    last_error: str | None = Field(default=None)
+
+    created_at: Optional[datetime] = Field(default_factory=create_timestamp)
+    updated_at: Optional[datetime] = Field(
+        default_factory=create_timestamp,
+        sa_column=Column(
+            DateTime(timezone=True), onupdate=func.now(), default=func.now()
+        )
+    )
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class TargetSlot(SQLModel, table=True):
+    """Vaga de uma ligação no alvo (`to_number`), usada pelo `TableTargetLimiter`.
+
+    `status` é "active" enquanto o ativista está conectado (ou sendo conectado)
+    ao alvo e "waiting" enquanto aguarda na fila de espera.
+    """
+    __tablename__ = "phone_target_slots"
+    __table_args__ = (
+        Index("ix_phone_target_slots_target_status", "target", "status"),
+    )
+
+    call_id: str = Field(foreign_key="phone_calls.id", primary_key=True)
+    target: str
+    status: str = Field(default="waiting")
+
+    created_at: Optional[datetime] = Field(default_factory=create_timestamp)
+    updated_at: Optional[datetime] = Field(default_factory=create_timestamp)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+# Webhooks ainda não aplicados (inclui os que aguardam nova tentativa)
+PENDING_WEBHOOK_CLAUSE = text("processed_at IS NULL")
+
+
+class WebhookInbox(SQLModel, table=True):
+    """Webhook do Twilio recebido no modo de ingestão (`webhook_ingest_enabled`).
+
+    O formulário é gravado como chegou e o webhook é respondido na hora; o
+    `app.ingest.WebhookConsumer` aplica depois, em ordem de `id` por ligação.
+    `next_attempt_at` é NULL quando o consumidor desistiu do webhook.
+    """
+    __tablename__ = "phone_webhook_inbox"
+    __table_args__ = (
+        Index(
+            "ix_phone_webhook_inbox_pending",
+            "next_attempt_at",
+            postgresql_where=PENDING_WEBHOOK_CLAUSE,
+            sqlite_where=PENDING_WEBHOOK_CLAUSE,
+        ),
+        # Busca do webhook anterior da mesma ligação (ordem por ligação)
+        Index(
+            "ix_phone_webhook_inbox_call_pending",
+            "call_id",
+            "id",
+            postgresql_where=PENDING_WEBHOOK_CLAUSE,
+            sqlite_where=PENDING_WEBHOOK_CLAUSE,
+        ),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    call_id: str
+    route: str
+    form: dict = Field(sa_column=Column(JSON, nullable=False))
+
+    attempts: int = Field(default=0)
+    next_attempt_at: Optional[datetime] = Field(
+        default_factory=create_timestamp,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+    )
+    processed_at: Optional[datetime] = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
+    last_error: str | None = Field(default=None)
+
+    created_at: Optional[datetime] = Field(default_factory=create_timestamp)
+    updated_at: Optional[datetime] = Field(
+        default_factory=create_timestamp,
+        sa_column=Column(
+            DateTime(timezone=True), onupdate=func.now(), default=func.now()
+        )
+    )
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
 __all__ = [
     "Call",
+    "CallBatch",
+    "TargetSlot",
     "TwilioCall",
-    "TwilioCallEvent"
+    "TwilioCallEvent",
+    "WebhookInbox",
+    "WidgetActionOutbox",
 ]
\ No newline at end of file
@@ -0,0 +1,145 @@
+import asyncio
+import json
+from typing import Dict, Optional, Set
+
+import asyncpg
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, object_session
+
+from app.config import settings
+from app.logger import get_logger
+from app.status import public_status, publish_status
+
+
+logger = get_logger(__name__)
+
+CHANNEL = "call_status"
+
+_changes_key = "call_status_changes"
+
+
+class StatusBroker:
+    """Distribui as mudanças de status das ligações para quem está
+    acompanhando (`GET /v1/phone/status/{call_id}/stream`).
+
+    A distribuição é feita em memória. Com Postgres, os webhooks publicam via
+    `NOTIFY` (entregue só depois do commit) e cada worker repassa o que recebe
+    no `LISTEN` para seus assinantes, então a mudança chega a todos os workers.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, call_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(call_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, call_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(call_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[call_id]
+
+    def publish_local(self, call_id: str, status: str):
+        for queue in self._subscribers.get(call_id, ()):
+            queue.put_nowait(status)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        message = json.loads(payload)
+        publish_status(message["call_id"], message["status"])
+        self.publish_local(message["call_id"], message["status"])
+
+    async def start(self, url: str):
+        if make_url(url).get_backend_name() == "postgresql" and self._task is None:
+            self._task = asyncio.create_task(self._listen(url))
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _listen(self, url: str):
+        dsn = make_url(url).set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(CHANNEL, self._on_notify)
+                await closed.wait()
+                logger.warning("LISTEN call_status connection closed, reconnecting")
+            except asyncio.CancelledError:
+                if connection is not None:
+                    await connection.close()
+                raise
+            except Exception as e:
+                logger.warning("LISTEN call_status failed: %s", e)
+            await asyncio.sleep(1)
+
+
+status_broker = StatusBroker()
+
+
+def notify_status(call):
+    """Agenda a publicação do status público da ligação para o commit da
+    sessão em que ela está (chamado em `CallMachine.on_any_transition`)."""
+    session = object_session(call)
+    if session is None:
+        return
+    session.info.setdefault(_changes_key, {})[call.id] = public_status(call.state)
+
+
+def pending_status_changes(session: Session) -> Dict[str, Optional[str]]:
+    """Status públicos alterados na sessão e ainda não confirmados (call_id -> status)."""
+    return session.info.get(_changes_key, {})
+
+
+def _is_postgresql(session: Session) -> bool:
+    bind = session.get_bind()
+    return bind.dialect.name == "postgresql"
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_before_commit(session: Session):
+    changes = session.info.get(_changes_key)
+    if not changes or not _is_postgresql(session):
+        return
+
+    # O Postgres só entrega o NOTIFY quando a transação é confirmada
+    for call_id, status in changes.items():
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": CHANNEL, "payload": json.dumps({"call_id": call_id, "status": status})},
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session):
+    changes = session.info.pop(_changes_key, None)
+    if not changes:
+        return
+
+    postgresql = _is_postgresql(session)
+    for call_id, status in changes.items():
+        publish_status(call_id, status)
+        # No Postgres os assinantes recebem pelo LISTEN, em todos os workers
+        if not postgresql:
+            status_broker.publish_local(call_id, status)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session):
+    session.info.pop(_changes_key, None)
@@ -0,0 +1,205 @@
+import asyncio
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from gql import GraphQLRequest
+from gql.client import AsyncClientSession
+from gql.transport.exceptions import TransportQueryError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+
+from app.config import settings
+from app.db import async_session_maker
+from app.graphql import create_widget_action_gql, get_graphql_client
+from app.logger import get_logger
+from app.metrics import GRAPHQL_LATENCY
+from app.models import WidgetActionOutbox, create_timestamp
+from app.worker import Poller, backoff
+
+
+logger = get_logger(__name__)
+
+
+class OutboxWorker(Poller):
+    """Envia as ações do outbox (`WidgetActionOutbox`) para a API do BONDE.
+
+    O `POST /call` apenas grava a ação na mesma transação do `Call` e acorda o
+    worker, que agrupa as ações pendentes em uma única mutation. Cada lote é
+    reservado por `lease_seconds` em uma transação curta (SKIP LOCKED no
+    Postgres), então vários workers podem rodar ao mesmo tempo. Falhas são
+    reenviadas com backoff exponencial até `max_attempts`. Ao parar, as ações
+    continuam no banco e o próximo worker envia o que faltou.
+
+    A entrega é *at-least-once*: `call_id` é único no outbox (uma ação por
+    ligação) e vai para o BONDE em `custom_fields.call`, mas o BONDE não
+    deduplica por ele. Quando a API responde com erro por alias, só as ações
+    com erro voltam para a fila; se a mutation estoura o tempo (ou a conexão
+    cai) depois do BONDE ter gravado, o lote inteiro é reenviado e o BONDE
+    recebe ações duplicadas. Quem consome as ações deve deduplicar por
+    `custom_fields.call`. O envio e o registro do resultado não são
+    interrompidos quando o worker é cancelado, para não reenviar um lote já
+    aceito.
+    """
+
+    error_message = "Error processing widget action outbox: %s"
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_interval: float,
+        lease_seconds: float,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        session_maker: async_sessionmaker = async_session_maker,
+        get_client: Callable[[], Awaitable[AsyncClientSession]] = get_graphql_client,
+    ):
+        super().__init__(poll_interval)
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session_maker = session_maker
+        self.get_client = get_client
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def add(
+        self,
+        session,
+        call_id: str,
+        widget_id: int,
+        activist: Dict[str, Any],
+    ) -> WidgetActionOutbox:
+        """Grava a ação da ligação no outbox; ela é enviada depois do commit
+        da sessão, com o id da ligação em `custom_fields.call`."""
+        action = WidgetActionOutbox(
+            call_id=call_id,
+            widget_id=widget_id,
+            activist=activist,
+            input=dict(custom_fields=dict(call=call_id)),
+        )
+        session.add(action)
+        return action
+
+    async def run_once(self) -> bool:
+        # Lote cheio: provavelmente há mais ações esperando
+        return await self.process_batch() >= self.batch_size
+
+    async def process_batch(self) -> int:
+        """Reserva, envia e registra o resultado de um lote. Retorna o tamanho do lote."""
+        actions = await self._claim()
+        if not actions:
+            return 0
+
+        # Cancelado no meio do envio, o lote só seria reenviado depois da reserva
+        # expirar, e em duplicidade se o BONDE já o tivesse gravado
+        await asyncio.shield(self._send_and_record(actions))
+        return len(actions)
+
+    async def _send_and_record(self, actions: List[WidgetActionOutbox]):
+        errors = await self._send(actions)
+        await self._record(actions, errors)
+
+    async def _claim(self) -> List[WidgetActionOutbox]:
+        now = create_timestamp()
+        async with self.session_maker() as session:
+            query = (
+                select(WidgetActionOutbox)
+                .where(
+                    WidgetActionOutbox.sent_at.is_(None),
+                    WidgetActionOutbox.next_attempt_at <= now,
+                )
+                .order_by(WidgetActionOutbox.next_attempt_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            actions = (await session.exec(query)).all()
+
+            lease = now + timedelta(seconds=self.lease_seconds)
+            for action in actions:
+                action.next_attempt_at = lease
+                session.add(action)
+            await session.commit()
+            return actions
+
+    async def _send(self, actions: List[WidgetActionOutbox]) -> Dict[int, Optional[str]]:
+        """Envia o lote em uma única mutation. Retorna id -> erro (None quando enviada)."""
+        variables = {}
+        for i, action in enumerate(actions):
+            variables[f"activist{i}"] = action.activist
+            variables[f"widget_id{i}"] = action.widget_id
+            variables[f"input{i}"] = action.input
+
+        try:
+            client = await self.get_client()
+            with GRAPHQL_LATENCY.labels("create_widget_action").time():
+                await client.execute(
+                    GraphQLRequest(
+                        create_widget_action_gql(len(actions)),
+                        variable_values=variables,
+                    )
+                )
+        except TransportQueryError as e:
+            # Resultado parcial: só as ações com erro voltam para a fila
+            data = e.data or {}
+            messages = {
+                (error.get("path") or [None])[0]: error.get("message")
+                for error in e.errors or []
+            }
+            return {
+                action.id: (
+                    None
+                    if data.get(f"a{i}") is not None
+                    else messages.get(f"a{i}") or str(e)
+                )
+                for i, action in enumerate(actions)
+            }
+        except Exception as e:
+            # Resultado desconhecido (timeout, conexão): o BONDE pode ter gravado
+            # o lote, e o reenvio duplica as ações (ver docstring da classe)
+            return {action.id: str(e) or type(e).__name__ for action in actions}
+
+        return {action.id: None for action in actions}
+
+    def backoff(self, attempts: int) -> float:
+        return backoff(attempts, self.backoff_base, self.backoff_max)
+
+    async def _record(self, actions: List[WidgetActionOutbox], errors: Dict[int, Optional[str]]):
+        now = create_timestamp()
+        async with self.session_maker() as session:
+            for action in actions:
+                error = errors[action.id]
+                action.attempts += 1
+                action.last_error = error
+                if error is None:
+                    action.sent_at = now
+                    self.sent += 1
+                elif action.attempts >= self.max_attempts:
+                    # Desiste: fica no outbox com o último erro para análise
+                    action.next_attempt_at = None
+                    self.failed += 1
+                    logger.error(
+                        "Widget action %s failed after %d attempts: %s",
+                        action.call_id, action.attempts, error,
+                    )
+                else:
+                    action.next_attempt_at = now + timedelta(seconds=self.backoff(action.attempts))
+                    self.retried += 1
+                session.add(action)
+            await session.commit()
+
+    def stats(self) -> Dict[str, float]:
+        return {"sent": self.sent, "retried": self.retried, "failed": self.failed}
+
+
+outbox_worker = OutboxWorker(
+    batch_size=settings.outbox_batch_size,
+    poll_interval=settings.outbox_poll_interval,
+    lease_seconds=settings.outbox_lease_seconds,
+    max_attempts=settings.outbox_max_attempts,
+    backoff_base=settings.outbox_backoff_base,
+    backoff_max=settings.outbox_backoff_max,
+)
@@ -0,0 +1,114 @@
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Call, TwilioCall, create_timestamp
+
+
+def _select_twilio_call(sid: str):
+    # INNER JOIN: o `FOR UPDATE` não pode ser aplicado no lado nulo de um OUTER JOIN
+    return (
+        select(TwilioCall)
+        .options(joinedload(TwilioCall.parent_call, innerjoin=True))
+        .where(TwilioCall.sid == sid)
+    )
+
+
+async def get_twilio_call_for_update(
+    session: AsyncSession, sid: str
+) -> Tuple[Optional[TwilioCall], Optional[Call]]:
+    """Busca o `TwilioCall` e a ligação lógica (`Call`) em uma única consulta,
+    travando as linhas (`SELECT ... FOR UPDATE`) até o fim da transação.
+
+    Callbacks concorrentes da mesma ligação ficam serializados e nenhuma
+    transição da máquina de estados se perde.
+
+    Returns:
+        Tuple[TwilioCall | None, Call | None]
+    """
+    twilio_call = (await session.exec(_select_twilio_call(sid).with_for_update())).first()
+    return (twilio_call, twilio_call.parent_call) if twilio_call else (None, None)
+
+
+async def get_twilio_call(
+    session: AsyncSession, sid: str
+) -> Tuple[Optional[TwilioCall], Optional[Call]]:
+    """Como `get_twilio_call_for_update`, sem travar as linhas."""
+    twilio_call = (await session.exec(_select_twilio_call(sid))).first()
+    return (twilio_call, twilio_call.parent_call) if twilio_call else (None, None)
+
+
+async def get_calls_with_twilio_calls(
+    session: AsyncSession, call_ids: Sequence[str], events: bool = False
+) -> List[Call]:
+    """Ligações com seus `twilio_calls` (e, com `events`, os eventos de cada um).
+
+    Usa `selectinload`: uma consulta por nível do grafo, independente de
+    quantas ligações são carregadas.
+    """
+    loader = selectinload(Call.twilio_calls)
+    if events:
+        loader = loader.selectinload(TwilioCall.events)
+
+    statement = select(Call).where(Call.id.in_(call_ids)).options(loader)
+    return list((await session.exec(statement)).all())
+
+
+async def upsert_twilio_call(
+    session: AsyncSession,
+    sid: str,
+    parent_call_id: str,
+    status: str,
+    direction: Optional[str] = None,
+    answered_by: Optional[str] = None,
+    sequence_number: Optional[int] = None,
+) -> bool:
+    """Cria o `TwilioCall` ou atualiza `status`/`answered_by` caso ele já
+    exista, com `INSERT ... ON CONFLICT (sid) DO UPDATE`.
+
+    A atualização só acontece quando `sequence_number` é mais novo que o
+    último aplicado; entregas repetidas ou fora de ordem não mudam nada.
+
+    Returns:
+        bool: se a linha foi criada ou atualizada
+    """
+    insert = (
+        postgresql.insert
+        if session.bind.dialect.name == "postgresql"
+        else sqlite.insert
+    )
+    table = TwilioCall.__table__
+
+    statement = insert(table).values(
+        sid=sid,
+        parent_call_id=parent_call_id,
+        status=status,
+        direction=direction,
+        answered_by=answered_by,
+        sequence_number=sequence_number,
+        created_at=create_timestamp(),
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.sid],
+        set_={
+            "status": statement.excluded.status,
+            "answered_by": func.coalesce(
+                statement.excluded.answered_by, table.c.answered_by
+            ),
+            "sequence_number": func.coalesce(
+                statement.excluded.sequence_number, table.c.sequence_number
+            ),
+            "updated_at": func.now(),
+        },
+        where=or_(
+            statement.excluded.sequence_number.is_(None),
+            table.c.sequence_number.is_(None),
+            table.c.sequence_number < statement.excluded.sequence_number,
+        ),
+    )
+    result = await session.exec(statement.returning(table.c.sid))
+    return result.first() is not None
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from typing import Dict, List
+
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+
+from app.config import settings
+from app.db import async_session_maker
+from app.enum import CallState
+from app.logger import get_logger
+from app.machine import CallMachine
+from app.models import FINAL_CALL_STATES, Call, create_timestamp
+from app.worker import Poller
+
+
+logger = get_logger(__name__)
+
+# Ligação em andamento que parou de receber callbacks termina como concluída;
+# nos demais estados ela não chegou a conectar
+REAP_TRIGGERS: Dict[CallState, str] = {CallState.CONNECTED: "complete"}
+
+
+class CallReaper(Poller):
+    """Encerra ligações que ficaram presas em um estado não final.
+
+    Se o Twilio nunca entrega o callback final, a ligação fica em `RINGING`,
+    `REDIRECTING`, etc. para sempre e continua contando como ativa para o
+    `BatchDispatcher` e o `TargetLimiter`. A cada `interval` segundos o reaper
+    busca, estado por estado, ligações sem atualização há mais de
+    `timeouts[state]` segundos (índice `ix_phone_calls_state_updated_at`) e
+    dispara a transição `fail` (ou `complete`, ver `REAP_TRIGGERS`) em lotes
+    de até `batch_size`. As linhas são travadas com SKIP LOCKED no Postgres,
+    então vários workers podem rodar o reaper ao mesmo tempo.
+    """
+
+    error_message = "Error reaping stuck calls: %s"
+
+    def __init__(
+        self,
+        timeouts: Dict[str, float],
+        batch_size: int,
+        interval: float,
+        session_maker: async_sessionmaker = async_session_maker,
+    ):
+        super().__init__(interval)
+        self.timeouts = {
+            CallState(state): timedelta(seconds=seconds)
+            for state, seconds in timeouts.items()
+            if CallState(state) not in FINAL_CALL_STATES
+        }
+        self.batch_size = batch_size
+        self.session_maker = session_maker
+        self.reaped = 0
+
+    async def run_once(self) -> bool:
+        # Lote cheio: provavelmente há mais ligações presas
+        return await self.reap_batch() >= self.batch_size
+
+    async def reap_batch(self) -> int:
+        """Encerra um lote de ligações presas. Retorna quantas foram encerradas."""
+        now = create_timestamp()
+        reaped: List[Call] = []
+
+        async with self.session_maker() as session:
+            for state, timeout in self.timeouts.items():
+                limit = self.batch_size - len(reaped)
+                if limit <= 0:
+                    break
+
+                query = (
+                    select(Call)
+                    .where(Call.state == state, Call.updated_at < now - timeout)
+                    .order_by(Call.updated_at)
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                )
+                if state == CallState.INITIATED:
+                    # Ligações de campanha ainda na fila do BatchDispatcher
+                    query = query.where(
+                        or_(Call.batch_id.is_(None), Call.dispatched_at.is_not(None))
+                    )
+
+                for call in (await session.exec(query)).all():
+                    machine = CallMachine(call)
+                    getattr(machine, REAP_TRIGGERS.get(state, "fail"))()
+                    session.add(call)
+                    reaped.append(call)
+
+            await session.commit()
+
+        for call in reaped:
+            logger.info("Ligação presa encerrada como %s", call.state, extra={"call_id": call.id})
+
+        self.reaped += len(reaped)
+        return len(reaped)
+
+    def stats(self) -> Dict[str, float]:
+        return {"reaped": self.reaped}
+
+
+call_reaper = CallReaper(
+    timeouts=settings.call_state_timeouts,
+    batch_size=settings.call_reaper_batch_size,
+    interval=settings.call_reaper_interval,
+)
@@ -0,0 +1,148 @@
+"""Retenção dos eventos do Twilio (`phone_twilio_call_events`).
+
+Remove, em lotes, os eventos com `created_at` anterior ao período de retenção,
+opcionalmente arquivando cada lote em um arquivo JSON Lines antes de apagar.
+Os webhooks já aplicados do inbox (`phone_webhook_inbox`) seguem o mesmo período.
+Cada lote é uma transação curta, então o job pode rodar (via cron) com a API
+no ar sem segurar locks por muito tempo.
+
+    uv run python -m app.retention --days 180 --archive eventos.jsonl
+"""
+import argparse
+import json
+from datetime import timedelta
+from typing import Optional, TextIO
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func
+from sqlmodel import Session, delete, select
+
+from app.config import settings
+from app.db import engine
+from app.logger import get_logger
+from app.models import TwilioCallEvent, WebhookInbox, create_timestamp
+
+
+logger = get_logger(__name__)
+
+
+def purge_events(
+    session: Session,
+    older_than: timedelta,
+    batch_size: int = settings.event_retention_batch_size,
+    archive: Optional[TextIO] = None,
+) -> int:
+    """Apaga os eventos mais antigos que `older_than`.
+
+    Os lotes são faixas da chave primária: `id` cresce junto com
+    `created_at`, então os eventos vencidos ficam no início da tabela. Uma
+    única consulta (pelo índice BRIN de `created_at`) acha o maior `id`
+    vencido e cada lote percorre `batch_size` ids pela chave primária, sem
+    ordenar os eventos vencidos de novo a cada lote. Eventos gravados fora de
+    ordem depois desse `id` ficam para a próxima execução.
+
+    Args:
+        session (Session): _description_
+        older_than (timedelta): período de retenção
+        batch_size (int): faixa de ids apagada por transação
+        archive (Optional[TextIO]): arquivo que recebe os eventos apagados, um JSON por linha
+
+    Returns:
+        int: quantidade de eventos apagados
+    """
+    cutoff = create_timestamp() - older_than
+    expired = TwilioCallEvent.created_at < cutoff
+
+    max_id = session.exec(select(func.max(TwilioCallEvent.id)).where(expired)).one()
+    if max_id is None:
+        return 0
+    low = session.exec(select(func.min(TwilioCallEvent.id))).one()
+    total = 0
+
+    while low <= max_id:
+        high = min(low + batch_size - 1, max_id)
+        in_batch = (TwilioCallEvent.id >= low, TwilioCallEvent.id <= high, expired)
+
+        if archive is not None:
+            batch = session.exec(
+                select(TwilioCallEvent).where(*in_batch).order_by(TwilioCallEvent.id)
+            ).all()
+            for event in batch:
+                archive.write(json.dumps(jsonable_encoder(event.model_dump())) + "\n")
+            archive.flush()
+            session.expunge_all()
+
+        result = session.exec(delete(TwilioCallEvent).where(*in_batch))
+        session.commit()
+
+        total += result.rowcount
+        logger.info("Retention: %d TwilioCallEvent removidos", total)
+        low = high + 1
+
+    return total
+
+
+def purge_webhook_inbox(
+    session: Session,
+    older_than: timedelta,
+    batch_size: int = settings.event_retention_batch_size,
+) -> int:
+    """Apaga os webhooks do inbox aplicados há mais de `older_than`.
+
+    Webhooks pendentes ou que falharam ficam para o replay.
+
+    Returns:
+        int: quantidade de webhooks apagados
+    """
+    cutoff = create_timestamp() - older_than
+    total = 0
+
+    while True:
+        query = (
+            select(WebhookInbox.id)
+            .where(WebhookInbox.processed_at < cutoff)
+            .limit(batch_size)
+        )
+        ids = session.exec(query).all()
+        if not ids:
+            break
+
+        session.exec(delete(WebhookInbox).where(WebhookInbox.id.in_(ids)))
+        session.commit()
+
+        total += len(ids)
+        if len(ids) < batch_size:
+            break
+
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=settings.event_retention_days)
+    parser.add_argument("--batch-size", type=int, default=settings.event_retention_batch_size)
+    parser.add_argument("--archive", help="arquivo JSON Lines para arquivar os eventos removidos")
+    args = parser.parse_args()
+
+    archive = open(args.archive, "a") if args.archive else None
+    try:
+        with Session(engine) as session:
+            total = purge_events(
+                session,
+                timedelta(days=args.days),
+                batch_size=args.batch_size,
+                archive=archive,
+            )
+            webhooks = purge_webhook_inbox(
+                session, timedelta(days=args.days), batch_size=args.batch_size
+            )
+    finally:
+        if archive is not None:
+            archive.close()
+
+    print(f"{total} eventos removidos")
+    print(f"{webhooks} webhooks do inbox removidos")
+
+
+if __name__ == "__main__":
+    main()
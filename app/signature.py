@@ -0,0 +1,153 @@
+import hmac
+from typing import Annotated, Callable, Type, TypeVar
+from urllib.parse import parse_qsl
+
+from fastapi import Depends, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from starlette.datastructures import FormData
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from twilio.request_validator import RequestValidator
+
+from app.config import settings
+from app.api.typing import (
+    TwilioAmdStatusCallback,
+    TwilioEventStatusCallback,
+    TwilioGather,
+    TwilioWebhook,
+)
+from app.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+WEBHOOK_PREFIX = "/v1/phone/"
+
+# Rotas chamadas pelo Twilio (as demais em /v1/phone são chamadas pelo BONDE)
+WEBHOOK_ROUTES = frozenset(
+    (
+        "status-callback",
+        "amd-status-callback",
+        "dial",
+        "hold",
+        "dial-status-callback",
+        "dial-amd-status-callback",
+    )
+)
+
+_form_key = "twilio_form"
+
+W = TypeVar("W", bound=TwilioWebhook)
+
+validator = RequestValidator(settings.twilio_auth_token)
+
+
+def is_webhook(scope: Scope) -> bool:
+    path: str = scope["path"]
+    if scope["method"] != "POST" or not path.startswith(WEBHOOK_PREFIX):
+        return False
+    return path[len(WEBHOOK_PREFIX):].split("/", 1)[0] in WEBHOOK_ROUTES
+
+
+def webhook_url(scope: Scope) -> str:
+    """URL que o Twilio assinou: a mesma montada a partir de `base_url` no TwiML."""
+    url = settings.base_url.rstrip("/") + scope["path"]
+    if scope["query_string"]:
+        url += "?" + scope["query_string"].decode("latin-1")
+    return url
+
+
+def is_valid_signature(url: str, form: FormData, signature: str) -> bool:
+    """Confere a assinatura `X-Twilio-Signature`.
+
+    Tenta primeiro a URL como foi montada (o caso comum) e só cai no
+    `RequestValidator.validate`, que calcula o HMAC com e sem a porta, quando
+    ela não bate.
+    """
+    if not signature:
+        return False
+    if hmac.compare_digest(validator.compute_signature(url, form), signature):
+        return True
+    return validator.validate(url, form, signature)
+
+
+class TwilioSignatureMiddleware:
+    """Middleware ASGI que valida a assinatura dos webhooks do Twilio.
+
+    O corpo é lido e convertido em formulário uma única vez; o formulário fica
+    em `request.state` para as rotas (ver `get_twilio_form`) e o corpo é
+    repassado para a aplicação. Com `twilio_validate_signature` desligado
+    (stand-ins locais do Twilio) o formulário continua sendo compartilhado.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not is_webhook(scope):
+            return await self.app(scope, receive, send)
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        form = FormData(parse_qsl(body.decode("utf-8", "replace"), keep_blank_values=True))
+        scope.setdefault("state", {})[_form_key] = form
+
+        if settings.twilio_validate_signature:
+            headers = dict(scope["headers"])
+            signature = headers.get(b"x-twilio-signature", b"").decode("latin-1")
+            if not is_valid_signature(webhook_url(scope), form, signature):
+                logger.warning("Assinatura do Twilio inválida em %s", scope["path"])
+                response = PlainTextResponse("Invalid Twilio signature", status_code=403)
+                return await response(scope, receive, send)
+
+        replayed = False
+
+        async def replay() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay, send)
+
+
+async def get_twilio_form(request: Request) -> FormData:
+    """Formulário do webhook já lido pelo `TwilioSignatureMiddleware`."""
+    form = getattr(request.state, _form_key, None)
+    if form is None:
+        form = await request.form()
+    return form
+
+
+TwilioFormDep = Annotated[FormData, Depends(get_twilio_form)]
+
+
+def twilio_webhook(model: Type[W]) -> Callable:
+    """Dependência que monta o `model` a partir do formulário compartilhado."""
+
+    async def dependency(form: TwilioFormDep) -> W:
+        try:
+            return model.from_form(form)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors(include_url=False))
+
+    return dependency
+
+
+StatusCallbackDep = Annotated[
+    TwilioEventStatusCallback, Depends(twilio_webhook(TwilioEventStatusCallback))
+]
+AmdStatusCallbackDep = Annotated[
+    TwilioAmdStatusCallback, Depends(twilio_webhook(TwilioAmdStatusCallback))
+]
+GatherDep = Annotated[TwilioGather, Depends(twilio_webhook(TwilioGather))]
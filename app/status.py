@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.cache import TTLCache
+from app.config import settings
+from app.enum import CallState
+
+
+# Status público (exibido para o ativista) de cada estado da ligação lógica
+PUBLIC_STATUS: Dict[CallState, str] = {
+    CallState.INITIATED: "initiated",
+    CallState.RINGING: "initiated",
+    CallState.ANSWERED: "initiated",
+    CallState.FAILED: "canceled",
+    CallState.CONNECTED: "in-progress",
+    CallState.REDIRECTING: "ringing",
+    CallState.DESTINATION_INITIATED: "ringing",
+    CallState.DESTINATION_RINGING: "ringing",
+    CallState.DESTINATION_ANSWERED: "ringing",
+    CallState.NO_ANSWERED: "no-answer",
+    CallState.COMPLETED: "completed",
+}
+
+# Status que não mudam mais
+TERMINAL_STATUS = frozenset({"canceled", "no-answer", "completed"})
+
+
+def public_status(state: CallState) -> Optional[str]:
+    return PUBLIC_STATUS.get(state)
+
+
+# Cache write-through de call_id -> status público, atualizado a cada commit
+# de uma transição da CallMachine (ver app.notify). Status finais não mudam
+# mais e ficam em cache por mais tempo.
+status_cache = TTLCache(
+    ttl=settings.status_cache_ttl, maxsize=settings.status_cache_maxsize
+)
+
+
+# Sequência da última publicação de cada ligação (call_id -> sequência). Um
+# carregamento do banco iniciado antes de uma publicação pode terminar depois
+# dela, e não deve sobrescrever o status mais novo já em cache.
+_publish_seq = 0
+_published: "OrderedDict[str, int]" = OrderedDict()
+# Maior sequência descartada de `_published` pelo limite de tamanho
+_evicted_seq = 0
+
+
+def cache_status(call_id: str, status: Optional[str]):
+    if status is None:
+        return
+    ttl = settings.status_cache_terminal_ttl if status in TERMINAL_STATUS else None
+    status_cache.set(call_id, status, ttl=ttl)
+
+
+def publish_status(call_id: str, status: Optional[str]):
+    """Grava no cache um status confirmado por commit (ver app.notify)."""
+    global _publish_seq, _evicted_seq
+    _publish_seq += 1
+    _published[call_id] = _publish_seq
+    _published.move_to_end(call_id)
+    while len(_published) > status_cache.maxsize:
+        _, seq = _published.popitem(last=False)
+        _evicted_seq = max(_evicted_seq, seq)
+
+    cache_status(call_id, status)
+
+
+def _published_since(call_id: str, seq: int) -> bool:
+    published = _published.get(call_id)
+    if published is None:
+        # Sem registro: só é seguro se nada foi descartado depois de `seq`
+        return _evicted_seq > seq
+    return published > seq
+
+
+async def get_cached_status(
+    call_id: str, loader: Callable[[], Awaitable[Optional[str]]]
+) -> Optional[str]:
+    """Status público do `status_cache`, carregado com `loader` na falta.
+
+    O resultado do `loader` só vai para o cache se nenhum status da ligação foi
+    publicado durante o carregamento; caso contrário ele pode ser mais antigo
+    que o valor já em cache.
+    """
+    status = status_cache.get(call_id)
+    if status is not None:
+        status_cache.hits += 1
+        return status
+
+    status_cache.misses += 1
+    seq = _publish_seq
+    status = await loader()
+    if not _published_since(call_id, seq):
+        cache_status(call_id, status)
+    return status
@@ -0,0 +1,76 @@
+import asyncio
+import time
+from typing import Optional
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from twilio.http.async_http_client import AsyncTwilioHttpClient
+from twilio.rest import Client
+
+from app.config import settings
+from app.metrics import TWILIO_LATENCY
+
+
+class PooledAsyncTwilioHttpClient(AsyncTwilioHttpClient):
+    """Cliente HTTP assíncrono do Twilio com pool de conexões e keep-alive.
+
+    A `ClientSession` do aiohttp precisa ser criada dentro do event loop que
+    vai usá-la, por isso ela é aberta no primeiro request (e recriada caso o
+    loop mude, como acontece entre requisições do TestClient).
+    """
+
+    def __init__(self, limit: int, keepalive_timeout: float, timeout: float):
+        super().__init__(pool_connections=False)
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+        self.client_timeout = ClientTimeout(total=timeout)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self) -> ClientSession:
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self._loop is not loop:
+            self.session = ClientSession(
+                connector=TCPConnector(
+                    limit=self.limit, keepalive_timeout=self.keepalive_timeout
+                ),
+                timeout=self.client_timeout,
+                trace_configs=self.trace_configs,
+            )
+            self._loop = loop
+        return self.session
+
+    async def request(self, method: str, *args, **kwargs):
+        self._get_session()
+        # O `Client` do Twilio sempre passa `timeout=None`, que no aiohttp
+        # desliga o timeout da sessão para esta requisição
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.client_timeout.total
+
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await super().request(method, *args, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            TWILIO_LATENCY.labels(method.upper(), status).observe(
+                time.perf_counter() - start
+            )
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self._loop = None
+
+
+http_client = PooledAsyncTwilioHttpClient(
+    limit=settings.twilio_http_pool_size,
+    keepalive_timeout=settings.twilio_http_keepalive_timeout,
+    timeout=settings.twilio_http_timeout,
+)
+
+client = Client(
+    settings.twilio_account_sid,
+    settings.twilio_auth_token,
+    http_client=http_client,
+)
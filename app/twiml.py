@@ -0,0 +1,115 @@
+from typing import Callable, Dict
+from xml.sax.saxutils import escape
+
+from twilio.twiml.voice_response import Dial, Gather, VoiceResponse
+
+
+# Escapa também aspas: o mesmo valor pode cair em texto ou em atributo
+_ENTITIES = {'"': "&quot;"}
+
+
+def _marker(slot: str) -> str:
+    return f"__TWIML_{slot.upper()}__"
+
+
+class TwiMLTemplate:
+    """TwiML renderizado uma única vez por processo, com lacunas para os valores variáveis.
+
+    O `build` monta a resposta com `twilio.twiml` usando marcadores no lugar
+    de cada `slot`; o XML resultante vira um template de `str.format`. A cada
+    requisição só é preciso escapar e substituir os valores, sem montar e
+    serializar a árvore de elementos de novo.
+    """
+
+    def __init__(self, build: Callable[..., VoiceResponse], *slots: str, **static):
+        xml = str(build(**static, **{slot: _marker(slot) for slot in slots}))
+        xml = xml.replace("{", "{{").replace("}", "}}")
+        for slot in slots:
+            xml = xml.replace(_marker(slot), "{" + slot + "}")
+
+        self.slots = slots
+        self.source = xml
+
+    def render(self, **values) -> str:
+        escaped: Dict[str, str] = {
+            slot: escape(str(values[slot]), _ENTITIES) for slot in self.slots
+        }
+        return self.source.format(**escaped)
+
+
+def gather_response(base_url: str, call_id: str) -> VoiceResponse:
+    """Instrução da ligação para o ativista: pede o nome para verificar se é uma pessoa."""
+    resp = VoiceResponse()
+    resp.say(
+        "Olá! Para confirmar o redirecionamento informe seu nome.",
+        voice="Polly.Camila",
+        language="pt-BR",
+    )
+
+    # Preparar Gather para fazer uma verificação de voz
+    gather = Gather(
+        input="speech", timeout=5, action=f"{base_url}/dial/{call_id}", method="POST"
+    )
+    resp.append(gather)
+
+    # Se ninguém respondeu, desliga a ligação:
+    resp.hangup()
+    return resp
+
+
+def dial_response(base_url: str, call_id: str, from_number: str, to_number: str) -> VoiceResponse:
+    """Instrução para redirecionar a ligação do ativista para o alvo."""
+    resp = VoiceResponse()
+    resp.say(
+        "Obrigado! Vamos te conectar ao alvo, aguarde na linha",
+        voice="Polly.Camila",
+        language="pt-BR",
+    )
+
+    dial = Dial(caller_id=from_number)
+    dial.number(
+        to_number,
+        status_callback=f"{base_url}/dial-status-callback/{call_id}",
+        status_callback_event="initiated ringing answered completed",
+        status_callback_method="POST",
+        machine_detection="Enable",
+        amd_status_callback=f"{base_url}/dial-amd-status-callback/{call_id}",
+        amd_status_callback_method="POST",
+    )
+    resp.append(dial)
+    return resp
+
+
+def hold_response(base_url: str, call_id: str, pause: int, announce: bool) -> VoiceResponse:
+    """Fila de espera: o ativista aguarda e volta para `/hold` até o alvo liberar."""
+    resp = VoiceResponse()
+    if announce:
+        resp.say(
+            "O alvo está em outra ligação. Aguarde na linha, vamos te conectar assim que ele ficar livre",
+            voice="Polly.Camila",
+            language="pt-BR",
+        )
+    resp.pause(length=pause)
+    resp.redirect(f"{base_url}/hold/{call_id}", method="POST")
+    return resp
+
+
+def target_busy_response() -> VoiceResponse:
+    resp = VoiceResponse()
+    resp.say(
+        "O alvo continua ocupado. Obrigado por participar, tente novamente mais tarde",
+        voice="Polly.Camila",
+        language="pt-BR",
+    )
+    resp.hangup()
+    return resp
+
+
+def hangup_response() -> VoiceResponse:
+    resp = VoiceResponse()
+    resp.hangup()
+    return resp
+
+
+HANGUP_TWIML = str(hangup_response())
+TARGET_BUSY_TWIML = str(target_busy_response())
@@ -0,0 +1,52 @@
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+_non_digits = re.compile(r"[^\d+]")
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """Remove espaços, parênteses e hífens, ex: "+55 (31) 99889-9875" -> "+5531998899875"."""
+    return _non_digits.sub("", phone or "")
+
+
+@dataclass(frozen=True, slots=True)
+class Widget:
+    """Widget do BONDE já pré-processado para validar ligações.
+
+    Os telefones dos alvos ficam normalizados em um `frozenset`, então
+    conferir se um alvo pertence ao widget custa O(1) por ligação.
+    """
+
+    id: Optional[int]
+    kind: Optional[str]
+    target_phones: frozenset[str]
+
+    @property
+    def is_phone(self) -> bool:
+        return self.kind == "phone"
+
+    def has_target(self, phone: str) -> bool:
+        return normalize_phone(phone) in self.target_phones
+
+
+def compile_widget(data: Optional[dict]) -> Optional[Widget]:
+    """Converte o resultado de `widgets_by_pk` em um `Widget`.
+
+    Args:
+        data (dict | None): widget retornado pela API do BONDE
+
+    Returns:
+        Widget | None: None quando o widget não existe
+    """
+    if not data:
+        return None
+
+    targets = (data.get("settings") or {}).get("targets") or []
+    return Widget(
+        id=data.get("id"),
+        kind=data.get("kind"),
+        target_phones=frozenset(
+            normalize_phone(t.get("phone")) for t in targets if t.get("phone")
+        ),
+    )
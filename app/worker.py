@@ -0,0 +1,75 @@
+import asyncio
+import random
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from app.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+def backoff(attempts: int, base: float, max_delay: float) -> float:
+    """Espera exponencial (com jitter) antes da tentativa seguinte a `attempts`."""
+    delay = min(max_delay, base * 2 ** (attempts - 1))
+    # Jitter para que os itens de um lote com falha não voltem todos juntos
+    return delay * random.uniform(0.5, 1.0)
+
+
+class Poller(ABC):
+    """Laço de um worker em background que processa o banco em rodadas.
+
+    A cada rodada chama `run_once`; quando ela indica que ainda há trabalho a
+    próxima rodada começa na hora, senão o worker espera `poll_interval`
+    segundos ou até ser acordado com `wake`. Erros da rodada são registrados
+    com `error_message` e o laço continua.
+    """
+
+    error_message = "Error in background worker: %s"
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def run_once(self) -> bool:
+        """Processa uma rodada. Retorna True se há mais trabalho esperando."""
+
+    def wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._stopping = True
+        self.wake()
+        await self._task
+        self._task = None
+        self._wakeup = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                more = await self.run_once()
+            except Exception as e:
+                logger.error(self.error_message, e)
+                more = False
+
+            if more:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
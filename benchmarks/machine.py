@@ -0,0 +1,84 @@
+"""Microbenchmark do custo por evento da CallMachine.
+
+Compara a máquina atual (tabela de transições compilada uma vez por
+processo) com a implementação anterior, que montava um `transitions.Machine`
+a cada webhook. Cada iteração cria a máquina e dispara um evento, como
+acontece em um callback do Twilio.
+
+    uv run python -m benchmarks.machine --number 20000
+"""
+import argparse
+import logging
+import timeit
+
+from transitions import Machine
+
+from app.enum import CallState
+from app.machine import CallMachine
+from app.models import Call
+
+
+class LegacyCallMachine:
+    """Implementação anterior, mantida aqui apenas como referência."""
+
+    states = [s for s in CallState]
+
+    def __init__(self, call):
+        self.model = call
+        self.machine = Machine(
+            model=self,
+            states=self.states,
+            initial=call.state,
+            after_state_change="on_any_transition"
+        )
+        self.machine.add_transition("call", CallState.INITIATED, CallState.RINGING)
+        self.machine.add_transition("attend", CallState.RINGING, CallState.ANSWERED)
+        self.machine.add_transition("connect", CallState.ANSWERED, CallState.REDIRECTING)
+        self.machine.add_transition("dial_call", CallState.REDIRECTING, CallState.DESTINATION_RINGING)
+        self.machine.add_transition("dial_attend", CallState.DESTINATION_RINGING, CallState.DESTINATION_ANSWERED)
+        self.machine.add_transition("dial_connect", CallState.DESTINATION_ANSWERED, CallState.CONNECTED)
+        self.machine.add_transition("voicemail", CallState.ANSWERED, CallState.FAILED)
+        self.machine.add_transition("dial_voicemail", CallState.DESTINATION_ANSWERED, CallState.NO_ANSWERED)
+        self.machine.add_transition("fail", "*", CallState.FAILED)
+        self.machine.add_transition("complete", CallState.CONNECTED, CallState.COMPLETED, conditions=["is_connected"])
+        self.machine.add_transition("complete", CallState.COMPLETED, CallState.COMPLETED, conditions=["is_completed"])
+        self.machine.add_transition("complete", "*", CallState.FAILED)
+
+    def is_connected(self):
+        return self.model.state == CallState.CONNECTED
+
+    def is_completed(self):
+        return self.model.state == CallState.COMPLETED
+
+    def on_any_transition(self):
+        self.model.state = self.state
+
+
+def per_event(machine_class, number: int) -> float:
+    call = Call(from_number="+5531998766543", to_number="+5531876234123")
+
+    def run():
+        call.state = CallState.CONNECTED
+        machine_class(call).complete()
+
+    return timeit.timeit(run, number=number) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    # transitions loga cada callback em INFO
+    logging.getLogger("transitions").setLevel(logging.WARNING)
+
+    legacy = per_event(LegacyCallMachine, args.number)
+    current = per_event(CallMachine, args.number)
+
+    print(f"legacy (transitions.Machine por evento): {legacy * 1e6:8.2f}µs/evento")
+    print(f"atual (tabela compilada):                {current * 1e6:8.2f}µs/evento")
+    print(f"speedup:                                 {legacy / current:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Microbenchmark do custo de gerar o TwiML por requisição.
+
+Compara montar e serializar a árvore do `twilio.twiml` a cada requisição
+(como `call()` e `dial()` faziam) com o `TwiMLTemplate` pré-renderizado.
+
+    uv run python -m benchmarks.twiml --number 20000
+"""
+import argparse
+import timeit
+import uuid
+
+from app.twiml import TwiMLTemplate, dial_response, gather_response
+
+
+BASE_URL = "https://api.bonde.devel/v1/phone"
+FROM_NUMBER = "+5531998766543"
+TO_NUMBER = "+5531876234123"
+
+
+def per_request(fn, number: int) -> float:
+    return timeit.timeit(fn, number=number) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    call_id = str(uuid.uuid4())
+    gather = TwiMLTemplate(gather_response, "call_id", base_url=BASE_URL)
+    dial = TwiMLTemplate(dial_response, "call_id", "from_number", "to_number", base_url=BASE_URL)
+
+    cases = [
+        (
+            "gather",
+            lambda: str(gather_response(BASE_URL, call_id)),
+            lambda: gather.render(call_id=call_id),
+        ),
+        (
+            "dial",
+            lambda: str(dial_response(BASE_URL, call_id, FROM_NUMBER, TO_NUMBER)),
+            lambda: dial.render(call_id=call_id, from_number=FROM_NUMBER, to_number=TO_NUMBER),
+        ),
+    ]
+
+    for name, tree, template in cases:
+        legacy = per_request(tree, args.number)
+        current = per_request(template, args.number)
+        print(
+            f"{name:7s} twilio.twiml: {legacy * 1e6:8.2f}µs  "
+            f"template: {current * 1e6:6.2f}µs  speedup: {legacy / current:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Add phone indexes
+
+Revision ID: 8b1e6f0c2d47
+Revises: 5dcd0a4c3dfb
+Create Date: 2026-10-18 10:12:41.508213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1e6f0c2d47'
+down_revision: Union[str, Sequence[str], None] = '5dcd0a4c3dfb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ACTIVE_CALL_CLAUSE = sa.text("state NOT IN ('failed', 'no-answered', 'completed')")
+
+
+def upgrade() -> None:
+    # CONCURRENTLY não pode rodar dentro de uma transação no Postgres
+    with op.get_context().autocommit_block():
+        # phone_calls: ligações por estado / período
+        op.create_index(
+            "ix_phone_calls_state_updated_at",
+            "phone_calls",
+            ["state", "updated_at"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_phone_calls_created_at",
+            "phone_calls",
+            ["created_at"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_phone_calls_active_updated_at",
+            "phone_calls",
+            ["updated_at"],
+            postgresql_where=ACTIVE_CALL_CLAUSE,
+            sqlite_where=ACTIVE_CALL_CLAUSE,
+            postgresql_concurrently=True,
+        )
+
+        # phone_twilio_call_events: BRIN ocupa poucas páginas e não pesa nos inserts
+        op.create_index(
+            "ix_phone_twilio_call_events_created_at",
+            "phone_twilio_call_events",
+            ["created_at"],
+            postgresql_using="brin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_phone_twilio_call_events_created_at", table_name="phone_twilio_call_events")
+    op.drop_index("ix_phone_calls_active_updated_at", table_name="phone_calls")
+    op.drop_index("ix_phone_calls_created_at", table_name="phone_calls")
+    op.drop_index("ix_phone_calls_state_updated_at", table_name="phone_calls")
@@ -0,0 +1,57 @@
+"""Add webhook inbox
+
+Revision ID: a2c8e4f7b391
+Revises: f1b6d0e48a72
+Create Date: 2026-10-18 17:02:13.550871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2c8e4f7b391'
+down_revision: Union[str, Sequence[str], None] = 'f1b6d0e48a72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PENDING_WEBHOOK_CLAUSE = sa.text("processed_at IS NULL")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "phone_webhook_inbox",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("call_id", sa.String(), nullable=False),
+        sa.Column("route", sa.String(), nullable=False),
+        sa.Column("form", sa.JSON, nullable=False),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_phone_webhook_inbox_pending",
+        "phone_webhook_inbox",
+        ["next_attempt_at"],
+        postgresql_where=PENDING_WEBHOOK_CLAUSE,
+        sqlite_where=PENDING_WEBHOOK_CLAUSE,
+    )
+    op.create_index(
+        "ix_phone_webhook_inbox_call_pending",
+        "phone_webhook_inbox",
+        ["call_id", "id"],
+        postgresql_where=PENDING_WEBHOOK_CLAUSE,
+        sqlite_where=PENDING_WEBHOOK_CLAUSE,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_phone_webhook_inbox_call_pending", table_name="phone_webhook_inbox")
+    op.drop_index("ix_phone_webhook_inbox_pending", table_name="phone_webhook_inbox")
+    op.drop_table("phone_webhook_inbox")
@@ -0,0 +1,28 @@
+"""Add call activist
+
+Revision ID: b5d1f3a8c6e2
+Revises: a2c8e4f7b391
+Create Date: 2026-10-18 18:12:41.208375
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d1f3a8c6e2'
+down_revision: Union[str, Sequence[str], None] = 'a2c8e4f7b391'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("phone_calls") as batch_op:
+        batch_op.add_column(sa.Column("activist", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("phone_calls") as batch_op:
+        batch_op.drop_column("activist")
@@ -0,0 +1,48 @@
+"""Add widget action outbox
+
+Revision ID: c3a9d27e5f10
+Revises: 8b1e6f0c2d47
+Create Date: 2026-10-18 11:04:27.193620
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9d27e5f10'
+down_revision: Union[str, Sequence[str], None] = '8b1e6f0c2d47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "phone_widget_action_outbox",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("idempotency_key", sa.String(), nullable=False, unique=True),
+        sa.Column("widget_id", sa.Integer, nullable=False),
+        sa.Column("activist", sa.JSON, nullable=False),
+        sa.Column("input", sa.JSON, nullable=False),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    # Só as ações pendentes, na ordem em que o worker as busca
+    op.create_index(
+        "ix_phone_widget_action_outbox_pending",
+        "phone_widget_action_outbox",
+        ["next_attempt_at"],
+        postgresql_where=sa.text("sent_at IS NULL"),
+        sqlite_where=sa.text("sent_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_phone_widget_action_outbox_pending", table_name="phone_widget_action_outbox")
+    op.drop_table("phone_widget_action_outbox")
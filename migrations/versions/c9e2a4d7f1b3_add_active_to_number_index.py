@@ -0,0 +1,44 @@
+"""Add active calls by target index
+
+Revision ID: c9e2a4d7f1b3
+Revises: b5d1f3a8c6e2
+Create Date: 2026-10-18 18:48:05.913260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e2a4d7f1b3'
+down_revision: Union[str, Sequence[str], None] = 'b5d1f3a8c6e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ACTIVE_CALL_CLAUSE = sa.text("state NOT IN ('failed', 'no-answered', 'completed')")
+
+
+def upgrade() -> None:
+    # CONCURRENTLY não pode rodar dentro de uma transação no Postgres
+    with op.get_context().autocommit_block():
+        # Ligações em andamento por alvo (limite por alvo do BatchDispatcher)
+        op.create_index(
+            "ix_phone_calls_active_to_number",
+            "phone_calls",
+            ["to_number"],
+            postgresql_where=ACTIVE_CALL_CLAUSE,
+            sqlite_where=ACTIVE_CALL_CLAUSE,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_phone_calls_active_to_number",
+            table_name="phone_calls",
+            postgresql_concurrently=True,
+        )
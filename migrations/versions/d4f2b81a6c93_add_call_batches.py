@@ -0,0 +1,61 @@
+"""Add call batches
+
+Revision ID: d4f2b81a6c93
+Revises: c3a9d27e5f10
+Create Date: 2026-10-18 13:21:08.647102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f2b81a6c93'
+down_revision: Union[str, Sequence[str], None] = 'c3a9d27e5f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PENDING_DISPATCH_CLAUSE = sa.text("batch_id IS NOT NULL AND dispatched_at IS NULL")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "phone_call_batches",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("widget_id", sa.Integer, nullable=False),
+        sa.Column("total", sa.Integer, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+    with op.batch_alter_table("phone_calls") as batch_op:
+        batch_op.add_column(sa.Column("batch_id", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("dispatched_at", sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_foreign_key(
+            "fk_phone_calls_batch_id", "phone_call_batches", ["batch_id"], ["id"]
+        )
+
+    op.create_index("ix_phone_calls_batch_id", "phone_calls", ["batch_id"])
+    # Fila de disparo do BatchDispatcher
+    op.create_index(
+        "ix_phone_calls_pending_dispatch",
+        "phone_calls",
+        ["created_at"],
+        postgresql_where=PENDING_DISPATCH_CLAUSE,
+        sqlite_where=PENDING_DISPATCH_CLAUSE,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_phone_calls_pending_dispatch", table_name="phone_calls")
+    op.drop_index("ix_phone_calls_batch_id", table_name="phone_calls")
+
+    with op.batch_alter_table("phone_calls") as batch_op:
+        batch_op.drop_constraint("fk_phone_calls_batch_id", type_="foreignkey")
+        batch_op.drop_column("dispatched_at")
+        batch_op.drop_column("batch_id")
+
+    op.drop_table("phone_call_batches")
@@ -0,0 +1,28 @@
+"""Rename outbox idempotency_key to call_id
+
+Revision ID: d8a4b2f6c1e9
+Revises: c9e2a4d7f1b3
+Create Date: 2026-10-18 19:20:36.417092
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a4b2f6c1e9'
+down_revision: Union[str, Sequence[str], None] = 'c9e2a4d7f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # O BONDE não deduplica pelo valor: é só o id da ligação da ação
+    with op.batch_alter_table("phone_widget_action_outbox") as batch_op:
+        batch_op.alter_column("idempotency_key", new_column_name="call_id")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("phone_widget_action_outbox") as batch_op:
+        batch_op.alter_column("call_id", new_column_name="idempotency_key")
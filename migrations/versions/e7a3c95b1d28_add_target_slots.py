@@ -0,0 +1,39 @@
+"""Add target slots
+
+Revision ID: e7a3c95b1d28
+Revises: d4f2b81a6c93
+Create Date: 2026-10-18 15:02:41.318254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c95b1d28'
+down_revision: Union[str, Sequence[str], None] = 'd4f2b81a6c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "phone_target_slots",
+        sa.Column(
+            "call_id", sa.String(), sa.ForeignKey("phone_calls.id"), primary_key=True
+        ),
+        sa.Column("target", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_phone_target_slots_target_status", "phone_target_slots", ["target", "status"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_phone_target_slots_target_status", table_name="phone_target_slots")
+    op.drop_table("phone_target_slots")
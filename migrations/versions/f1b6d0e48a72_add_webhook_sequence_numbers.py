@@ -0,0 +1,41 @@
+"""Add webhook sequence numbers
+
+Revision ID: f1b6d0e48a72
+Revises: e7a3c95b1d28
+Create Date: 2026-10-18 16:10:27.904516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6d0e48a72'
+down_revision: Union[str, Sequence[str], None] = 'e7a3c95b1d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "phone_twilio_calls", sa.Column("sequence_number", sa.Integer, nullable=True)
+    )
+
+    # Eventos antigos ficam com NULL e não entram em conflito
+    with op.batch_alter_table("phone_twilio_call_events") as batch_op:
+        batch_op.add_column(sa.Column("sequence_number", sa.Integer, nullable=True))
+        batch_op.create_unique_constraint(
+            "uq_phone_twilio_call_events_sequence",
+            ["twilio_call_sid", "event_type", "sequence_number"],
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("phone_twilio_call_events") as batch_op:
+        batch_op.drop_constraint("uq_phone_twilio_call_events_sequence", type_="unique")
+        batch_op.drop_column("sequence_number")
+
+    with op.batch_alter_table("phone_twilio_calls") as batch_op:
+        batch_op.drop_column("sequence_number")
@@ -1,43 +1,147 @@
+import json
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
 import pytest
 from sqlmodel import SQLModel, Session, create_engine
-from sqlalchemy.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock
 
-from app.db import get_session
-from app.graphql import get_graphql_client
+from app.config import settings
+from app.db import get_session, get_async_session
+from app.dedup import seen_webhooks
+from app.enum import CallState, TwilioCallStatus
+from app.graphql import get_graphql_client, widget_cache
 from app.models import Call, TwilioCall, TwilioCallEvent
 from app.main import app
+from app.status import status_cache
+from app.twilio import client as twilio_client
+
+
+@pytest.fixture(name="database_path")
+def database_path_fixture(tmp_path):
+    # 🔑 arquivo compartilhado entre o engine síncrono (testes) e o assíncrono (rotas)
+    return tmp_path / "test.db"
 
 
 @pytest.fixture(name="engine")
-def engine_fixture():
+def engine_fixture(database_path):
     engine = create_engine(
-        "sqlite:///:memory:",
+        f"sqlite:///{database_path}",
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool  # 🔑 mantém o banco in-memory compartilhado
     )
     SQLModel.metadata.create_all(engine)
     return engine
 
 
+@pytest.fixture(name="async_engine")
+def async_engine_fixture(engine, database_path):
+    # NullPool: o TestClient abre um event loop novo a cada requisição
+    return create_async_engine(
+        f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool
+    )
+
+
+class StatementCounter:
+    """Registra os comandos SQL enviados ao banco pelos engines dos testes."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def reset(self):
+        self.statements.clear()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture(name="sql_statements")
+def sql_statements_fixture(engine, async_engine):
+    counter = StatementCounter()
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", counter)
+    yield counter
+    for target in (engine, async_engine.sync_engine):
+        event.remove(target, "before_cursor_execute", counter)
+
+
 @pytest.fixture(name="session")
 def session_fixture(engine):
     with Session(engine) as session:
         yield session
 
 
+@pytest.fixture(name="async_session_maker")
+def async_session_maker_fixture(async_engine):
+    """Sessões assíncronas como as das rotas, para os workers em background"""
+    return async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture(name="make_twilio_call")
+def make_twilio_call_fixture(session):
+    """Cria uma ligação (`Call`) com o seu `TwilioCall` e retorna os dois"""
+
+    def make_twilio_call(
+        state=CallState.INITIATED,
+        sid="CA_fake_sid",
+        status=TwilioCallStatus.INITIATED,
+        to_number="+5531876234123",
+    ):
+        call = Call(from_number="+5531998766543", to_number=to_number, state=state)
+        twilio_call = TwilioCall(sid=sid, status=status, parent_call=call)
+        session.add_all([call, twilio_call])
+        session.commit()
+        session.refresh(call)
+        return call, twilio_call
+
+    return make_twilio_call
+
+
 @pytest.fixture(name="client")
-def client_fixture(session):
+def client_fixture(session, async_session_maker):
     # Override da dependência
     def get_session_override():
         return session
 
+    async def get_async_session_override():
+        async with async_session_maker() as async_session:
+            yield async_session
+
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
     yield TestClient(app)
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def skip_twilio_signature(monkeypatch):
+    # Os testes postam os webhooks sem assinar; ver test_twilio_signature.py
+    monkeypatch.setattr(settings, "twilio_validate_signature", False)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    for cache in (widget_cache, status_cache, seen_webhooks):
+        cache.invalidate()
+        cache.hits = cache.misses = 0
+    yield
+    widget_cache.invalidate()
+    status_cache.invalidate()
+    seen_webhooks.invalidate()
+
+
 @pytest.fixture
 def mock_graphql_client():
     """Cria um mock do GraphQL client e sobrescreve a dependency"""
@@ -54,3 +158,110 @@ def mock_graphql_client():
 
     # Limpa override depois do teste
     app.dependency_overrides = {}
+
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    """Responde `POST /2010-04-01/Accounts/{sid}/Calls.json` como a API do Twilio"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        form = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        self.server.requests.append(form)
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.in_flight -= 1
+
+        sid = f"CA{uuid.uuid4().hex}"
+        content = json.dumps({
+            "sid": sid,
+            "status": "queued",
+            "direction": "outbound-api",
+            "answered_by": None,
+            "api_version": "2010-04-01",
+            "date_created": formatdate(usegmt=True),
+            "duration": None,
+            "from": form.get("From"),
+            "to": form.get("To"),
+            "start_time": None,
+            "uri": f"/2010-04-01/Accounts/ACxxx/Calls/{sid}.json",
+        }).encode()
+
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_twilio(monkeypatch):
+    """Sobe um servidor local no lugar da API do Twilio (sem rede)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeTwilioHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.delay = 0
+    server.lock = threading.Lock()
+    server.in_flight = 0
+    server.max_in_flight = 0
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    host, port = server.server_address
+    monkeypatch.setattr(twilio_client.api, "base_url", f"http://{host}:{port}")
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+class FakeGraphQLHandler(BaseHTTPRequestHandler):
+    """Responde qualquer query GraphQL com `{"data": {"__typename": "query_root"}}`"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, para contar as conexões abertas
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append(json.loads(body))
+        self.server.connections.add(self.client_address)
+
+        if self.server.status == 200:
+            content = json.dumps({"data": {"__typename": "query_root"}}).encode()
+        else:
+            content = b"unavailable"
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_graphql():
+    """Sobe um servidor local no lugar da API GraphQL do BONDE (sem rede)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGraphQLHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.connections = set()
+    server.status = 200
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    host, port = server.server_address
+    server.url = f"http://{host}:{port}/v1/graphql"
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
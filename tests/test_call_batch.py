@@ -0,0 +1,219 @@
+import asyncio
+import time
+
+import pytest
+from sqlmodel import select
+from unittest.mock import AsyncMock
+
+from app.dialer import start_call
+from app.dispatch import BatchDispatcher, RateLimiter
+from app.enum import CallState
+from app.models import Call, CallBatch, TwilioCall, WidgetActionOutbox
+
+
+TARGETS = [
+    {"name": "Alvo 1", "phone": "+5531876234123"},
+    {"name": "Alvo 2", "phone": "+5531876234124"},
+]
+
+
+def get_payload(total=3, target=TARGETS[0]):
+    return {
+        "widget_id": 12,
+        "calls": [
+            {
+                "activist": {
+                    "first_name": "Test", "last_name": f"Unit {i}", "name": f"Test Unit {i}",
+                    "phone": f"+55319988998{i:02d}", "email": f"test{i}@unit.devel",
+                },
+                "target": target,
+            }
+            for i in range(total)
+        ],
+    }
+
+
+def mock_widget(mock_graphql_client):
+    mock_graphql_client.execute.return_value = dict(
+        widgets_by_pk=dict(id=12, kind="phone", settings=dict(targets=TARGETS))
+    )
+
+
+def make_batch(session, targets):
+    batch = CallBatch(widget_id=12, total=len(targets))
+    calls = [
+        Call(
+            from_number=f"+55319988998{i:02d}",
+            to_number=target,
+            batch_id=batch.id,
+            activist={"name": f"Test Unit {i}", "phone": f"+55319988998{i:02d}"},
+        )
+        for i, target in enumerate(targets)
+    ]
+    session.add_all([batch, *calls])
+    session.commit()
+    return batch
+
+
+def make_dispatcher(session_maker, dial, **kwargs):
+    options = dict(calls_per_second=0, target_max_concurrency=2, concurrency=10, poll_interval=0.05)
+    options.update(kwargs)
+    return BatchDispatcher(
+        session_maker=session_maker,
+        dial=dial,
+        **options,
+    )
+
+
+def test_create_call_batch(client, session, mock_graphql_client):
+    mock_widget(mock_graphql_client)
+
+    resp = client.post("/v1/phone/calls/batch", json=get_payload(total=3))
+
+    assert resp.status_code == 202
+    batch_id = resp.json()["batch_id"]
+    assert resp.json()["total"] == 3
+
+    calls = session.exec(select(Call).where(Call.batch_id == batch_id)).all()
+    assert len(calls) == 3
+    assert all(c.dispatched_at is None and c.state == CallState.INITIATED for c in calls)
+
+    assert sorted(c.activist["email"] for c in calls) == [f"test{i}@unit.devel" for i in range(3)]
+    # A ação no BONDE só é gravada quando a ligação é disparada
+    assert session.exec(select(WidgetActionOutbox)).all() == []
+
+    # Widget consultado uma única vez para toda a campanha
+    assert mock_graphql_client.execute.call_count == 1
+
+
+def test_create_call_batch_invalid_target(client, session, mock_graphql_client):
+    mock_widget(mock_graphql_client)
+    payload = get_payload(total=2)
+    payload["calls"][1]["target"] = {"name": "Outro", "phone": "+5531876230000"}
+
+    resp = client.post("/v1/phone/calls/batch", json=payload)
+
+    assert resp.status_code == 422
+    assert resp.json()["detail"][0]["loc"] == ["body", "calls", 1, "target", "phone"]
+    assert session.exec(select(Call)).all() == []
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_respects_target_concurrency(client, session, async_session_maker):
+    batch = make_batch(session, [TARGETS[0]["phone"]] * 3 + [TARGETS[1]["phone"]])
+    dial = AsyncMock()
+    dispatcher = make_dispatcher(async_session_maker, dial, target_max_concurrency=2)
+
+    assert await dispatcher.dispatch_batch() == 3
+    # Alvo 1 continua no limite até alguma ligação terminar
+    assert await dispatcher.dispatch_batch() == 0
+
+    resp = client.get(f"/v1/phone/calls/batch/{batch.id}")
+    assert resp.json()["pending"] == 1
+    assert resp.json()["dispatched"] == 3
+
+    call = session.exec(
+        select(Call).where(Call.to_number == TARGETS[0]["phone"], Call.dispatched_at.is_not(None))
+    ).first()
+    call.state = CallState.COMPLETED
+    session.add(call)
+    session.commit()
+
+    assert await dispatcher.dispatch_batch() == 1
+    assert dial.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_counts_calls_from_post_call(session, async_session_maker):
+    make_batch(session, [TARGETS[0]["phone"], TARGETS[1]["phone"]])
+    # Ligação do `POST /call` em andamento para o alvo 1
+    session.add(Call(from_number="+5531998899800", to_number=TARGETS[0]["phone"], state=CallState.RINGING))
+    session.commit()
+    dial = AsyncMock()
+    dispatcher = make_dispatcher(async_session_maker, dial, target_max_concurrency=1)
+
+    assert await dispatcher.dispatch_batch() == 1
+
+    dispatched = session.exec(select(Call).where(Call.dispatched_at.is_not(None))).one()
+    assert dispatched.to_number == TARGETS[1]["phone"]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_creates_twilio_calls(client, session, async_session_maker, fake_twilio):
+    batch = make_batch(session, [TARGETS[0]["phone"], TARGETS[1]["phone"]])
+    dispatcher = make_dispatcher(async_session_maker, dial=start_call)
+
+    await dispatcher.start()
+    dispatcher.wake()
+    for _ in range(100):
+        if dispatcher.stats()["dispatched"] == 2:
+            break
+        await asyncio.sleep(0.02)
+    await dispatcher.stop()
+
+    assert len(fake_twilio.requests) == 2
+    assert len(session.exec(select(TwilioCall)).all()) == 2
+
+    calls = session.exec(select(Call)).all()
+    actions = session.exec(select(WidgetActionOutbox)).all()
+    assert sorted(a.call_id for a in actions) == sorted(c.id for c in calls)
+    assert all(a.widget_id == 12 and a.activist["name"].startswith("Test Unit") for a in actions)
+    assert all(c.activist is None for c in calls)
+
+    resp = client.get(f"/v1/phone/calls/batch/{batch.id}")
+    assert resp.json() == {
+        "batch_id": batch.id,
+        "widget_id": 12,
+        "total": 2,
+        "pending": 0,
+        "dispatched": 2,
+        "status": {"initiated": 2},
+    }
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_fails_call_on_twilio_error(session, async_session_maker):
+    make_batch(session, [TARGETS[0]["phone"]])
+    dispatcher = make_dispatcher(async_session_maker, AsyncMock(side_effect=RuntimeError("twilio down")))
+
+    await dispatcher.dispatch_batch()
+
+    session.expire_all()
+    call = session.exec(select(Call)).one()
+    assert call.state == CallState.FAILED
+    assert call.dispatched_at is not None
+    # Ligação que não chegou ao Twilio não gera ação no BONDE
+    assert session.exec(select(WidgetActionOutbox)).all() == []
+    assert dispatcher.stats() == {"dispatched": 0, "failed": 1, "leader": 1}
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_only_leader_dispatches(session, async_session_maker, monkeypatch):
+    make_batch(session, [TARGETS[0]["phone"]])
+    dial = AsyncMock()
+    dispatcher = make_dispatcher(async_session_maker, dial)
+    # Outro worker segura o lock
+    monkeypatch.setattr(dispatcher.leader, "acquire", AsyncMock(return_value=False))
+
+    await dispatcher.start()
+    dispatcher.wake()
+    await asyncio.sleep(0.2)
+    await dispatcher.stop()
+
+    assert dispatcher.leader.acquire.await_count >= 2
+    assert dial.await_count == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(rate=50)
+
+    start = time.monotonic()
+    for _ in range(6):
+        await limiter.acquire()
+
+    assert time.monotonic() - start >= 0.1
+
+
+def test_call_batch_not_found(client):
+    assert client.get("/v1/phone/calls/batch/unknown").status_code == 404
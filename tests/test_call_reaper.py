@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+import pytest
+from sqlmodel import select
+
+from app.enum import CallState
+from app.models import Call, CallBatch, TargetSlot, create_timestamp
+from app.reaper import CallReaper
+from app.status import public_status, status_cache
+
+
+TIMEOUTS = {"ringing": 60, "redirecting": 600, "connected": 3600, "initiated": 60}
+
+
+def make_reaper(session_maker, **kwargs):
+    options = dict(timeouts=TIMEOUTS, batch_size=100, interval=0.05)
+    options.update(kwargs)
+    return CallReaper(
+        session_maker=session_maker,
+        **options,
+    )
+
+
+def make_call(session, state, age, **kwargs):
+    call = Call(from_number="+5531998766543", to_number="+5531876234123", state=state, **kwargs)
+    session.add(call)
+    session.commit()
+    # `updated_at` é atualizado pelo banco a cada UPDATE
+    session.exec(
+        Call.__table__.update()
+        .where(Call.id == call.id)
+        .values(updated_at=create_timestamp() - timedelta(seconds=age))
+    )
+    session.commit()
+    return call.id
+
+
+def get_state(session, call_id):
+    session.expire_all()
+    return session.get(Call, call_id).state
+
+
+@pytest.mark.asyncio
+async def test_reaper_fails_stale_calls(session, async_session_maker):
+    stale = make_call(session, CallState.RINGING, age=120)
+    fresh = make_call(session, CallState.RINGING, age=10)
+    holding = make_call(session, CallState.REDIRECTING, age=120)
+
+    reaper = make_reaper(async_session_maker)
+    assert await reaper.reap_batch() == 1
+
+    assert get_state(session, stale) == CallState.FAILED
+    assert get_state(session, fresh) == CallState.RINGING
+    assert get_state(session, holding) == CallState.REDIRECTING
+    assert status_cache.get(stale) == public_status(CallState.FAILED)
+
+
+@pytest.mark.asyncio
+async def test_reaper_completes_stale_connected_call(session, async_session_maker):
+    call_id = make_call(session, CallState.CONNECTED, age=7200)
+
+    await make_reaper(async_session_maker).reap_batch()
+
+    assert get_state(session, call_id) == CallState.COMPLETED
+
+
+@pytest.mark.asyncio
+async def test_reaper_skips_pending_batch_calls(session, async_session_maker):
+    batch = CallBatch(widget_id=12, total=2)
+    session.add(batch)
+    session.commit()
+    pending = make_call(session, CallState.INITIATED, age=120, batch_id=batch.id)
+    dispatched = make_call(
+        session, CallState.INITIATED, age=120, batch_id=batch.id, dispatched_at=create_timestamp()
+    )
+
+    await make_reaper(async_session_maker).reap_batch()
+
+    assert get_state(session, pending) == CallState.INITIATED
+    assert get_state(session, dispatched) == CallState.FAILED
+
+
+@pytest.mark.asyncio
+async def test_reaper_batches(session, async_session_maker):
+    for _ in range(3):
+        make_call(session, CallState.RINGING, age=120)
+    reaper = make_reaper(async_session_maker, batch_size=2)
+
+    assert await reaper.reap_batch() == 2
+    assert await reaper.reap_batch() == 1
+    assert await reaper.reap_batch() == 0
+    assert reaper.stats() == {"reaped": 3}
+
+
+@pytest.mark.asyncio
+async def test_reaper_releases_target_slot(session, async_session_maker):
+    call_id = make_call(session, CallState.REDIRECTING, age=1200)
+    session.add(TargetSlot(call_id=call_id, target="+5531876234123", status="active"))
+    session.commit()
+
+    await make_reaper(async_session_maker).reap_batch()
+
+    session.expire_all()
+    assert session.exec(select(TargetSlot)).all() == []
@@ -0,0 +1,52 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.db import TimedQueuePool, engine_options, pool_stats
+
+
+def test_engine_options_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "database_pool_size", 20)
+    monkeypatch.setattr(settings, "database_max_overflow", 5)
+    monkeypatch.setattr(settings, "database_pool_pre_ping", True)
+
+    options = engine_options("postgresql://localhost/bonde", TimedQueuePool)
+
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 5
+    assert options["pool_pre_ping"] is True
+
+
+def test_engine_options_pgbouncer(monkeypatch):
+    monkeypatch.setattr(settings, "database_pgbouncer", True)
+
+    options = engine_options("postgresql+asyncpg://localhost/bonde", TimedQueuePool)
+
+    assert options["poolclass"] is NullPool
+    assert options["connect_args"]["statement_cache_size"] == 0
+
+
+def test_engine_options_sqlite():
+    assert engine_options("sqlite://", TimedQueuePool) == {}
+
+
+def test_pool_stats_checkout(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "database_max_overflow", 2)
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/pool.db",
+        poolclass=TimedQueuePool,
+        pool_size=2,
+        max_overflow=settings.database_max_overflow,
+    )
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        stats = pool_stats(engine)
+        assert stats["checked_out"] == 1
+        assert stats["saturation"] == 0.25
+
+    stats = pool_stats(engine)
+    assert stats["checked_out"] == 0
+    assert stats["checkout_count"] == 1
+    assert stats["checkout_wait_total"] > 0
@@ -0,0 +1,135 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlmodel import select
+from unittest.mock import AsyncMock
+
+from app.enum import EventType
+from app.events import EventWriter
+from app.main import app
+from app.models import TwilioCallEvent
+
+
+def make_twilio_calls(make_twilio_call, total):
+    calls = [make_twilio_call(sid=f"CA_fake_sid_{i}") for i in range(total)]
+    return [(call.id, twilio_call.sid) for call, twilio_call in calls]
+
+
+@pytest.fixture
+def writer(async_session_maker, mocker):
+    writer = EventWriter(
+        enabled=True,
+        maxsize=100,
+        batch_size=3,
+        flush_interval=0.05,
+        session_maker=async_session_maker,
+    )
+    # Os webhooks de status gravam os eventos em app.callbacks
+    mocker.patch("app.callbacks.event_writer", writer)
+    return writer
+
+
+@pytest.mark.asyncio
+async def test_write_behind_flushes_events_in_batches(client, session, writer, make_twilio_call):
+    calls = make_twilio_calls(make_twilio_call, 5)
+    flush = writer._flush
+    batches = []
+
+    async def spy_flush(batch):
+        batches.append(len(batch))
+        await flush(batch)
+
+    writer._flush = spy_flush
+    await writer.start()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+        for call_id, sid in calls:
+            resp = await async_client.post(
+                f"/v1/phone/status-callback/{call_id}",
+                data={"CallSid": sid, "CallStatus": "ringing"},
+            )
+            assert resp.status_code == 200
+
+    await writer.stop()
+    events = session.exec(select(TwilioCallEvent)).all()
+
+    assert sorted(e.twilio_call_sid for e in events) == sorted(sid for _, sid in calls)
+    assert all(e.event_type == EventType.STATUS_CALLBACK for e in events)
+    assert sum(batches) == 5
+    assert max(batches) <= 3
+    assert writer.stats()["flushed"] == 5
+    assert writer.stats()["depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_write_behind_applies_backpressure(async_session_maker, make_twilio_call):
+    calls = make_twilio_calls(make_twilio_call, 2)
+    writer = EventWriter(enabled=True, maxsize=1, batch_size=10, flush_interval=0.05)
+
+    async def commit_event(sid):
+        async with async_session_maker() as async_session:
+            writer.add(async_session, TwilioCallEvent(
+                twilio_call_sid=sid, event_type=EventType.STATUS_CALLBACK, twilio_response={}
+            ))
+            await writer.commit(async_session)
+
+    await commit_event(calls[0][1])
+
+    # Fila cheia e sem worker: o segundo commit fica esperando espaço
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(commit_event(calls[1][1]), timeout=0.2)
+    assert writer.stats()["depth"] == 1
+
+
+@pytest.mark.asyncio
+async def test_write_behind_skips_duplicated_events(session, writer, make_twilio_call):
+    [(_, sid)] = make_twilio_calls(make_twilio_call, 1)
+    event = dict(
+        twilio_call_sid=sid,
+        event_type=EventType.STATUS_CALLBACK,
+        sequence_number=0,
+        twilio_response={"CallSid": sid, "SequenceNumber": "0"},
+    )
+
+    await writer._flush([dict(event)])
+    # Mesma entrega gravada por outro worker, junto com um evento novo
+    await writer._flush([dict(event), dict(event, sequence_number=1)])
+
+    events = session.exec(select(TwilioCallEvent)).all()
+    assert sorted(e.sequence_number for e in events) == [0, 1]
+    assert writer.stats()["dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_write_behind_retries_failed_batch(session, writer, make_twilio_call):
+    [(_, sid)] = make_twilio_calls(make_twilio_call, 1)
+    writer.backoff_base = writer.backoff_max = 0
+    insert = writer._insert
+    failures = [RuntimeError("database is down")]
+
+    async def flaky_insert(batch):
+        if failures:
+            raise failures.pop()
+        await insert(batch)
+
+    writer._insert = flaky_insert
+    await writer._flush([dict(twilio_call_sid=sid, event_type=EventType.STATUS_CALLBACK, twilio_response={})])
+
+    assert len(session.exec(select(TwilioCallEvent)).all()) == 1
+    assert writer.stats()["retried"] == 1
+    assert writer.stats()["dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_write_behind_drops_batch_after_max_attempts(writer, caplog):
+    writer.max_attempts = 2
+    writer.backoff_base = writer.backoff_max = 0
+    writer._insert = AsyncMock(side_effect=RuntimeError("database is down"))
+
+    await writer._flush([dict(twilio_call_sid="CA_lost", event_type=EventType.STATUS_CALLBACK, sequence_number=3)])
+
+    assert writer._insert.await_count == 2
+    assert writer.stats()["dropped"] == 1
+    assert "CA_lost" in caplog.text
@@ -0,0 +1,63 @@
+import pytest
+
+from app.graphql import GraphQLSessionManager, graphql_session, health_gql
+from app.main import app
+
+
+def make_manager(url):
+    return GraphQLSessionManager(
+        url,
+        headers=None,
+        ssl=False,
+        limit=10,
+        keepalive_timeout=30.0,
+        timeout=5.0,
+        execute_timeout=5.0,
+    )
+
+
+@pytest.mark.asyncio
+async def test_session_is_shared_and_reuses_connection(fake_graphql):
+    manager = make_manager(fake_graphql.url)
+
+    session = await manager.connect()
+    assert await manager.connect() is session
+
+    for _ in range(3):
+        result = await session.execute(health_gql)
+        assert result == {"__typename": "query_root"}
+
+    assert len(fake_graphql.requests) == 3
+    assert len(fake_graphql.connections) == 1
+
+    await manager.close()
+    assert manager.session is None
+
+
+@pytest.mark.asyncio
+async def test_health(fake_graphql):
+    manager = make_manager(fake_graphql.url)
+    assert await manager.health() is True
+
+    fake_graphql.status = 500
+    assert await manager.health() is False
+
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_health_unreachable():
+    manager = make_manager("http://127.0.0.1:9/v1/graphql")
+    assert await manager.health() is False
+    await manager.close()
+
+
+def test_health_endpoint(client, monkeypatch):
+    async def health():
+        return False
+
+    monkeypatch.setattr(graphql_session, "health", health)
+
+    resp = client.get("/health")
+    assert resp.status_code == 503
+    assert resp.json() == {"database": "ok", "graphql": "error"}
@@ -0,0 +1,71 @@
+import json
+import logging
+
+from app.config import settings
+from app.logger import JsonFormatter, RedactingFilter, log_payload, redact
+
+
+def make_record(msg, *args, **extra):
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_redact_phone_numbers():
+    assert redact("ligando para +5531998766543") == "ligando para ***6543"
+    assert redact({"To": "+5531876234123", "CallStatus": "ringing"}) == {
+        "To": "***4123",
+        "CallStatus": "ringing",
+    }
+
+
+def test_redact_keeps_digit_runs_that_are_not_phones():
+    text = "CallSid=CA1234567890123456 id=12345678901 at 1760800000000"
+
+    assert redact(text) == text
+    assert redact("para +5531998766543, sid CA5531998766543") == "para ***6543, sid CA5531998766543"
+
+
+def test_redacting_filter_formats_message_and_extra():
+    record = make_record("from %s", "+5531998766543", payload={"From": "5531998766543"})
+
+    RedactingFilter().filter(record)
+
+    assert record.getMessage() == "from ***6543"
+    assert record.payload == {"From": "***6543"}
+
+
+def test_json_formatter_includes_extra():
+    record = make_record("/%s ->> payload", "dial", route="dial", payload={"CallSid": "CA1"})
+
+    data = json.loads(JsonFormatter().format(record))
+
+    assert data["message"] == "/dial ->> payload"
+    assert data["level"] == "INFO"
+    assert data["route"] == "dial"
+    assert data["payload"] == {"CallSid": "CA1"}
+
+
+def test_log_payload_sampling(monkeypatch, caplog):
+    logger = logging.getLogger("app.test")
+    monkeypatch.setattr(settings, "log_payload_sample_rate", 1.0)
+    monkeypatch.setattr(settings, "log_payload_sample_rates", {"dial": 0.0})
+
+    with caplog.at_level(logging.INFO, logger="app.test"):
+        log_payload(logger, "dial", {"CallSid": "CA1"})
+        log_payload(logger, "status-callback", {"CallSid": "CA2"})
+
+    assert [r.payload for r in caplog.records] == [{"CallSid": "CA2"}]
+
+
+def test_log_payload_skipped_when_level_disabled(caplog):
+    class Payload(dict):
+        def keys(self):
+            raise AssertionError("payload não deveria ser copiado")
+
+    logger = logging.getLogger("app.test")
+
+    with caplog.at_level(logging.WARNING, logger="app.test"):
+        log_payload(logger, "dial", Payload(CallSid="CA1"))
+
+    assert caplog.records == []
@@ -0,0 +1,43 @@
+import os
+
+from prometheus_client import REGISTRY
+
+from app.enum import CallState
+from app.machine import CallMachine
+from app.models import Call
+
+
+def test_metrics_request_latency_by_route(client, session):
+    call = Call(from_number="+5531998766543", to_number="+5531876234123", state=CallState.COMPLETED)
+    session.add(call)
+    session.commit()
+
+    client.get(f"/v1/phone/status/{call.id}")
+    resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert 'route="/v1/phone/status/{call_id}"' in resp.text
+    assert "widget_cache_hits_total" in resp.text
+    assert "event_writer_queue_depth" in resp.text
+
+
+def test_metrics_call_machine_transitions():
+    labels = {"source": "connected", "dest": "completed"}
+    before = REGISTRY.get_sample_value("call_machine_transitions_total", labels) or 0
+
+    call = Call(from_number="+5531998766543", to_number="+5531876234123", state=CallState.CONNECTED)
+    CallMachine(call).complete()
+
+    assert REGISTRY.get_sample_value("call_machine_transitions_total", labels) == before + 1
+
+
+def test_metrics_multiprocess_labels_runtime_metrics_by_pid(client, monkeypatch, tmp_path):
+    # Diretório próprio: o MultiProcessCollector lê todos os *.db do diretório
+    multiproc_dir = tmp_path / "prometheus"
+    multiproc_dir.mkdir()
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(multiproc_dir))
+
+    resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert f'event_writer_queue_depth{{pid="{os.getpid()}"}}' in resp.text
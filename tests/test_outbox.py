@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+from gql.transport.exceptions import TransportQueryError
+from sqlmodel import select
+from unittest.mock import AsyncMock
+
+from app.graphql import GraphQLSessionManager
+from app.models import WidgetActionOutbox
+from app.outbox import OutboxWorker
+
+
+def make_actions(session, total):
+    actions = [
+        WidgetActionOutbox(
+            call_id=f"call-{i}",
+            widget_id=12,
+            activist={"name": "Test Unit", "phone": "+5531998899876"},
+            input={"custom_fields": {"call": f"call-{i}"}},
+        )
+        for i in range(total)
+    ]
+    session.add_all(actions)
+    session.commit()
+    return actions
+
+
+def make_worker(session_maker, get_client, **kwargs):
+    options = dict(
+        batch_size=10,
+        poll_interval=0.05,
+        lease_seconds=60,
+        max_attempts=3,
+        backoff_base=1.0,
+        backoff_max=10.0,
+    )
+    options.update(kwargs)
+    return OutboxWorker(
+        session_maker=session_maker,
+        get_client=get_client,
+        **options,
+    )
+
+
+def get_actions(session):
+    session.expire_all()
+    return session.exec(select(WidgetActionOutbox).order_by(WidgetActionOutbox.id)).all()
+
+
+@pytest.mark.asyncio
+async def test_outbox_sends_batch_in_one_mutation(session, async_session_maker, fake_graphql):
+    make_actions(session, 3)
+    manager = GraphQLSessionManager(
+        fake_graphql.url, headers=None, ssl=False, limit=10,
+        keepalive_timeout=30.0, timeout=5.0, execute_timeout=5.0,
+    )
+    worker = make_worker(async_session_maker, manager.connect)
+
+    assert await worker.process_batch() == 3
+    await manager.close()
+
+    assert len(fake_graphql.requests) == 1
+    request = fake_graphql.requests[0]
+    assert "a2: create_widget_action" in request["query"]
+    assert request["variables"]["input1"] == {"custom_fields": {"call": "call-1"}}
+
+    actions = get_actions(session)
+    assert all(a.sent_at is not None and a.attempts == 1 for a in actions)
+    assert await worker.process_batch() == 0
+
+
+@pytest.mark.asyncio
+async def test_outbox_retries_only_failed_actions(session, async_session_maker):
+    make_actions(session, 2)
+    client = AsyncMock()
+    client.execute.side_effect = TransportQueryError(
+        "boom",
+        errors=[{"message": "activist invalid", "path": ["a1"]}],
+        data={"a0": {"data": {}}, "a1": None},
+    )
+    worker = make_worker(async_session_maker, AsyncMock(return_value=client))
+
+    await worker.process_batch()
+
+    sent, failed = get_actions(session)
+    assert sent.sent_at is not None
+    assert failed.sent_at is None
+    assert failed.attempts == 1
+    assert failed.last_error == "activist invalid"
+    assert failed.next_attempt_at > failed.created_at
+    assert worker.stats() == {"sent": 1, "retried": 1, "failed": 0}
+
+    # Ainda em backoff: não é reenviada
+    assert await worker.process_batch() == 0
+
+
+@pytest.mark.asyncio
+async def test_outbox_records_batch_sent_while_cancelled(session, async_session_maker):
+    make_actions(session, 1)
+    client = AsyncMock()
+    started, sent = asyncio.Event(), asyncio.Event()
+
+    async def execute(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(0.05)
+        sent.set()
+
+    client.execute.side_effect = execute
+    worker = make_worker(async_session_maker, AsyncMock(return_value=client))
+
+    task = asyncio.create_task(worker.process_batch())
+    await asyncio.wait_for(started.wait(), 1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # O envio em andamento termina e o resultado é gravado
+    await asyncio.wait_for(sent.wait(), 1)
+    for _ in range(50):
+        action, = get_actions(session)
+        if action.sent_at is not None:
+            break
+        await asyncio.sleep(0.02)
+    assert action.sent_at is not None
+
+@pytest.mark.asyncio
+async def test_outbox_gives_up_after_max_attempts(session, async_session_maker):
+    make_actions(session, 1)
+    client = AsyncMock()
+    client.execute.side_effect = ConnectionError("BONDE API down")
+    worker = make_worker(async_session_maker, AsyncMock(return_value=client), max_attempts=1)
+
+    await worker.process_batch()
+
+    action, = get_actions(session)
+    assert action.sent_at is None
+    assert action.next_attempt_at is None
+    assert action.last_error == "BONDE API down"
+    assert worker.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_outbox_worker_wakes_up_on_new_action(session, async_session_maker):
+    client = AsyncMock()
+    worker = make_worker(async_session_maker, AsyncMock(return_value=client), poll_interval=60)
+    await worker.start()
+    await asyncio.sleep(0.05)
+
+    make_actions(session, 1)
+    worker.wake()
+    for _ in range(50):
+        if client.execute.await_count:
+            break
+        await asyncio.sleep(0.02)
+
+    await worker.stop()
+
+    assert client.execute.await_count == 1
+    action, = get_actions(session)
+    assert action.sent_at is not None
+
+
+def test_backoff_is_capped(async_session_maker):
+    worker = make_worker(async_session_maker, AsyncMock(), backoff_base=1.0, backoff_max=10.0)
+
+    assert 0.5 <= worker.backoff(1) <= 1.0
+    assert 4.0 <= worker.backoff(4) <= 8.0
+    assert worker.backoff(20) <= 10.0
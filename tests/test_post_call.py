@@ -3,9 +3,9 @@ from sqlmodel import select
 from twilio.twiml.voice_response import VoiceResponse, Gather
 
 from app.config import settings
-from app.models import Call, TwilioCall, TwilioCallEvent
+from app.models import Call, TwilioCall, TwilioCallEvent, WidgetActionOutbox
 from app.enum import TwilioCallStatus
-from app.graphql import create_widget_action_gql, get_widget_gql
+from app.graphql import get_widget_gql
 
 
 def get_mock_call(attrs = {}):
@@ -40,7 +40,7 @@ def test_call_success(client, mocker, session, mock_graphql_client):
     
     # Simula a resposta completa do Twilio
     mock_response = get_mock_call()
-    mock_client.calls.create.return_value = mock_response
+    mock_client.calls.create_async = mocker.AsyncMock(return_value=mock_response)
     
     resp = client.post("/v1/phone/call", json=payload)
     call = session.exec(select(Call)).first()
@@ -57,7 +57,7 @@ def test_call_create_event(client, mocker, session, mock_graphql_client):
     
     # Simula a resposta completa do Twilio
     mock_response = get_mock_call()
-    mock_client.calls.create.return_value = mock_response
+    mock_client.calls.create_async = mocker.AsyncMock(return_value=mock_response)
     
     client.post("/v1/phone/call", json=payload)
     call = session.exec(select(Call)).first()
@@ -65,7 +65,7 @@ def test_call_create_event(client, mocker, session, mock_graphql_client):
     twilio_call_event = session.exec(select(TwilioCallEvent)).first()
 
 
-    assert twilio_call.parent_call.id == call.id
+    assert twilio_call.parent_call_id == call.id
     assert twilio_call_event.twilio_call_sid == twilio_call.sid
 
 
@@ -76,7 +76,7 @@ def test_call_twilio_instruction_gather(client, mocker, session, mock_graphql_cl
     
     # Simula a resposta completa do Twilio
     mock_response = get_mock_call()
-    mock_client.calls.create.return_value = mock_response
+    mock_client.calls.create_async = mocker.AsyncMock(return_value=mock_response)
     
     client.post("/v1/phone/call", json=payload)
     call = session.exec(select(Call)).first()
@@ -87,7 +87,7 @@ def test_call_twilio_instruction_gather(client, mocker, session, mock_graphql_cl
     resp.hangup()
     expected_twiml = str(resp)
     
-    mock_client.calls.create.assert_called_once_with(
+    mock_client.calls.create_async.assert_awaited_once_with(
         to="+5531998899876",
         from_=settings.twilio_phone_number,
         status_callback=f"{settings.base_url}/v1/phone/status-callback/{call.id}",
@@ -101,28 +101,31 @@ def test_call_twilio_instruction_gather(client, mocker, session, mock_graphql_cl
     )
 
 
-def test_call_graphql_execute(client, mocker, mock_graphql_client, session):
+def test_call_widget_action_outbox(client, mocker, mock_graphql_client, session):
     payload = get_payload()
     mock_client = mocker.patch("app.api.routes.call.client")
     mock_graphql_client.execute.return_value = dict(widgets_by_pk=dict(id=0, kind="phone", settings=dict(targets=[payload.get("target")])))
     
     # Simula a resposta completa do Twilio
     mock_response = get_mock_call()
-    mock_client.calls.create.return_value = mock_response
+    mock_client.calls.create_async = mocker.AsyncMock(return_value=mock_response)
     
     client.post("/v1/phone/call", json=payload)
     
     call = session.exec(select(Call)).first()
+    action = session.exec(select(WidgetActionOutbox)).first()
     
-    first_call_args, first_call_kwargs = mock_graphql_client.execute.call_args_list[1]
-    assert create_widget_action_gql == first_call_args[0]
+    # A ação no BONDE é enviada em background, não durante a requisição
+    assert mock_graphql_client.execute.call_count == 1
+    assert action.call_id == call.id
+    assert action.sent_at is None
     assert {
         "widget_id": payload.get("widget_id"),
         "activist": payload.get("activist"),
         "input": {
             "custom_fields": { "call": call.id }
         }
-    } == first_call_kwargs.get("variable_values")
+    } == {"widget_id": action.widget_id, "activist": action.activist, "input": action.input}
 
 
 def test_call_search_widget(client, mocker, mock_graphql_client, session):
@@ -133,7 +136,7 @@ def test_call_search_widget(client, mocker, mock_graphql_client, session):
     
     # Simula a resposta completa do Twilio
     mock_response = get_mock_call()
-    mock_client.calls.create.return_value = mock_response
+    mock_client.calls.create_async = mocker.AsyncMock(return_value=mock_response)
     
     client.post("/v1/phone/call", json=payload)
     
@@ -0,0 +1,86 @@
+import io
+import json
+from datetime import timedelta
+
+from sqlalchemy import inspect
+from sqlmodel import select
+
+from app.enum import EventType, TwilioCallStatus
+from app.models import TwilioCallEvent, WebhookInbox, create_timestamp
+from app.retention import purge_events, purge_webhook_inbox
+
+
+def make_events(session, make_twilio_call, ages):
+    _, twilio_call = make_twilio_call(status=TwilioCallStatus.COMPLETED)
+    now = create_timestamp()
+    events = [
+        TwilioCallEvent(
+            twilio_call=twilio_call,
+            event_type=EventType.STATUS_CALLBACK,
+            twilio_response={"age": age},
+            created_at=now - timedelta(days=age),
+        )
+        for age in ages
+    ]
+    session.add_all(events)
+    session.commit()
+
+
+def test_purge_events_older_than_retention(session, make_twilio_call):
+    make_events(session, make_twilio_call, [400, 300, 200, 10, 0])
+
+    archive = io.StringIO()
+    total = purge_events(session, timedelta(days=180), batch_size=2, archive=archive)
+
+    assert total == 3
+    remaining = session.exec(select(TwilioCallEvent)).all()
+    assert sorted(e.twilio_response["age"] for e in remaining) == [0, 10]
+
+    archived = [json.loads(line) for line in archive.getvalue().splitlines()]
+    assert [e["twilio_response"]["age"] for e in archived] == [400, 300, 200]
+
+
+def test_purge_events_skips_recent_events_inside_the_range(session, make_twilio_call):
+    # Evento recente com id menor que o de um vencido (gravado fora de ordem)
+    make_events(session, make_twilio_call, [400, 0, 300, 5])
+
+    total = purge_events(session, timedelta(days=180), batch_size=10)
+
+    assert total == 2
+    remaining = session.exec(select(TwilioCallEvent)).all()
+    assert sorted(e.twilio_response["age"] for e in remaining) == [0, 5]
+
+
+def test_purge_events_nothing_to_remove(session, make_twilio_call):
+    make_events(session, make_twilio_call, [1])
+
+    assert purge_events(session, timedelta(days=180)) == 0
+
+
+def test_phone_indexes(engine):
+    inspector = inspect(engine)
+
+    call_indexes = {ix["name"] for ix in inspector.get_indexes("phone_calls")}
+    assert {
+        "ix_phone_calls_state_updated_at",
+        "ix_phone_calls_created_at",
+        "ix_phone_calls_active_updated_at",
+    } <= call_indexes
+
+    event_indexes = {ix["name"] for ix in inspector.get_indexes("phone_twilio_call_events")}
+    assert "ix_phone_twilio_call_events_created_at" in event_indexes
+
+
+def test_purge_webhook_inbox_keeps_pending(session):
+    now = create_timestamp()
+    session.add_all([
+        WebhookInbox(call_id="old", route="status-callback", form={}, processed_at=now - timedelta(days=200)),
+        WebhookInbox(call_id="recent", route="status-callback", form={}, processed_at=now),
+        WebhookInbox(call_id="failed", route="status-callback", form={}, next_attempt_at=None),
+    ])
+    session.commit()
+
+    assert purge_webhook_inbox(session, timedelta(days=180), batch_size=1) == 1
+
+    remaining = session.exec(select(WebhookInbox.call_id)).all()
+    assert sorted(remaining) == ["failed", "recent"]
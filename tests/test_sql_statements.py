@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+from sqlmodel import select
+
+from app.enum import CallState, EventType
+from app.models import Call, TwilioCall, TwilioCallEvent
+from app.queries import get_calls_with_twilio_calls
+from tests.test_status_callback import get_form
+
+
+# Quantidade máxima de comandos SQL por webhook. Um número maior indica
+# relacionamento carregado em uma consulta à parte (N+1).
+def post(client, sql_statements, url, **form):
+    sql_statements.reset()
+    resp = client.post(url, data=get_form(**form))
+    assert resp.status_code == 200
+    return sql_statements.count
+
+
+def test_status_callback_statements(client, session, sql_statements, make_twilio_call):
+    call, _ = make_twilio_call()
+
+    # SELECT (TwilioCall + Call), UPDATE Call, UPDATE TwilioCall, INSERT evento
+    assert post(client, sql_statements, f"/v1/phone/status-callback/{call.id}", SequenceNumber="0") <= 4
+
+
+def test_amd_status_callback_statements(client, session, sql_statements, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.ANSWERED)
+
+    assert post(client, sql_statements, f"/v1/phone/amd-status-callback/{call.id}", AnsweredBy="human") <= 4
+
+
+def test_dial_statements(client, session, sql_statements, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.ANSWERED)
+
+    # SELECT (TwilioCall + Call) e a reserva do alvo no TargetLimiter
+    assert post(client, sql_statements, f"/v1/phone/dial/{call.id}") <= 5
+
+
+def test_dial_callbacks_statements(client, session, sql_statements, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.REDIRECTING)
+    url = f"/v1/phone/dial-status-callback/{call.id}"
+
+    # INSERT ... ON CONFLICT do TwilioCall, SELECT, UPDATE Call, INSERT evento
+    assert post(client, sql_statements, url, CallSid="CA_dial_sid", SequenceNumber="0") <= 4
+    assert post(
+        client, sql_statements, url,
+        CallSid="CA_dial_sid", CallStatus="in-progress", SequenceNumber="1",
+    ) <= 4
+    assert post(
+        client, sql_statements, f"/v1/phone/dial-amd-status-callback/{call.id}",
+        CallSid="CA_dial_sid", CallStatus="in-progress", AnsweredBy="human",
+    ) <= 4
+
+    session.expire_all()
+    assert session.get(Call, call.id).state == CallState.CONNECTED
+
+
+def test_status_statements(client, session, sql_statements, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.RINGING)
+
+    sql_statements.reset()
+    client.get(f"/v1/phone/status/{call.id}")
+    assert sql_statements.count == 1
+    assert "phone_twilio_calls" not in sql_statements.statements[0]
+
+    # Servido pelo status_cache
+    sql_statements.reset()
+    client.get(f"/v1/phone/status/{call.id}")
+    assert sql_statements.count == 0
+
+
+@pytest.mark.asyncio
+async def test_selectin_statements_do_not_grow_with_calls(session, async_session_maker, sql_statements, make_twilio_call):
+    call_ids = []
+    for index in range(10):
+        call, twilio_call = make_twilio_call(sid=f"CA_{index}")
+        session.add(TwilioCallEvent(event_type=EventType.STATUS_CALLBACK, twilio_call_sid=twilio_call.sid))
+        call_ids.append(call.id)
+    session.commit()
+
+    async with async_session_maker() as async_session:
+        sql_statements.reset()
+        calls = await get_calls_with_twilio_calls(async_session, call_ids, events=True)
+
+        # Call, TwilioCall e TwilioCallEvent: uma consulta por nível
+        assert sql_statements.count == 3
+        assert len(calls) == 10
+        assert all(len(call.twilio_calls[0].events) == 1 for call in calls)
+        assert sql_statements.count == 3
+
+
+@pytest.mark.asyncio
+async def test_lazy_load_raises(session, async_session_maker, make_twilio_call):
+    call, _ = make_twilio_call()
+
+    async with async_session_maker() as async_session:
+        twilio_call = (
+            await async_session.exec(select(TwilioCall).where(TwilioCall.sid == "CA_fake_sid"))
+        ).one()
+
+        with pytest.raises(InvalidRequestError):
+            twilio_call.parent_call
@@ -60,4 +60,34 @@ def test_call_machine_failed_cycle():
     with pytest.raises(MachineError, match="Can't trigger event call from state RINGING!"):
         machine = CallMachine(call)
         for e in events:
-            getattr(machine, e)()
\ No newline at end of file
+            getattr(machine, e)()
+
+def test_call_machine_complete_from_connected():
+    call = create_call_record(state=CallState.CONNECTED)
+
+    CallMachine(call).complete()
+
+    assert call.state == CallState.COMPLETED
+
+
+def test_call_machine_complete_is_idempotent():
+    call = create_call_record(state=CallState.COMPLETED)
+
+    CallMachine(call).complete()
+
+    assert call.state == CallState.COMPLETED
+
+
+def test_call_machine_complete_before_connected_fails():
+    call = create_call_record(state=CallState.DESTINATION_RINGING)
+
+    CallMachine(call).complete()
+
+    assert call.state == CallState.FAILED
+
+
+def test_call_machine_fail_from_any_state():
+    for state in CallState:
+        call = create_call_record(state=state)
+        CallMachine(call).fail()
+        assert call.state == CallState.FAILED
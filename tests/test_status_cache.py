@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from app.config import settings
+from app.enum import CallState
+from app.status import get_cached_status, publish_status, status_cache
+
+
+def test_status_is_served_from_cache(client, session, make_twilio_call):
+    call, _ = make_twilio_call()
+
+    assert client.get(f"/v1/phone/status/{call.id}").json()["status"] == "initiated"
+
+    # Alteração fora da CallMachine não passa pelo cache
+    call.state = CallState.CONNECTED
+    session.add(call)
+    session.commit()
+
+    assert client.get(f"/v1/phone/status/{call.id}").json()["status"] == "initiated"
+    assert status_cache.stats()["hits"] == 1
+
+
+def test_status_cache_write_through_on_transition(client, session, make_twilio_call):
+    call, _ = make_twilio_call()
+    client.get(f"/v1/phone/status/{call.id}")
+
+    client.post(
+        f"/v1/phone/status-callback/{call.id}",
+        data={"CallSid": "CA_fake_sid", "CallStatus": "completed", "Direction": "outbound-api"},
+    )
+
+    assert status_cache.get(call.id) == "canceled"
+    assert client.get(f"/v1/phone/status/{call.id}").json()["status"] == "canceled"
+
+
+def test_status_cache_pins_terminal_status(client, session, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.COMPLETED)
+
+    client.get(f"/v1/phone/status/{call.id}")
+
+    expires_at, value = status_cache._data[call.id]
+    assert value == "completed"
+    assert expires_at - time.monotonic() > settings.status_cache_ttl
+
+
+def test_status_etag_not_modified(client, session, make_twilio_call):
+    call, _ = make_twilio_call()
+
+    resp = client.get(f"/v1/phone/status/{call.id}")
+    etag = resp.headers["etag"]
+
+    resp = client.get(f"/v1/phone/status/{call.id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+
+    resp = client.get(f"/v1/phone/status/{call.id}", headers={"If-None-Match": '"ringing"'})
+    assert resp.status_code == 200
+
+
+def test_status_not_found(client):
+    resp = client.get("/v1/phone/status/unknown")
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_status_loader_does_not_overwrite_newer_publish():
+    async def loader():
+        # Um commit publica o novo status enquanto o SELECT está em andamento
+        publish_status("call-1", "completed")
+        return "initiated"
+
+    assert await get_cached_status("call-1", loader) == "initiated"
+    assert status_cache.get("call-1") == "completed"
+
+    async def unchanged():
+        return "ringing"
+
+    assert await get_cached_status("call-2", unchanged) == "ringing"
+    assert status_cache.get("call-2") == "ringing"
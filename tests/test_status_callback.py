@@ -0,0 +1,181 @@
+from sqlmodel import select
+
+from app.models import Call, TwilioCall, TwilioCallEvent
+from app.dedup import seen_webhooks
+from app.enum import CallState, TwilioCallStatus
+
+
+def get_form(**kwargs):
+    return {
+        "CallSid": "CA_fake_sid",
+        "CallStatus": "ringing",
+        "Direction": "outbound-api",
+        **kwargs
+    }
+
+
+def test_status_callback_ringing(client, session, make_twilio_call):
+    call, _ = make_twilio_call()
+
+    resp = client.post(f"/v1/phone/status-callback/{call.id}", data=get_form())
+    session.refresh(call)
+
+    assert resp.status_code == 200
+    assert call.state == CallState.RINGING
+
+
+def test_status_callback_create_event(client, session, make_twilio_call):
+    call, twilio_call = make_twilio_call()
+
+    client.post(f"/v1/phone/status-callback/{call.id}", data=get_form())
+    event = session.exec(select(TwilioCallEvent)).first()
+
+    assert event.twilio_call_sid == twilio_call.sid
+    assert event.twilio_response["CallStatus"] == "ringing"
+
+
+def test_amd_status_callback_human(client, session, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.ANSWERED)
+
+    resp = client.post(
+        f"/v1/phone/amd-status-callback/{call.id}",
+        data=get_form(AnsweredBy="human"),
+    )
+    session.refresh(call)
+
+    assert resp.status_code == 200
+    assert call.state == CallState.REDIRECTING
+
+
+def test_dial_status_callback_create_twilio_call(client, session, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.REDIRECTING)
+
+    resp = client.post(
+        f"/v1/phone/dial-status-callback/{call.id}",
+        data=get_form(CallSid="CA_dial_sid", Direction="outbound-dial"),
+    )
+    session.refresh(call)
+    twilio_call = session.get(TwilioCall, "CA_dial_sid")
+
+    assert resp.status_code == 200
+    assert twilio_call.parent_call_id == call.id
+    assert call.state == CallState.DESTINATION_RINGING
+
+
+def test_dial_redirect_twiml(client, session, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.REDIRECTING)
+
+    resp = client.post(f"/v1/phone/dial/{call.id}", data=get_form())
+
+    assert resp.status_code == 200
+    assert "<Dial" in resp.text
+    assert call.to_number in resp.text
+
+
+def test_dial_status_callback_updates_existing_twilio_call(client, session, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.DESTINATION_RINGING)
+    session.add(TwilioCall(
+        sid="CA_dial_sid",
+        status=TwilioCallStatus.RINGING,
+        answered_by="human",
+        parent_call_id=call.id,
+    ))
+    session.commit()
+
+    resp = client.post(
+        f"/v1/phone/dial-status-callback/{call.id}",
+        data=get_form(CallSid="CA_dial_sid", CallStatus="in-progress"),
+    )
+    session.expire_all()
+    twilio_call = session.get(TwilioCall, "CA_dial_sid")
+
+    assert resp.status_code == 200
+    assert twilio_call.status == TwilioCallStatus.IN_PROGRESS
+    # AnsweredBy ausente no payload não apaga o valor anterior
+    assert twilio_call.answered_by == "human"
+    assert session.get(Call, call.id).state == CallState.DESTINATION_ANSWERED
+
+
+def test_amd_status_callback_records_twilio_response(client, session, make_twilio_call):
+    call, twilio_call = make_twilio_call(state=CallState.ANSWERED)
+
+    client.post(f"/v1/phone/amd-status-callback/{call.id}", data=get_form(AnsweredBy="human"))
+    event = session.exec(select(TwilioCallEvent)).first()
+
+    assert event.twilio_response["AnsweredBy"] == "human"
+    assert event.twilio_response["CallSid"] == twilio_call.sid
+
+
+def test_dial_status_callback_records_twilio_response(client, session, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.REDIRECTING)
+
+    client.post(
+        f"/v1/phone/dial-status-callback/{call.id}",
+        data=get_form(CallSid="CA_dial_sid", Direction="outbound-dial", SequenceNumber="0"),
+    )
+    event = session.exec(
+        select(TwilioCallEvent).where(TwilioCallEvent.twilio_call_sid == "CA_dial_sid")
+    ).one()
+
+    assert event.twilio_response["SequenceNumber"] == "0"
+
+
+def test_status_callback_invalid_status(client, session, make_twilio_call):
+    call, _ = make_twilio_call()
+
+    resp = client.post(
+        f"/v1/phone/status-callback/{call.id}", data=get_form(CallStatus="unknown")
+    )
+    session.refresh(call)
+
+    assert resp.status_code == 422
+    assert resp.json()["detail"][0]["loc"] == ["CallStatus"]
+    assert call.state == CallState.INITIATED
+    assert session.exec(select(TwilioCallEvent)).all() == []
+
+
+def test_status_callback_duplicate_delivery(client, session, make_twilio_call):
+    call, _ = make_twilio_call()
+    form = get_form(SequenceNumber="0")
+
+    client.post(f"/v1/phone/status-callback/{call.id}", data=form)
+    resp = client.post(f"/v1/phone/status-callback/{call.id}", data=form)
+
+    assert resp.status_code == 200
+    assert len(session.exec(select(TwilioCallEvent)).all()) == 1
+
+
+def test_status_callback_drops_stale_sequence(client, session, make_twilio_call):
+    call, _ = make_twilio_call()
+    path = f"/v1/phone/status-callback/{call.id}"
+
+    client.post(path, data=get_form(CallStatus="ringing", SequenceNumber="1"))
+    client.post(path, data=get_form(CallStatus="in-progress", SequenceNumber="2"))
+    # `ringing` chega de novo, depois de `in-progress`
+    seen_webhooks.invalidate()
+    client.post(path, data=get_form(CallStatus="ringing", SequenceNumber="1"))
+    session.refresh(call)
+
+    assert call.state == CallState.ANSWERED
+    assert [e.sequence_number for e in session.exec(select(TwilioCallEvent)).all()] == [1, 2]
+
+
+def test_dial_status_callback_drops_stale_sequence(client, session, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.REDIRECTING)
+    path = f"/v1/phone/dial-status-callback/{call.id}"
+    form = dict(CallSid="CA_dial_sid", Direction="outbound-dial")
+
+    client.post(path, data=get_form(CallStatus="ringing", SequenceNumber="1", **form))
+    client.post(path, data=get_form(CallStatus="in-progress", SequenceNumber="2", **form))
+    seen_webhooks.invalidate()
+    client.post(path, data=get_form(CallStatus="ringing", SequenceNumber="1", **form))
+    session.refresh(call)
+    twilio_call = session.get(TwilioCall, "CA_dial_sid")
+
+    assert call.state == CallState.DESTINATION_ANSWERED
+    assert twilio_call.status == TwilioCallStatus.IN_PROGRESS
+    assert twilio_call.sequence_number == 2
+    events = session.exec(
+        select(TwilioCallEvent).where(TwilioCallEvent.twilio_call_sid == "CA_dial_sid")
+    ).all()
+    assert len(events) == 2
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.enum import CallState, TwilioCallStatus
+from app.machine import CallMachine
+from app.main import app
+from app.models import Call, TwilioCall
+from app.notify import status_broker
+
+
+def make_call(session, state):
+    call = Call(from_number="+5531998766543", to_number="+5531876234123", state=state)
+    session.add(call)
+    session.commit()
+    session.refresh(call)
+    return call
+
+
+def parse_events(body):
+    return [
+        json.loads(line.removeprefix("data: "))["status"]
+        for line in body.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+def test_status_stream_terminal_call(client, session):
+    call = make_call(session, CallState.COMPLETED)
+
+    resp = client.get(f"/v1/phone/status/{call.id}/stream")
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert parse_events(resp.text) == ["completed"]
+    assert call.id not in status_broker._subscribers
+
+
+def test_status_stream_not_found(client):
+    resp = client.get("/v1/phone/status/not-found/stream")
+
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_status_published_after_commit(session, async_engine):
+    call = make_call(session, CallState.INITIATED)
+    queue = status_broker.subscribe(call.id)
+
+    try:
+        async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+            db_call = await async_session.get(Call, call.id)
+            CallMachine(db_call).call()
+            assert queue.empty()
+
+            await async_session.commit()
+            assert queue.get_nowait() == "initiated"
+
+            CallMachine(db_call).fail()
+            await async_session.rollback()
+            assert queue.empty()
+    finally:
+        status_broker.unsubscribe(call.id, queue)
+
+
+@pytest.mark.asyncio
+async def test_status_stream_pushes_transitions(client, session):
+    call = make_call(session, CallState.CONNECTED)
+    session.add(TwilioCall(sid="CA_dial_sid", status=TwilioCallStatus.IN_PROGRESS, parent_call_id=call.id))
+    session.commit()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+        stream = asyncio.create_task(async_client.get(f"/v1/phone/status/{call.id}/stream"))
+        while call.id not in status_broker._subscribers:
+            await asyncio.sleep(0.01)
+
+        await async_client.post(
+            f"/v1/phone/dial-status-callback/{call.id}",
+            data={"CallSid": "CA_dial_sid", "CallStatus": "completed"},
+        )
+        resp = await asyncio.wait_for(stream, timeout=5)
+
+    assert parse_events(resp.text) == ["in-progress", "completed"]
@@ -0,0 +1,164 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+
+import app.api.routes.call as call_routes
+import app.limiter
+from app.enum import CallState, TwilioCallStatus
+from app.limiter import MemoryTargetLimiter, TableTargetLimiter
+from app.machine import CallMachine
+from app.models import Call, TargetSlot
+from app.twiml import TARGET_BUSY_TWIML
+
+
+TARGET = "+5531876234123"
+
+
+def make_redirecting_call(make_twilio_call, sid):
+    call, _ = make_twilio_call(
+        state=CallState.REDIRECTING, sid=sid, status=TwilioCallStatus.IN_PROGRESS, to_number=TARGET
+    )
+    return call
+
+
+def make_limiter(limiter_class, **kwargs):
+    options = dict(max_concurrency=1, active_ttl=3600, waiting_ttl=30)
+    options.update(kwargs)
+    return limiter_class(**options)
+
+
+@pytest.fixture
+def table_limiter(monkeypatch):
+    limiter = make_limiter(TableTargetLimiter)
+    monkeypatch.setattr(app.limiter, "target_limiter", limiter)
+    monkeypatch.setattr(call_routes, "target_limiter", limiter)
+    return limiter
+
+
+@pytest.mark.asyncio
+async def test_memory_limiter_fifo():
+    limiter = make_limiter(MemoryTargetLimiter)
+
+    assert (await limiter.acquire(None, TARGET, "a"))[0] is True
+    assert (await limiter.acquire(None, TARGET, "b"))[0] is False
+    assert (await limiter.acquire(None, TARGET, "c"))[0] is False
+    # Outros alvos não são afetados
+    assert (await limiter.acquire(None, "+5531876234124", "d"))[0] is True
+
+    limiter.release_committed(["a"])
+
+    # "c" chegou depois de "b" e continua esperando
+    assert (await limiter.acquire(None, TARGET, "c"))[0] is False
+    assert (await limiter.acquire(None, TARGET, "b"))[0] is True
+
+
+@pytest.mark.asyncio
+async def test_memory_limiter_expires_abandoned_waiters():
+    limiter = make_limiter(MemoryTargetLimiter, waiting_ttl=0)
+
+    await limiter.acquire(None, TARGET, "a")
+    await limiter.acquire(None, TARGET, "b")
+    limiter.release_committed(["a"])
+
+    # "b" desligou sem passar pela fila de novo
+    assert (await limiter.acquire(None, TARGET, "c"))[0] is True
+
+
+@pytest.mark.asyncio
+async def test_memory_limiter_releases_only_after_commit(session, monkeypatch, make_twilio_call):
+    limiter = make_limiter(MemoryTargetLimiter)
+    monkeypatch.setattr(app.limiter, "target_limiter", limiter)
+    call = make_redirecting_call(make_twilio_call, "CA_1")
+    await limiter.acquire(None, TARGET, call.id)
+
+    # O commit falha depois do before_commit: a vaga continua ocupada
+    CallMachine(call).fail()
+    session.add_all([call, Call(from_number="+5531998766543", to_number=None)])
+    with pytest.raises(IntegrityError):
+        session.commit()
+    session.rollback()
+    assert (await limiter.acquire(None, TARGET, "other"))[0] is False
+
+    call = session.get(Call, call.id)
+    CallMachine(call).fail()
+    session.add(call)
+    session.commit()
+
+    assert limiter._slots == {TARGET: {"other": limiter._slots[TARGET]["other"]}}
+    limiter.release_committed(["other"])
+    # Alvos sem ligações saem do mapa
+    assert limiter._slots == {}
+
+
+def test_dial_waits_when_target_is_busy(client, session, table_limiter, make_twilio_call):
+    first = make_redirecting_call(make_twilio_call, "CA_first")
+    second = make_redirecting_call(make_twilio_call, "CA_second")
+
+    resp = client.post(f"/v1/phone/dial/{first.id}", data={"CallSid": "CA_first"})
+    assert "<Dial" in resp.text
+
+    resp = client.post(f"/v1/phone/dial/{second.id}", data={"CallSid": "CA_second"})
+    assert "<Dial" not in resp.text
+    assert f"/v1/phone/hold/{second.id}</Redirect>" in resp.text
+
+    slots = {s.call_id: s.status for s in session.exec(select(TargetSlot)).all()}
+    assert slots == {first.id: "active", second.id: "waiting"}
+
+
+def test_hold_dials_when_target_is_released(client, session, table_limiter, make_twilio_call):
+    first = make_redirecting_call(make_twilio_call, "CA_first")
+    second = make_redirecting_call(make_twilio_call, "CA_second")
+    client.post(f"/v1/phone/dial/{first.id}", data={"CallSid": "CA_first"})
+    client.post(f"/v1/phone/dial/{second.id}", data={"CallSid": "CA_second"})
+
+    resp = client.post(f"/v1/phone/hold/{second.id}")
+    assert "<Say" not in resp.text
+    assert "<Pause" in resp.text
+
+    # Ligação chega a um estado final e libera a vaga no commit
+    CallMachine(first).complete()
+    session.add(first)
+    session.commit()
+    assert session.get(TargetSlot, first.id) is None
+
+    resp = client.post(f"/v1/phone/hold/{second.id}")
+    assert "<Dial" in resp.text
+    session.expire_all()
+    assert session.get(TargetSlot, second.id).status == "active"
+
+
+def test_hold_gives_up_after_max_wait(client, session, table_limiter, make_twilio_call):
+    first = make_redirecting_call(make_twilio_call, "CA_first")
+    second = make_redirecting_call(make_twilio_call, "CA_second")
+    client.post(f"/v1/phone/dial/{first.id}", data={"CallSid": "CA_first"})
+    client.post(f"/v1/phone/dial/{second.id}", data={"CallSid": "CA_second"})
+
+    slot = session.get(TargetSlot, second.id)
+    slot.created_at = slot.created_at - timedelta(minutes=30)
+    session.add(slot)
+    session.commit()
+
+    resp = client.post(f"/v1/phone/hold/{second.id}")
+
+    assert resp.text == TARGET_BUSY_TWIML
+    session.expire_all()
+    assert session.get(Call, second.id).state == CallState.FAILED
+    assert session.get(TargetSlot, second.id) is None
+
+
+def test_hold_hangs_up_finished_call(client, session, table_limiter, make_twilio_call):
+    call = make_redirecting_call(make_twilio_call, "CA_first")
+    call.state = CallState.COMPLETED
+    session.add(call)
+    session.commit()
+
+    resp = client.post(f"/v1/phone/hold/{call.id}")
+
+    assert "<Hangup" in resp.text
+    assert "<Dial" not in resp.text
+
+
+def test_hold_not_found(client):
+    assert client.post("/v1/phone/hold/unknown").status_code == 404
@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.main import app
+from app.twilio import PooledAsyncTwilioHttpClient
+
+
+def get_payload(phone="+5531998899876"):
+    return {
+        "activist": { "first_name": "Test", "last_name": "Unit", "name": "Test Unit", "phone": phone, "email": "test@unit.devel" },
+        "target": {"name": "Target Name", "phone": "+5531998899875"},
+        "widget_id": 12
+    }
+
+
+def mock_widget(mock_graphql_client):
+    mock_graphql_client.execute.return_value = dict(widgets_by_pk=dict(id=0, kind="phone", settings=dict(targets=[get_payload().get("target")])))
+
+
+def test_call_through_fake_twilio(client, fake_twilio, mock_graphql_client):
+    mock_widget(mock_graphql_client)
+
+    resp = client.post("/v1/phone/call", json=get_payload())
+
+    assert resp.status_code == 200
+    assert resp.json()["twilio_call_sid"].startswith("CA")
+    assert resp.json()["twilio_call_status"] == "queued"
+    assert fake_twilio.requests[0]["To"] == "+5531998899876"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_do_not_block_event_loop(client, fake_twilio, mock_graphql_client):
+    mock_widget(mock_graphql_client)
+    fake_twilio.delay = 0.3
+    total = 10
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+        responses = await asyncio.gather(*(
+            async_client.post("/v1/phone/call", json=get_payload(f"+55319988998{i:02d}"))
+            for i in range(total)
+        ))
+
+    assert [r.status_code for r in responses] == [200] * total
+    assert len(fake_twilio.requests) == total
+    # Se a criação da ligação bloqueasse o event loop, o Twilio receberia uma
+    # requisição por vez
+    assert fake_twilio.max_in_flight > 1
+
+
+@pytest.mark.asyncio
+async def test_twilio_request_times_out(fake_twilio):
+    fake_twilio.delay = 1
+    http_client = PooledAsyncTwilioHttpClient(limit=1, keepalive_timeout=1, timeout=0.2)
+    host, port = fake_twilio.server_address
+
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await http_client.request(
+                "POST",
+                f"http://{host}:{port}/2010-04-01/Accounts/ACxxx/Calls.json",
+                data={"To": "+5531998899876"},
+                timeout=None,
+            )
+    finally:
+        await http_client.close()
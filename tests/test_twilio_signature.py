@@ -0,0 +1,73 @@
+from urllib.parse import urlsplit
+
+import pytest
+
+from app.config import settings
+from app.signature import validator
+from app.enum import CallState
+from tests.test_status_callback import get_form
+
+
+@pytest.fixture(autouse=True)
+def validate_signature(monkeypatch):
+    monkeypatch.setattr(settings, "twilio_validate_signature", True)
+
+
+def sign(path, form):
+    return validator.compute_signature(settings.base_url + path, form)
+
+
+def test_webhook_with_valid_signature(client, session, make_twilio_call):
+    call, _ = make_twilio_call()
+    path = f"/v1/phone/status-callback/{call.id}"
+    form = get_form()
+
+    resp = client.post(path, data=form, headers={"X-Twilio-Signature": sign(path, form)})
+    session.refresh(call)
+
+    assert resp.status_code == 200
+    assert call.state == CallState.RINGING
+
+
+def test_webhook_with_invalid_signature(client, session, make_twilio_call):
+    call, _ = make_twilio_call()
+    path = f"/v1/phone/status-callback/{call.id}"
+    # Assinatura de outro formulário
+    signature = sign(path, get_form(CallStatus="completed"))
+
+    resp = client.post(path, data=get_form(), headers={"X-Twilio-Signature": signature})
+    session.refresh(call)
+
+    assert resp.status_code == 403
+    assert call.state == CallState.INITIATED
+
+
+def test_webhook_without_signature(client, session, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.REDIRECTING)
+
+    resp = client.post(f"/v1/phone/dial/{call.id}", data=get_form())
+
+    assert resp.status_code == 403
+
+
+def test_signature_accepts_url_without_port(client, session, monkeypatch, make_twilio_call):
+    monkeypatch.setattr(settings, "base_url", "https://api.bonde.devel:8443")
+    call, _ = make_twilio_call(state=CallState.REDIRECTING)
+    path = f"/v1/phone/dial/{call.id}"
+    form = get_form()
+    # O Twilio às vezes assina a URL sem a porta
+    parts = urlsplit(settings.base_url)
+    url = parts._replace(netloc=parts.hostname).geturl()
+    assert url == "https://api.bonde.devel"
+    signature = validator.compute_signature(url + path, form)
+
+    resp = client.post(path, data=form, headers={"X-Twilio-Signature": signature})
+
+    assert resp.status_code == 200
+    assert "<Dial" in resp.text
+
+
+def test_bonde_routes_are_not_validated(client):
+    resp = client.get("/v1/phone/status/unknown")
+
+    assert resp.status_code == 404
@@ -0,0 +1,32 @@
+import xml.etree.ElementTree as ET
+
+from app.twiml import HANGUP_TWIML, TwiMLTemplate, dial_response, gather_response
+
+
+BASE_URL = "https://api.bonde.devel/v1/phone"
+
+
+def test_template_matches_twilio_rendering():
+    gather = TwiMLTemplate(gather_response, "call_id", base_url=BASE_URL)
+    dial = TwiMLTemplate(dial_response, "call_id", "from_number", "to_number", base_url=BASE_URL)
+
+    values = dict(call_id="b3c1e2a4-uuid", from_number="+5531998766543", to_number="+5531876234123")
+
+    assert gather.render(call_id=values["call_id"]) == str(gather_response(BASE_URL, values["call_id"]))
+    assert dial.render(**values) == str(dial_response(BASE_URL, **values))
+
+
+def test_template_escapes_values():
+    dial = TwiMLTemplate(dial_response, "call_id", "from_number", "to_number", base_url=BASE_URL)
+    evil = '"><Hangup/>{call_id}&'
+
+    xml = dial.render(call_id="1", from_number=evil, to_number=evil)
+    root = ET.fromstring(xml)
+
+    assert root.find("Dial").get("callerId") == evil
+    assert root.find("Dial/Number").text == evil
+    assert root.find("Hangup") is None
+
+
+def test_hangup_constant():
+    assert ET.fromstring(HANGUP_TWIML).find("Hangup") is not None
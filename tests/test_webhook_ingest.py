@@ -0,0 +1,254 @@
+from datetime import timedelta
+
+import pytest
+from sqlmodel import select
+
+import app.callbacks
+from app.config import settings
+from app.enum import CallState
+from app.ingest import WebhookConsumer, replay, webhook_consumer
+from app.models import TwilioCall, TwilioCallEvent, WebhookInbox, create_timestamp
+from app.twiml import HANGUP_TWIML
+from tests.test_status_callback import get_form
+
+
+@pytest.fixture(autouse=True)
+def ingest_mode(monkeypatch):
+    monkeypatch.setattr(settings, "webhook_ingest_enabled", True)
+
+
+def make_consumer(session_maker, **kwargs):
+    options = dict(
+        concurrency=10,
+        poll_interval=0.05,
+        lease_seconds=60,
+        max_attempts=3,
+        backoff_base=0,
+        backoff_max=0,
+    )
+    options.update(kwargs)
+    return WebhookConsumer(
+        session_maker=session_maker,
+        **options,
+    )
+
+
+def post_status(client, call, status, sequence_number, **kwargs):
+    return client.post(
+        f"/v1/phone/status-callback/{call.id}",
+        data=get_form(CallStatus=status, SequenceNumber=str(sequence_number), **kwargs),
+    )
+
+
+def get_state(session, call):
+    session.expire_all()
+    return session.get(type(call), call.id).state
+
+
+@pytest.mark.asyncio
+async def test_webhook_is_acknowledged_and_applied_later(client, session, async_session_maker, make_twilio_call):
+    call, _ = make_twilio_call()
+
+    resp = post_status(client, call, "ringing", 0)
+
+    assert resp.status_code == 200
+    assert resp.json()["queued"] is True
+    assert get_state(session, call) == CallState.INITIATED
+    assert session.exec(select(TwilioCallEvent)).all() == []
+
+    assert await make_consumer(async_session_maker).drain() == 1
+
+    assert get_state(session, call) == CallState.RINGING
+    inbox = session.exec(select(WebhookInbox)).one()
+    assert inbox.processed_at is not None
+    assert inbox.attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_webhooks_are_applied_in_order_per_call(client, session, async_session_maker, make_twilio_call):
+    call, _ = make_twilio_call(sid="CA_first")
+    other, _ = make_twilio_call(sid="CA_other")
+    for i, status in enumerate(["ringing", "in-progress"]):
+        post_status(client, call, status, i, CallSid="CA_first")
+    post_status(client, other, "ringing", 0, CallSid="CA_other")
+
+    consumer = make_consumer(async_session_maker)
+
+    # Uma rodada pega um webhook por ligação: o primeiro de cada uma
+    assert await consumer.process_batch() == 2
+    assert get_state(session, call) == CallState.RINGING
+    assert get_state(session, other) == CallState.RINGING
+
+    assert await consumer.process_batch() == 1
+    assert get_state(session, call) == CallState.ANSWERED
+    assert await consumer.process_batch() == 0
+
+
+@pytest.mark.asyncio
+async def test_lease_expires_after_consumer_crash(client, session, async_session_maker, make_twilio_call):
+    call, _ = make_twilio_call()
+    post_status(client, call, "ringing", 0)
+
+    crashed = make_consumer(async_session_maker)
+    assert len(await crashed._claim()) == 1
+
+    # Reservado pelo worker que caiu: nem o próximo webhook da ligação sai
+    post_status(client, call, "in-progress", 1)
+    consumer = make_consumer(async_session_maker)
+    assert await consumer.process_batch() == 0
+
+    for inbox in session.exec(select(WebhookInbox)).all():
+        inbox.next_attempt_at = create_timestamp() - timedelta(seconds=1)
+        session.add(inbox)
+    session.commit()
+
+    assert await consumer.drain() == 2
+    assert get_state(session, call) == CallState.ANSWERED
+
+
+@pytest.mark.asyncio
+async def test_reapplied_webhook_is_deduplicated(client, session, async_session_maker, make_twilio_call):
+    call, _ = make_twilio_call()
+    post_status(client, call, "ringing", 0)
+    consumer = make_consumer(async_session_maker)
+    await consumer.drain()
+
+    # Reprocessar tudo não duplica eventos nem transições
+    assert replay(session, processed=True) == 1
+    assert await consumer.drain() == 1
+
+    assert get_state(session, call) == CallState.RINGING
+    assert len(session.exec(select(TwilioCallEvent)).all()) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_webhook_holds_the_call_until_retried(
+    client, session, async_session_maker, monkeypatch, make_twilio_call
+):
+    call, _ = make_twilio_call()
+    post_status(client, call, "ringing", 0)
+    post_status(client, call, "in-progress", 1)
+
+    model, process = app.callbacks.PROCESSORS["status-callback"]
+    failures = []
+
+    async def flaky(session, call_id, payload):
+        if not failures:
+            failures.append(payload.SequenceNumber)
+            raise RuntimeError("database is gone")
+        return await process(session, call_id, payload)
+
+    monkeypatch.setitem(app.callbacks.PROCESSORS, "status-callback", (model, flaky))
+    consumer = make_consumer(async_session_maker)
+
+    await consumer.drain()
+
+    assert failures == [0]
+    assert consumer.stats()["retried"] == 1
+    assert get_state(session, call) == CallState.ANSWERED
+    events = session.exec(select(TwilioCallEvent).order_by(TwilioCallEvent.id)).all()
+    assert [e.sequence_number for e in events] == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_webhook_before_twilio_call_is_retried(client, session, async_session_maker, make_twilio_call):
+    call, _ = make_twilio_call()
+    # Callback da perna do ativista antes do TwilioCall ficar visível
+    post_status(client, call, "ringing", 0, CallSid="CA_not_yet")
+    consumer = make_consumer(async_session_maker)
+
+    await consumer.drain()
+
+    inbox = session.exec(select(WebhookInbox)).one()
+    assert inbox.processed_at is None
+    assert inbox.next_attempt_at is None
+    assert "TwilioCall not found" in inbox.last_error
+    assert inbox.attempts == 3
+    assert consumer.stats()["retried"] == 2
+    assert consumer.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_webhook_is_applied_once_twilio_call_exists(client, session, async_session_maker, make_twilio_call):
+    call, _ = make_twilio_call()
+    post_status(client, call, "ringing", 0, CallSid="CA_late")
+    consumer = make_consumer(async_session_maker, backoff_base=60, backoff_max=60)
+
+    await consumer.drain()
+    inbox = session.exec(select(WebhookInbox)).one()
+    assert inbox.processed_at is None and inbox.attempts == 1
+
+    session.add(TwilioCall(sid="CA_late", status="initiated", parent_call_id=call.id))
+    inbox.next_attempt_at = create_timestamp()
+    session.add(inbox)
+    session.commit()
+
+    assert await consumer.drain() == 1
+    assert get_state(session, call) == CallState.RINGING
+
+
+@pytest.mark.asyncio
+async def test_invalid_transition_is_parked_and_replayed(client, session, async_session_maker, make_twilio_call):
+    call, _ = make_twilio_call(state=CallState.RINGING)
+    # AMD chegou antes do atendimento: connect() não sai de RINGING
+    client.post(f"/v1/phone/amd-status-callback/{call.id}", data=get_form(AnsweredBy="human"))
+    consumer = make_consumer(async_session_maker)
+
+    await consumer.drain()
+
+    inbox = session.exec(select(WebhookInbox)).one()
+    assert inbox.processed_at is None
+    assert inbox.next_attempt_at is None
+    assert "Can't trigger event connect" in inbox.last_error
+    assert consumer.stats()["failed"] == 1
+
+    call.state = CallState.ANSWERED
+    session.add(call)
+    session.commit()
+
+    assert replay(session, call_id=call.id) == 1
+    assert await consumer.drain() == 1
+
+    assert get_state(session, call) == CallState.REDIRECTING
+    assert session.get(TwilioCall, "CA_fake_sid").answered_by == "human"
+    session.refresh(inbox)
+    assert inbox.processed_at is not None
+
+
+@pytest.mark.asyncio
+async def test_duplicate_delivery_is_applied_once(client, session, async_session_maker, make_twilio_call):
+    call, _ = make_twilio_call()
+    for _ in range(2):
+        post_status(client, call, "ringing", 0)
+
+    await make_consumer(async_session_maker).drain()
+    # Já aplicada: a próxima repetição nem entra no inbox
+    post_status(client, call, "ringing", 0)
+
+    assert len(session.exec(select(WebhookInbox)).all()) == 2
+    assert len(session.exec(select(TwilioCallEvent)).all()) == 1
+    assert get_state(session, call) == CallState.RINGING
+
+
+def test_dial_applies_queued_amd_webhook(client, session, async_session_maker, make_twilio_call, monkeypatch):
+    monkeypatch.setattr(webhook_consumer, "session_maker", async_session_maker)
+    call, _ = make_twilio_call(state=CallState.ANSWERED)
+    client.post(f"/v1/phone/amd-status-callback/{call.id}", data=get_form(AnsweredBy="human"))
+
+    # O consumidor ainda não rodou: o `/dial` aplica o AMD antes de decidir
+    resp = client.post(f"/v1/phone/dial/{call.id}", data=get_form())
+
+    assert "<Dial" in resp.text
+    assert get_state(session, call) == CallState.REDIRECTING
+    assert session.exec(select(WebhookInbox)).one().processed_at is not None
+
+
+def test_hold_applies_queued_hangup(client, session, async_session_maker, make_twilio_call, monkeypatch):
+    monkeypatch.setattr(webhook_consumer, "session_maker", async_session_maker)
+    call, _ = make_twilio_call(state=CallState.REDIRECTING)
+    post_status(client, call, "completed", 0)
+
+    resp = client.post(f"/v1/phone/hold/{call.id}")
+
+    assert resp.text == HANGUP_TWIML
+    assert get_state(session, call) == CallState.FAILED
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from app.cache import TTLCache
+from app.widget import compile_widget
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_after_first_load():
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {"id": 12}
+
+    assert await cache.get_or_load(12, loader) == {"id": 12}
+    assert await cache.get_or_load(12, loader) == {"id": 12}
+    assert len(calls) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+@pytest.mark.asyncio
+async def test_cache_coalesces_concurrent_misses():
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"id": 12}
+
+    results = await asyncio.gather(*(cache.get_or_load(12, loader) for _ in range(10)))
+
+    assert results == [{"id": 12}] * 10
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_cancelled_loader_does_not_fail_waiters():
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"id": 12}
+
+    first = asyncio.create_task(cache.get_or_load(12, loader))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(cache.get_or_load(12, loader))
+    await asyncio.sleep(0)
+
+    # O cliente da primeira busca desconectou
+    first.cancel()
+
+    assert await second == {"id": 12}
+    assert first.cancelled()
+    assert len(calls) == 2
+    assert cache.get(12) == {"id": 12}
+
+@pytest.mark.asyncio
+async def test_cache_expires_and_invalidates(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10)
+    cache.set(12, "widget")
+
+    assert cache.get(12) == "widget"
+    now[0] += 11
+    assert cache.get(12) is None
+
+    cache.set(12, "widget")
+    cache.invalidate(12)
+    assert cache.get(12) is None
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.get(1)
+    cache.set(3, "c")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+
+
+@pytest.mark.asyncio
+async def test_cache_does_not_store_missing_widget():
+    cache = TTLCache(ttl=60)
+
+    async def loader():
+        return None
+
+    assert await cache.get_or_load(12, loader) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_call_reuses_cached_widget(client, mocker, mock_graphql_client):
+    payload = {
+        "activist": { "first_name": "Test", "last_name": "Unit", "name": "Test Unit", "phone": "+5531998899876", "email": "test@unit.devel" },
+        "target": {"name": "Target Name", "phone": "+5531998899875"},
+        "widget_id": 12
+    }
+    mock_graphql_client.execute.return_value = dict(widgets_by_pk=dict(id=12, kind="draft"))
+
+    client.post("/v1/phone/call", json=payload)
+    client.post("/v1/phone/call", json=payload)
+
+    # Apenas a primeira requisição consulta o widget no BONDE
+    assert mock_graphql_client.execute.call_count == 1
+
+
+def test_compile_widget_normalizes_target_phones():
+    widget = compile_widget(dict(id=12, kind="phone", settings=dict(targets=[
+        dict(name="Alvo 1", phone="+55 (31) 99889-9875"),
+        dict(name="Alvo 2", phone="+5521998736412"),
+        dict(name="Sem telefone"),
+    ])))
+
+    assert widget.is_phone
+    assert widget.target_phones == frozenset({"+5531998899875", "+5521998736412"})
+    assert widget.has_target("+5531998899875")
+    assert not widget.has_target("+5531998899877")
+
+
+def test_compile_widget_without_settings():
+    widget = compile_widget(dict(id=12, kind="draft", settings=None))
+
+    assert not widget.is_phone
+    assert widget.target_phones == frozenset()
+    assert compile_widget(None) is None
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.ingest import webhook_consumer
+from app.main import app
+from app.outbox import outbox_worker
+from app.worker import Poller, backoff
+
+
+class CountingPoller(Poller):
+    def __init__(self, results):
+        super().__init__(poll_interval=60)
+        self.results = list(results)
+        self.rounds = 0
+        self.done = asyncio.Event()
+
+    async def run_once(self) -> bool:
+        self.rounds += 1
+        if not self.results:
+            self.done.set()
+            return False
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_poller_requires_run_once():
+    class Incomplete(Poller):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(poll_interval=1)
+
+
+def test_backoff_is_capped():
+    assert 0.5 <= backoff(1, 1.0, 10.0) <= 1.0
+    assert 4.0 <= backoff(4, 1.0, 10.0) <= 8.0
+    assert backoff(20, 1.0, 10.0) <= 10.0
+
+
+@pytest.mark.asyncio
+async def test_poller_runs_again_while_there_is_work():
+    poller = CountingPoller([True, RuntimeError("boom"), True])
+    await poller.start()
+
+    # A rodada com erro não para o laço; ele espera `poll_interval` ou `wake`
+    await asyncio.sleep(0.05)
+    assert poller.rounds == 2
+    poller.wake()
+    await asyncio.wait_for(poller.done.wait(), 1)
+    assert poller.rounds == 4
+
+    await poller.stop()
+    assert poller._task is None
+
+
+@pytest.mark.asyncio
+async def test_lifespan_stops_workers_when_startup_fails(monkeypatch):
+    async def fail():
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(settings, "webhook_ingest_enabled", True)
+    monkeypatch.setattr(webhook_consumer, "start", fail)
+
+    with pytest.raises(RuntimeError):
+        async with app.router.lifespan_context(app):
+            pass
+
+    assert outbox_worker._task is None